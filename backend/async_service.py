@@ -0,0 +1,156 @@
+"""
+检测服务的异步(ASGI)入口, 与 python_service.py 提供相同的 /api/detect/image、/health、/ready 接口
+
+上传数据在事件循环中异步读取, 慢速连接只占用协程; 解码、推理和规则推断交给持有
+IntegratedEmotionPredictor 的有界线程池执行, 事件循环始终空闲处理I/O。
+
+用法:
+    uvicorn async_service:app --host 0.0.0.0 --port 5001
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+import metrics
+import python_service as service
+
+# 推理线程数; 同一时刻最多有 INFERENCE_MAX_PENDING 个请求在执行或排队, 其余请求在事件循环中等待
+INFERENCE_THREADS = int(os.environ.get('INFERENCE_THREADS', '4'))
+INFERENCE_MAX_PENDING = int(os.environ.get('INFERENCE_MAX_PENDING', '64'))
+MAX_UPLOAD_BYTES = service.app.config['MAX_CONTENT_LENGTH']
+
+
+class InferenceExecutor:
+    """有界推理线程池: 限制已提交的任务数, 避免排队的图像数据无限堆积"""
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='inference')
+        self._max_pending = max(max_workers, max_pending)
+        self._slots = None
+        self.pending = 0  # 已进入本执行器(含等待名额)的请求数
+
+    async def run(self, fn, *args):
+        if self._slots is None:
+            # 信号量需在事件循环内创建
+            self._slots = asyncio.Semaphore(self._max_pending)
+        self.pending += 1
+        try:
+            async with self._slots:
+                return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+class UploadTooLarge(Exception):
+    """请求体超过 MAX_UPLOAD_BYTES"""
+
+
+def limit_body(receive, limit: int):
+    """
+    包装 ASGI receive: 累计已读取的请求体字节数, 超过 limit 时立即中止读取
+
+    content-length 可以缺省(分块传输)或与实际不符, 只有边读边计数才能保证上限;
+    表单解析中文件部分没有大小限制(max_part_size 只作用于普通字段), 同样依赖这里。
+    """
+    received = 0
+
+    async def limited_receive():
+        nonlocal received
+        message = await receive()
+        if message['type'] == 'http.request':
+            received += len(message.get('body', b''))
+            if received > limit:
+                raise UploadTooLarge()
+        return message
+
+    return limited_receive
+
+
+executor = InferenceExecutor(INFERENCE_THREADS, INFERENCE_MAX_PENDING)
+metrics.QUEUE_DEPTH.labels('inference_executor').set_function(lambda: executor.pending)
+
+
+async def detect_image(request):
+    response = await _detect_image(request)
+    metrics.record_request('/api/detect/image', failed=response.status_code >= 500)
+    return response
+
+
+async def _detect_image(request):
+    try:
+        content_length = request.headers.get('content-length')
+        if content_length and int(content_length) > MAX_UPLOAD_BYTES:
+            return JSONResponse({'error': 'File too large'}, status_code=413)
+
+        request = Request(request.scope, limit_body(request.receive, MAX_UPLOAD_BYTES))
+        # 退出时关闭表单中的上传文件(超过内存阈值的部分在临时文件中)
+        async with request.form() as form:
+            file = form.get('file')
+            if file is None or isinstance(file, str):
+                return JSONResponse({'error': 'No file provided'}, status_code=400)
+            if file.filename == '':
+                return JSONResponse({'error': 'No file selected'}, status_code=400)
+            data = await file.read()
+            session_id = form.get('session_id')
+
+        response = await executor.run(service.detect_image_bytes, data, session_id)
+        return JSONResponse(response)
+
+    except UploadTooLarge:
+        return JSONResponse({'error': 'File too large'}, status_code=413)
+    except HTTPException as e:
+        # 表单格式错误等
+        return JSONResponse({'error': e.detail}, status_code=e.status_code)
+    except Exception as e:
+        print(f"Error: {e}")
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def ready(request):
+    """就绪检查: 预热完成前返回503, 完成后返回预热耗时; 预热重试用尽后以 degraded=true 就绪"""
+    status = service.warmup_runner.status()
+    return JSONResponse(status, status_code=200 if status['ready'] else 503)
+
+
+async def prometheus_metrics(request):
+    """Prometheus 文本格式的运行时指标"""
+    return Response(metrics.render_metrics(), headers={'Content-Type': metrics.CONTENT_TYPE})
+
+
+async def health(request):
+    return JSONResponse(service.health_status())
+
+
+@asynccontextmanager
+async def lifespan(app):
+    service.start_scheduler()
+    service.start_warmup()
+    yield
+    executor.shutdown()
+
+
+app = Starlette(
+    routes=[
+        Route('/api/detect/image', detect_image, methods=['POST']),
+        Route('/ready', ready, methods=['GET']),
+        Route('/health', health, methods=['GET']),
+        Route('/metrics', prometheus_metrics, methods=['GET']),
+    ],
+    lifespan=lifespan
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(app, host='0.0.0.0', port=5001)
\ No newline at end of file
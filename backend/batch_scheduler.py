@@ -0,0 +1,163 @@
+import threading
+import time
+import queue
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Dict, List
+
+import numpy as np
+import torch
+
+
+class _PendingRequest:
+    """排队中的单图请求"""
+
+    __slots__ = ('image', 'au_threshold', 'compact', 'future', 'enqueued_at')
+
+    def __init__(self, image: torch.Tensor, au_threshold: float, compact: bool):
+        self.image = image
+        self.au_threshold = au_threshold
+        self.compact = compact
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+_STOP = object()
+
+
+class MicroBatchScheduler:
+    """动态微批调度器: 将并发的单图请求合并为一次批量前向"""
+
+    def __init__(self, predictor, max_batch_size: int = 8, max_wait_ms: float = 5.0,
+                 stats_window: int = 1024):
+        """
+        初始化调度器并启动后台批处理线程
+
+        Args:
+            predictor: IntegratedEmotionPredictor 实例
+            max_batch_size: 单个批次的最大图片数
+            max_wait_ms: 批次中第一个请求最多等待的毫秒数
+            stats_window: 统计排队延迟时保留的最近请求数
+        """
+        self.predictor = predictor
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_count = 0
+        self._request_count = 0
+        self._queue_waits = deque(maxlen=stats_window)
+        self._batch_sizes = deque(maxlen=stats_window)
+
+        self._thread = threading.Thread(target=self._run, name='micro-batch-scheduler',
+                                        daemon=True)
+        self._thread.start()
+
+    def submit(self, image, au_threshold: float = 0.5, compact: bool = False) -> Future:
+        """
+        提交单张图像, 返回可等待结果的 Future
+
+        图像解码和缩放在调用方线程完成, 调度线程只负责批量前向。
+        """
+        tensor = self.predictor.load_image(image)
+        request = _PendingRequest(tensor, au_threshold, compact)
+        self._queue.put(request)
+        return request.future
+
+    def predict(self, image, au_threshold: float = 0.5, compact: bool = False,
+                timeout: float = None):
+        """与 IntegratedEmotionPredictor.predict 相同的同步接口"""
+        return self.submit(image, au_threshold, compact).result(timeout=timeout)
+
+    def queue_depth(self) -> int:
+        """当前排队等待的请求数"""
+        return self._queue.qsize()
+
+    def stats(self) -> Dict[str, Any]:
+        """返回批大小与排队延迟统计"""
+        with self._lock:
+            waits = np.array(self._queue_waits, dtype=np.float64) * 1000.0
+            sizes = np.array(self._batch_sizes, dtype=np.float64)
+            stats = {
+                'batches': self._batch_count,
+                'requests': self._request_count,
+                'queue_depth': self.queue_depth(),
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+            }
+
+        if sizes.size:
+            stats['mean_batch_size'] = float(sizes.mean())
+        if waits.size:
+            stats['queue_wait_ms'] = {
+                'mean': float(waits.mean()),
+                'p50': float(np.percentile(waits, 50)),
+                'p95': float(np.percentile(waits, 95)),
+                'p99': float(np.percentile(waits, 99)),
+                'max': float(waits.max())
+            }
+        return stats
+
+    def shutdown(self, wait: bool = True):
+        """停止后台线程(已排队的请求会先处理完)"""
+        self._queue.put(_STOP)
+        if wait:
+            self._thread.join()
+
+    def _run(self):
+        """后台线程: 收集请求直到达到批大小或等待超时, 然后执行"""
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+
+            batch = [first]
+            deadline = first.enqueued_at + self.max_wait
+            stop = False
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    if remaining > 0:
+                        item = self._queue.get(timeout=remaining)
+                    else:
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._execute(batch)
+            if stop:
+                return
+
+    def _execute(self, batch: List[_PendingRequest]):
+        """按 (au_threshold, compact) 分组执行批量预测并回填结果"""
+        started_at = time.perf_counter()
+        with self._lock:
+            self._batch_count += 1
+            self._request_count += len(batch)
+            self._batch_sizes.append(len(batch))
+            self._queue_waits.extend(started_at - request.enqueued_at for request in batch)
+
+        groups = {}
+        for request in batch:
+            groups.setdefault((request.au_threshold, request.compact), []).append(request)
+
+        for (au_threshold, compact), requests in groups.items():
+            # 调用方可能已取消
+            requests = [r for r in requests if r.future.set_running_or_notify_cancel()]
+            if not requests:
+                continue
+            try:
+                results_list = self.predictor.predict_batch(
+                    [r.image for r in requests], au_threshold=au_threshold, compact=compact)
+            except Exception as e:
+                for request in requests:
+                    request.future.set_exception(e)
+                continue
+
+            for request, results in zip(requests, results_list):
+                request.future.set_result(results)
\ No newline at end of file
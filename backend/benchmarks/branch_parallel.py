@@ -0,0 +1,59 @@
+"""
+单图延迟基准: 三分支顺序执行 vs 并发执行(CPU)
+
+使用随机权重的模型(见 random_models.py), 无需真实检查点; 先校验两种模式的输出一致, 再报告延迟。
+
+用法:
+    python benchmarks/branch_parallel.py --iterations 50 --threads 4
+    python benchmarks/branch_parallel.py --image data/8.jpg
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from random_models import build_predictor  # noqa: E402
+from suite import measure, synthetic_jpegs  # noqa: E402
+from inference_backends import check_parity  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='三分支并发执行的单图延迟基准')
+    parser.add_argument('--image', default=None, help='测试图像, 默认使用合成的JPEG')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--threads', type=int, default=None, help='torch 线程数(默认不修改)')
+    parser.add_argument('--atol', type=float, default=1e-5, help='一致性校验的最大绝对误差')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    # 相同种子得到相同的随机权重
+    sequential = build_predictor(device='cpu', seed=args.seed)
+    parallel = build_predictor(device='cpu', seed=args.seed, parallel_branches=True)
+    # 预先解码缩放, 只比较分支执行部分
+    image = sequential.load_image(args.image or synthetic_jpegs(1, seed=args.seed)[0])
+
+    try:
+        parity = check_parity(sequential, parallel, image.unsqueeze(0), atol=args.atol)
+        print(f"✓ 并发执行输出一致: {parity}")
+    except AssertionError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    print(f"torch 线程数: {torch.get_num_threads()}")
+    print(f"{'模式':12s} {'mean':>8s} {'p50':>8s} {'p95':>8s}  (ms)")
+    for name, predictor in (('sequential', sequential), ('parallel', parallel)):
+        latencies = measure(lambda: predictor.predict(image), args.iterations, args.warmup)
+        print(f"{name:12s} {latencies.mean():8.2f} {np.percentile(latencies, 50):8.2f} "
+              f"{np.percentile(latencies, 95):8.2f}")
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
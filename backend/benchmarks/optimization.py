@@ -0,0 +1,88 @@
+"""
+推理优化基准: 比较原始模型与 BatchNorm折叠 + channels_last (可选 torch.compile) 后的各模型前向,
+先校验输出一致, 再报告每个模型的加速比
+
+用法:
+    python benchmarks/optimization.py --batch-sizes 1 8 --threads 4 --output optimization.json
+    python benchmarks/optimization.py --compile
+"""
+import argparse
+import json
+import os
+import sys
+
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from random_models import build_predictor  # noqa: E402
+from suite import environment, measure, stage_functions, summarize, synthetic_jpegs  # noqa: E402
+from driving_state_inference import DrivingStateInference  # noqa: E402
+from inference_backends import check_parity  # noqa: E402
+
+MODEL_STAGES = ('au_forward', 'fer_forward', 'va_forward', 'predict')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='推理优化的一致性校验与加速比')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--threads', type=int, nargs='+', default=[torch.get_num_threads()])
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--compile', action='store_true', help='同时启用 torch.compile')
+    parser.add_argument('--atol', type=float, default=1e-4, help='一致性校验的最大绝对误差')
+    parser.add_argument('--device', default='cpu')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='结果JSON路径')
+    args = parser.parse_args()
+
+    # 相同种子得到相同的随机权重
+    baseline = build_predictor(device=args.device, seed=args.seed)
+    optimized = build_predictor(device=args.device, seed=args.seed, optimize=True,
+                                compile_models=args.compile)
+
+    images = torch.randint(0, 256, (5, 3, *baseline.input_size), dtype=torch.uint8,
+                           generator=torch.Generator().manual_seed(args.seed))
+    try:
+        parity = check_parity(baseline, optimized, images, atol=args.atol)
+        print(f"✓ 优化后输出一致: {parity}")
+    except AssertionError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    engine = DrivingStateInference()
+    jpegs = synthetic_jpegs(max(args.batch_sizes))
+    results = []
+    for num_threads in args.threads:
+        torch.set_num_threads(num_threads)
+        for batch_size in args.batch_sizes:
+            functions = {name: stage_functions(predictor, engine, jpegs[:batch_size])
+                         for name, predictor in (('baseline', baseline), ('optimized', optimized))}
+            for stage in MODEL_STAGES:
+                stats = {name: summarize(measure(functions[name][stage], args.iterations,
+                                                 args.warmup), batch_size)
+                         for name in functions}
+                speedup = stats['baseline']['mean_ms'] / stats['optimized']['mean_ms']
+                results.append({'stage': stage, 'batch_size': batch_size, 'threads': num_threads,
+                                'baseline': stats['baseline'], 'optimized': stats['optimized'],
+                                'speedup': speedup})
+                print(f"  threads={num_threads:<3d} batch={batch_size:<4d} {stage:12s} "
+                      f"{stats['baseline']['mean_ms']:9.3f} -> {stats['optimized']['mean_ms']:9.3f} ms"
+                      f"  x{speedup:.2f}")
+
+    if args.output:
+        report = {
+            'environment': environment(),
+            'config': {'batch_sizes': args.batch_sizes, 'threads': args.threads,
+                       'iterations': args.iterations, 'compile': args.compile,
+                       'device': str(baseline.device), 'seed': args.seed},
+            'parity': parity,
+            'results': results
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
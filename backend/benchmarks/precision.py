@@ -0,0 +1,81 @@
+"""
+降低精度推理基准: 比较 fp32 与 bf16/fp16 的 AU/FER/VA 输出差异和各模型前向耗时
+
+用法:
+    python benchmarks/precision.py --precision bf16 --images 64 --output precision.json
+"""
+import argparse
+import json
+import os
+import sys
+
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from random_models import build_predictor  # noqa: E402
+from suite import environment, measure, stage_functions, summarize, synthetic_jpegs  # noqa: E402
+from driving_state_inference import DrivingStateInference  # noqa: E402
+from inference_backends import parity_report  # noqa: E402
+
+MODEL_STAGES = ('au_forward', 'fer_forward', 'va_forward', 'predict')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='降低精度推理的一致性报告与耗时')
+    parser.add_argument('--precision', default='bf16', choices=['bf16', 'fp16'])
+    parser.add_argument('--images', type=int, default=64, help='一致性报告使用的图像数')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--optimize', action='store_true', help='两侧都启用BN折叠和channels_last')
+    parser.add_argument('--device', default='cpu')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='结果JSON路径')
+    args = parser.parse_args()
+
+    reference = build_predictor(device=args.device, seed=args.seed, optimize=args.optimize)
+    candidate = build_predictor(device=args.device, seed=args.seed, optimize=args.optimize,
+                                precision=args.precision)
+    if candidate.precision == 'fp32':
+        print(f"当前硬件不支持 {args.precision}, 无需比较")
+        sys.exit(1)
+
+    # 一致性报告使用解码后的合成图像
+    jpegs = synthetic_jpegs(max(args.images, *args.batch_sizes), seed=args.seed)
+    images = torch.stack([reference.load_image(data) for data in jpegs[:args.images]])
+    parity = parity_report(reference, candidate, images)
+    print(f"{candidate.precision} 与 fp32 的差异:")
+    for name, stats in parity.items():
+        print(f"  {name:10s} " + '  '.join(f'{key}={value:.6g}' for key, value in stats.items()))
+
+    engine = DrivingStateInference()
+    results = []
+    for batch_size in args.batch_sizes:
+        functions = {name: stage_functions(predictor, engine, jpegs[:batch_size])
+                     for name, predictor in (('fp32', reference), (candidate.precision, candidate))}
+        for stage in MODEL_STAGES:
+            stats = {name: summarize(measure(fns[stage], args.iterations, args.warmup), batch_size)
+                     for name, fns in functions.items()}
+            speedup = stats['fp32']['mean_ms'] / stats[candidate.precision]['mean_ms']
+            results.append({'stage': stage, 'batch_size': batch_size, **stats, 'speedup': speedup})
+            print(f"  batch={batch_size:<4d} {stage:12s} {stats['fp32']['mean_ms']:9.3f} -> "
+                  f"{stats[candidate.precision]['mean_ms']:9.3f} ms  x{speedup:.2f}")
+
+    if args.output:
+        report = {
+            'environment': environment(),
+            'config': {'precision': candidate.precision, 'images': args.images,
+                       'batch_sizes': args.batch_sizes, 'iterations': args.iterations,
+                       'optimize': args.optimize, 'device': str(reference.device),
+                       'threads': torch.get_num_threads(), 'seed': args.seed},
+            'parity': parity,
+            'results': results
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
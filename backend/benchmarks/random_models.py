@@ -0,0 +1,82 @@
+"""
+以随机权重构建三个模型的检查点, 无需真实的 .pth/.tar 文件即可创建 IntegratedEmotionPredictor
+"""
+import os
+import sys
+import tempfile
+from typing import Tuple
+
+import torch
+import torch.nn as nn
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from three import AffectNetModel, IntegratedEmotionPredictor, ResNet18, alexnet  # noqa: E402
+from driving_state_inference import AU_NAMES  # noqa: E402
+
+
+def au_model() -> nn.Module:
+    """
+    AU模型结构: 已安装 Model 包时使用真实的 Model.alexnet,
+    否则使用 torchvision 的 alexnet(17个输出), 使基准测试和测试无需 Model 包即可运行
+    """
+    if alexnet is not None:
+        return alexnet(pretrained=False)
+    try:
+        from torchvision.models import alexnet as torchvision_alexnet
+    except ImportError as e:
+        raise RuntimeError("未安装 Model 包时, 随机权重的AU模型需要 torchvision") from e
+    return torchvision_alexnet(num_classes=len(AU_NAMES))
+
+
+def _randomize_norm_stats(model: nn.Module) -> nn.Module:
+    """随机化BatchNorm的统计量和仿射参数(默认值 0/1 会让BN退化为恒等变换)"""
+    for module in model.modules():
+        if isinstance(module, (nn.BatchNorm1d, nn.BatchNorm2d)):
+            module.running_mean.uniform_(-0.2, 0.2)
+            module.running_var.uniform_(0.5, 1.5)
+            module.weight.data.uniform_(0.5, 1.5)
+            module.bias.data.uniform_(-0.2, 0.2)
+    return model
+
+
+def write_random_checkpoints(output_dir: str, seed: int = 0) -> Tuple[str, str, str]:
+    """
+    按真实检查点的格式保存随机初始化的 AU模型(见 au_model) / ResNet18 / AffectNetModel 权重
+
+    Returns:
+        (au_model_path, fer_model_path, affect_model_path)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = (os.path.join(output_dir, 'alexnet_ensemble.pth'),
+             os.path.join(output_dir, 'best_checkpoint.tar'),
+             os.path.join(output_dir, 'AffectNet.pth'))
+
+    with torch.random.fork_rng(devices=[]), torch.no_grad():
+        torch.manual_seed(seed)
+        au_net = _randomize_norm_stats(au_model())
+        fer_net = _randomize_norm_stats(ResNet18(num_classes=7))
+        affect_net = _randomize_norm_stats(AffectNetModel(pretrained=False, use_attention=True))
+
+    torch.save({'model_state_dict': au_net.state_dict()}, paths[0])
+    torch.save({'state_dict': fer_net.state_dict()}, paths[1])
+    torch.save(affect_net.state_dict(), paths[2])
+    return paths
+
+
+def build_predictor(device: str = 'cpu', checkpoint_dir: str = None, seed: int = 0,
+                    **kwargs) -> IntegratedEmotionPredictor:
+    """
+    用随机权重创建预测器
+
+    Args:
+        device: 计算设备
+        checkpoint_dir: 随机检查点的保存目录, 默认为系统临时目录下按种子区分的固定目录
+        seed: 随机种子(相同种子得到相同的权重)
+        **kwargs: 传给 IntegratedEmotionPredictor 的其他参数
+    """
+    if checkpoint_dir is None:
+        checkpoint_dir = os.path.join(tempfile.gettempdir(), f'drive_state_bench_{seed}')
+    paths = write_random_checkpoints(checkpoint_dir, seed)
+    kwargs.setdefault('au_model_factory', au_model)
+    return IntegratedEmotionPredictor(*paths, device=device, **kwargs)
\ No newline at end of file
@@ -0,0 +1,194 @@
+"""
+微基准套件: 使用随机权重和合成图像, 测量各阶段在不同批大小和线程数下的延迟与吞吐
+
+测量项:
+    decode        JPEG解码 + 缩放(load_image)
+    preprocess    三个模型的融合预处理
+    au_forward    AU模型(alexnet)前向
+    fer_forward   FER模型(ResNet18)前向
+    va_forward    特征提取器 + AffectNetModel 前向
+    predict       完整的 predict_batch(含解码)
+    rules         逐条 DrivingStateInference.infer_driving_state
+    rules_batch   向量化 DrivingStateInference.infer_batch
+
+用法:
+    python benchmarks/suite.py --batch-sizes 1 8 32 --threads 1 4 --output bench.json
+    python benchmarks/suite.py --compare bench.json --tolerance 0.1
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+import torch
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from random_models import build_predictor  # noqa: E402
+from driving_state_inference import DrivingStateInference  # noqa: E402
+
+STAGES = ('decode', 'preprocess', 'au_forward', 'fer_forward', 'va_forward',
+          'predict', 'rules', 'rules_batch')
+
+
+def synthetic_jpegs(count: int, size=(640, 480), seed: int = 0) -> List[bytes]:
+    """生成固定种子的随机JPEG图像(编码后的字节)"""
+    rng = np.random.RandomState(seed)
+    images = []
+    for _ in range(count):
+        # 平滑的随机图像, 避免纯噪声让JPEG解码变得不具代表性
+        small = rng.randint(0, 256, (size[1] // 16, size[0] // 16, 3), dtype=np.uint8)
+        image = Image.fromarray(small).resize(size, Image.BILINEAR)
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=90)
+        images.append(buffer.getvalue())
+    return images
+
+
+def measure(fn: Callable[[], object], iterations: int, warmup: int) -> np.ndarray:
+    """返回每次调用的耗时(毫秒)"""
+    for _ in range(warmup):
+        fn()
+    latencies = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies[i] = (time.perf_counter() - start) * 1000.0
+    return latencies
+
+
+def stage_functions(predictor, engine: DrivingStateInference,
+                    jpegs: List[bytes]) -> Dict[str, Callable[[], object]]:
+    """为一个批次构建各测量项的调用函数(输入预先准备好, 只测量该阶段本身)"""
+    batch = torch.stack([predictor.load_image(data) for data in jpegs])
+    au_input, fer_input, affect_input = predictor.preprocess(batch)
+    results = predictor.predict_batch(jpegs, compact=True)
+    valence = np.array([r.valence for r in results])
+    arousal = np.array([r.arousal for r in results])
+    emotion = np.array([r.emotion_index for r in results])
+    au_probs = np.stack([r.au_probs for r in results])
+
+    def no_grad(fn):
+        def run():
+            with torch.no_grad():
+                return fn()
+        return run
+
+    return {
+        'decode': lambda: [predictor.load_image(data) for data in jpegs],
+        'preprocess': lambda: predictor.preprocess(batch),
+        'au_forward': no_grad(lambda: predictor._forward_au(au_input)),
+        'fer_forward': no_grad(lambda: predictor._forward_fer(fer_input)),
+        'va_forward': no_grad(lambda: predictor._forward_va(affect_input)),
+        'predict': lambda: predictor.predict_batch(jpegs),
+        'rules': lambda: engine.infer_driving_state_batch(results),
+        'rules_batch': lambda: engine.infer_batch(valence, arousal, emotion, au_probs),
+    }
+
+
+def summarize(latencies: np.ndarray, batch_size: int) -> Dict[str, float]:
+    mean = float(latencies.mean())
+    return {
+        'mean_ms': mean,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'images_per_sec': batch_size * 1000.0 / mean if mean > 0 else float('inf')
+    }
+
+
+def run_suite(predictor, batch_sizes: List[int], threads: List[int], stages: List[str],
+              iterations: int, warmup: int) -> List[Dict]:
+    engine = DrivingStateInference()
+    jpegs = synthetic_jpegs(max(batch_sizes))
+    results = []
+    for num_threads in threads:
+        torch.set_num_threads(num_threads)
+        for batch_size in batch_sizes:
+            functions = stage_functions(predictor, engine, jpegs[:batch_size])
+            for stage in stages:
+                stats = summarize(measure(functions[stage], iterations, warmup), batch_size)
+                results.append({'stage': stage, 'batch_size': batch_size,
+                                'threads': num_threads, **stats})
+                print(f"  threads={num_threads:<3d} batch={batch_size:<4d} {stage:12s} "
+                      f"{stats['mean_ms']:9.3f} ms  {stats['images_per_sec']:10.1f} img/s")
+    return results
+
+
+def environment() -> Dict[str, object]:
+    return {
+        'torch': torch.__version__,
+        'numpy': np.__version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+
+
+def compare(baseline: Dict, current: Dict, tolerance: float) -> List[str]:
+    """返回比基线慢超过 tolerance(相对值)的测量项"""
+    key = lambda r: (r['stage'], r['batch_size'], r['threads'])  # noqa: E731
+    reference = {key(r): r for r in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        base = reference.get(key(result))
+        if base is None:
+            continue
+        change = result['mean_ms'] / base['mean_ms'] - 1.0
+        line = (f"{result['stage']:12s} batch={result['batch_size']:<4d} "
+                f"threads={result['threads']:<3d} {base['mean_ms']:9.3f} -> "
+                f"{result['mean_ms']:9.3f} ms ({change:+.1%})")
+        print(('✗ ' if change > tolerance else '  ') + line)
+        if change > tolerance:
+            regressions.append(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='随机权重微基准套件')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--threads', type=int, nargs='+', default=[torch.get_num_threads()])
+    parser.add_argument('--stages', nargs='+', default=list(STAGES), choices=STAGES)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--device', default='cpu')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='结果JSON路径')
+    parser.add_argument('--compare', default=None, help='作为基线的结果JSON路径')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='与基线比较时允许的相对变慢比例')
+    args = parser.parse_args()
+
+    predictor = build_predictor(device=args.device, seed=args.seed)
+    report = {
+        'environment': environment(),
+        'config': {'batch_sizes': args.batch_sizes, 'threads': args.threads,
+                   'iterations': args.iterations, 'warmup': args.warmup,
+                   'device': str(predictor.device), 'seed': args.seed},
+        'results': run_suite(predictor, args.batch_sizes, args.threads, args.stages,
+                             args.iterations, args.warmup)
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} 项比基线慢超过 {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,197 @@
+import json
+import os
+import time
+from itertools import islice
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Dataset
+
+from three import IMAGE_EXTENSIONS, IntegratedEmotionPredictor
+from driving_state_inference import DrivingStateInference
+from columnar_export import ColumnarWriter, columns_from_rows, format_from_path
+
+
+def collect_images(source: str) -> List[str]:
+    """
+    列出待分析的图像: 目录(递归, 按路径排序)或清单文件(每行一个路径, 相对路径基于清单所在目录)
+    """
+    if os.path.isdir(source):
+        paths = []
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            paths.extend(os.path.join(root, name) for name in sorted(files)
+                         if name.lower().endswith(IMAGE_EXTENSIONS))
+        return paths
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, encoding='utf-8') as f:
+        lines = [line.strip() for line in f]
+    return [os.path.join(base, line) for line in lines if line and not line.startswith('#')]
+
+
+class ImageFileDataset(Dataset):
+    """在 DataLoader 工作进程中解码图像; 解码失败的图像返回错误信息而不是中断整个任务"""
+
+    def __init__(self, paths: List[str], input_size: Tuple[int, int]):
+        self.paths = paths
+        self.input_size = input_size
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __getitem__(self, index: int):
+        path = self.paths[index]
+        try:
+            # 与 IntegratedEmotionPredictor.load_image 相同的解码和缩放
+            return path, IntegratedEmotionPredictor.decode_resized(path, self.input_size), None
+        except Exception as e:
+            return path, None, f'{type(e).__name__}: {e}'
+
+
+def collate_images(items) -> Tuple[List[str], Optional[torch.Tensor], List[Tuple[str, str]]]:
+    """合并为 (成功解码的路径, [N, 3, H, W] uint8批次, [(失败路径, 错误信息)])"""
+    decoded = [(path, image) for path, image, error in items if error is None]
+    failed = [(path, error) for path, _, error in items if error is not None]
+    batch = torch.stack([image for _, image in decoded]) if decoded else None
+    return [path for path, _ in decoded], batch, failed
+
+
+def completed_images(output_path: str) -> Set[str]:
+    """
+    读取已有的JSONL输出, 返回已成功处理的图像路径(用于断点续跑)
+
+    续跑会重试解码失败的图像, 因此先从文件中移除这些错误行, 每张图像最多保留本次运行
+    写入的一行结果, 反复失败的图像不会在多次续跑后累积重复的错误行;
+    中断时可能留下不完整的最后一行, 同样移除。
+    """
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, 'rb') as f:
+        data = f.read()
+    end = data.rfind(b'\n') + 1
+    lines = [line for line in data[:end].splitlines() if line.strip()]
+    rows = [json.loads(line) for line in lines]
+    kept = [line for line, row in zip(lines, rows) if 'error' not in row]
+    if end < len(data) or len(kept) < len(lines):
+        # 先写临时文件再原子替换, 改写中途中断也不会丢失已完成的结果
+        tmp_path = output_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(b''.join(line + b'\n' for line in kept))
+        os.replace(tmp_path, output_path)
+    return {row['image'] for row in rows if 'error' not in row}
+
+
+def run_bulk_analysis(predictor: IntegratedEmotionPredictor, engine: DrivingStateInference,
+                      paths: List[str], output_path: str, batch_size: int = 64,
+                      num_workers: int = 4, prefetch_factor: int = 2,
+                      au_threshold: float = 0.5, resume: bool = True,
+                      progress_interval: float = 10.0) -> Dict[str, Any]:
+    """
+    离线批量分析: 工作进程并行解码 + 预取, 大批量推理, 结果逐批追加写入JSONL
+
+    每行为 {'image', 'results', 'driving_state'}(解码失败时为 {'image', 'error'}),
+    驾驶状态由向量化的 infer_batch 推断, 不含规则触发细节('details');
+    每批写完即刷新, 中断后以 resume=True 重新运行会跳过已成功的图像、重试失败的图像。
+
+    Args:
+        predictor: IntegratedEmotionPredictor 实例
+        engine: DrivingStateInference 实例
+        paths: 图像路径列表
+        output_path: 输出JSONL路径
+        batch_size: 每批推理的图像数
+        num_workers: 解码工作进程数(0 为在主进程中解码)
+        prefetch_factor: 每个工作进程预取的批次数
+        au_threshold: AU激活阈值
+        resume: 是否跳过输出文件中已成功的图像
+        progress_interval: 打印进度的间隔(秒)
+
+    Returns:
+        统计信息 {'total', 'skipped', 'processed', 'failed', 'seconds', 'images_per_sec'}
+    """
+    done = completed_images(output_path) if resume else set()
+    pending = [path for path in paths if path not in done]
+    print(f"共 {len(paths)} 张图像, 已完成 {len(paths) - len(pending)} 张, 待处理 {len(pending)} 张")
+
+    predictor.wait_until_loaded()
+    loader = DataLoader(
+        ImageFileDataset(pending, predictor.input_size),
+        batch_size=batch_size,
+        num_workers=num_workers,
+        prefetch_factor=prefetch_factor if num_workers > 0 else None,
+        # 锁页内存使主机到GPU的拷贝可以异步进行
+        pin_memory=predictor.device.type == 'cuda',
+        collate_fn=collate_images
+    )
+
+    processed = failed = 0
+    start = last_report = time.perf_counter()
+    with open(output_path, 'a' if resume else 'w', encoding='utf-8') as f:
+        for batch_paths, batch, errors in loader:
+            lines = [json.dumps({'image': path, 'error': error}, ensure_ascii=False)
+                     for path, error in errors]
+            if batch is not None:
+                results_list = predictor.predict_decoded_batch(
+                    batch, batch_paths, au_threshold=au_threshold, compact=True)
+                codes, confidences = engine.infer_batch(
+                    [results.valence for results in results_list],
+                    [results.arousal for results in results_list],
+                    [results.emotion_index for results in results_list],
+                    np.stack([results.au_probs for results in results_list]),
+                    au_threshold=au_threshold)
+                states = engine.format_batch(codes, confidences)
+                lines.extend(
+                    json.dumps({'image': path, 'results': results.to_dict(),
+                                'driving_state': state}, ensure_ascii=False)
+                    for path, results, state in zip(batch_paths, results_list, states))
+            f.write(''.join(line + '\n' for line in lines))
+            f.flush()
+
+            processed += len(batch_paths)
+            failed += len(errors)
+            now = time.perf_counter()
+            if now - last_report >= progress_interval:
+                last_report = now
+                print(f"  {processed + failed}/{len(pending)}  "
+                      f"{processed / (now - start):.1f} 张/秒")
+
+    seconds = time.perf_counter() - start
+    stats = {
+        'total': len(paths),
+        'skipped': len(paths) - len(pending),
+        'processed': processed,
+        'failed': failed,
+        'seconds': seconds,
+        'images_per_sec': processed / seconds if seconds > 0 else 0.0
+    }
+    print(f"✓ 完成: {processed} 张成功, {failed} 张失败, "
+          f"{seconds:.1f} 秒, {stats['images_per_sec']:.1f} 张/秒")
+    return stats
+
+
+def export_columnar(jsonl_path: str, output_path: str, state_codes: Sequence[str],
+                    fmt: Optional[str] = None, chunk_rows: int = 65536) -> int:
+    """
+    将批量分析的JSONL输出转换为列式文件(跳过解码失败的行), 按 chunk_rows 行分块写出
+
+    Args:
+        jsonl_path: run_bulk_analysis 的输出
+        output_path: 列式文件路径
+        state_codes: DrivingStateInference.state_codes
+        fmt: 'parquet' / 'arrow' / 'npz', 默认由扩展名推断
+
+    Returns:
+        写出的行数
+    """
+    with open(jsonl_path, encoding='utf-8') as f, \
+            ColumnarWriter(output_path, fmt or format_from_path(output_path), state_codes) as writer:
+        rows = (json.loads(line) for line in f if line.strip())
+        rows = (row for row in rows if 'error' not in row)
+        while True:
+            chunk = list(islice(rows, chunk_rows))
+            if not chunk:
+                break
+            writer.write(columns_from_rows(chunk, state_codes))
+    print(f"✓ 已导出 {writer.rows} 行: {output_path}")
+    return writer.rows
\ No newline at end of file
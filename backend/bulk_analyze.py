@@ -0,0 +1,55 @@
+"""
+离线批量分析: 对目录或清单中的图像运行三模态推理和驾驶状态推断, 结果逐批写入JSONL
+
+用法:
+    python bulk_analyze.py uploads/archive --output results.jsonl --batch-size 64 --workers 8
+    python bulk_analyze.py manifest.txt --output results.jsonl   # 中断后重新运行即可续跑
+    python bulk_analyze.py uploads/archive --output results.jsonl --columnar results.parquet
+"""
+import argparse
+import json
+
+from three import IntegratedEmotionPredictor
+from driving_state_inference import DrivingStateInference
+from bulk_analysis import collect_images, export_columnar, run_bulk_analysis
+
+
+def main():
+    parser = argparse.ArgumentParser(description='离线批量分析')
+    parser.add_argument('source', help='图像目录或清单文件(每行一个图像路径)')
+    parser.add_argument('--output', required=True, help='输出JSONL路径')
+    parser.add_argument('--au-model', default='models/alexnet_ensemble.pth')
+    parser.add_argument('--fer-model', default='models/best_checkpoint.tar')
+    parser.add_argument('--affect-model', default='models/AffectNet.pth')
+    parser.add_argument('--device', default='cuda')
+    parser.add_argument('--backend', default='torch',
+                        choices=['torch', 'onnx', 'torchscript', 'int8'])
+    parser.add_argument('--backend-model-dir', default='models/exported')
+    parser.add_argument('--precision', default='fp32', choices=['fp32', 'bf16', 'fp16'])
+    parser.add_argument('--optimize', action='store_true', help='BatchNorm折叠 + channels_last')
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=4, help='解码工作进程数')
+    parser.add_argument('--prefetch', type=int, default=2, help='每个工作进程预取的批次数')
+    parser.add_argument('--au-threshold', type=float, default=0.5)
+    parser.add_argument('--no-resume', action='store_true', help='覆盖输出文件, 不跳过已完成的图像')
+    parser.add_argument('--columnar', default=None,
+                        help='完成后另存为列式文件(.parquet / .arrow / .npz)')
+    args = parser.parse_args()
+
+    paths = collect_images(args.source)
+    predictor = IntegratedEmotionPredictor(args.au_model, args.fer_model, args.affect_model,
+                                           device=args.device, backend=args.backend,
+                                           backend_model_dir=args.backend_model_dir,
+                                           optimize=args.optimize, precision=args.precision)
+    engine = DrivingStateInference()
+    stats = run_bulk_analysis(predictor, engine, paths, args.output,
+                              batch_size=args.batch_size, num_workers=args.workers,
+                              prefetch_factor=args.prefetch, au_threshold=args.au_threshold,
+                              resume=not args.no_resume)
+    if args.columnar:
+        export_columnar(args.output, args.columnar, engine.state_codes)
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,149 @@
+import threading
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+import torch
+
+import metrics
+from driving_state_inference import AU_NAMES, CompactResult, DrivingStateInference
+from inference_backends import BRANCHES
+
+# 默认顺序: VA参与每一条规则, 必须首先运行; 其余按实测开销从低到高: AU(alexnet)
+# 远比FER(stride-1 ResNet18, CPU上约为AU的20倍)便宜, 疲劳等状态仅凭VA+AU即可确定
+DEFAULT_ORDER = ('va', 'au', 'fer')
+
+
+class CascadePredictor:
+    """
+    级联推理: 按顺序逐个运行模型分支, 每个分支之后由规则引擎判断能否确定驾驶状态,
+    已确定的图像不再运行剩余分支
+
+    提前确定的状态、置信度与三个分支全部运行时完全一致(见 DrivingStateInference.infer_partial);
+    被跳过分支在 CompactResult 中对应的字段为 None(接口返回中以 cascade_skipped 列出)。
+
+    每条规则都依赖VA, 缺少VA时无法确定任何状态: VA分支从不被跳过, 且总是第一个运行,
+    之后只有 FER / AU 可能被跳过。
+    """
+
+    def __init__(self, predictor, engine: DrivingStateInference,
+                 order: Sequence[str] = DEFAULT_ORDER, min_confidence: float = 0.0):
+        """
+        Args:
+            predictor: IntegratedEmotionPredictor 实例
+            engine: 规则引擎
+            order: 分支执行顺序, 须为 'va' / 'fer' / 'au' 的排列; 'va' 不在首位时会被移到首位
+            min_confidence: 提前确定状态所需的最低置信度, 低于该值时继续运行剩余分支
+        """
+        if sorted(order) != sorted(BRANCHES):
+            raise ValueError(f"分支顺序须为 {sorted(BRANCHES)} 的排列: {list(order)}")
+        if order[0] != 'va':
+            # VA之前运行的分支无法确定任何状态, 也就永远不会被跳过
+            order = ('va', *(branch for branch in order if branch != 'va'))
+            print(f"  ! 级联推理须先运行VA分支, 顺序调整为 {list(order)}")
+        self.predictor = predictor
+        self.engine = engine
+        self.order = tuple(order)
+        self.min_confidence = min_confidence
+
+        self.images = 0
+        self.branch_runs = {branch: 0 for branch in self.order}
+        self.branch_skips = {branch: 0 for branch in self.order}
+        self._lock = threading.Lock()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'order': list(self.order),
+                'min_confidence': self.min_confidence,
+                'images': self.images,
+                'branch_runs': dict(self.branch_runs),
+                'branch_skips': dict(self.branch_skips),
+                'skip_rate': {branch: self.branch_skips[branch] / self.images
+                              if self.images else 0.0 for branch in self.order}
+            }
+
+    def predict(self, image, au_threshold: float = 0.5) -> Tuple[CompactResult, Dict[str, Any]]:
+        """对单张图像级联推理, 返回 (CompactResult, 驾驶状态)"""
+        return self.predict_batch([image], au_threshold=au_threshold)[0]
+
+    def predict_batch(self, images: List, au_threshold: float = 0.5
+                      ) -> List[Tuple[CompactResult, Dict[str, Any]]]:
+        """
+        批量级联推理: 每个分支只对尚未确定状态的图像做一次批量前向
+
+        Returns:
+            与输入顺序一致的 (CompactResult, 驾驶状态) 列表
+        """
+        if not images:
+            return []
+        predictor = self.predictor
+        count = len(images)
+        batch = torch.stack([predictor.load_image(image) for image in images])
+        predictor.wait_until_loaded()
+        metrics.observe_batch_size(count)
+
+        with metrics.timed('preprocess'):
+            images_device = batch.to(predictor.device, non_blocking=True)
+            x = images_device.float().div_(255)
+        forwards = {
+            'au': lambda idx: predictor._forward_au(predictor._au_input(x[idx])),
+            'fer': lambda idx: predictor._forward_fer(predictor._fer_input(images_device[idx])),
+            'va': lambda idx: predictor._forward_va(predictor._affect_input(x[idx])),
+        }
+
+        outputs = {branch: [None] * count for branch in self.order}
+        states = [None] * count
+        pending = list(range(count))
+        runs = {branch: 0 for branch in self.order}
+        with torch.no_grad():
+            for branch in self.order:
+                if not pending:
+                    break
+                values = forwards[branch](torch.tensor(pending, device=predictor.device))
+                runs[branch] = len(pending)
+                for i, value in zip(pending, values):
+                    outputs[branch][i] = value
+
+                with metrics.timed('rules'):
+                    undecided = []
+                    for i in pending:
+                        result = self._build_result(images[i], outputs['au'][i], outputs['fer'][i],
+                                                    outputs['va'][i], au_threshold)
+                        states[i] = self.engine.infer_partial(
+                            result.valence, result.arousal, result.emotion,
+                            result.au_probs, result.au_mask, self.min_confidence)
+                        if states[i] is None:
+                            undecided.append(i)
+                    pending = undecided
+
+        with metrics.timed('assemble'):
+            results = []
+            for i in range(count):
+                result = self._build_result(images[i], outputs['au'][i], outputs['fer'][i],
+                                            outputs['va'][i], au_threshold)
+                if states[i] is None:
+                    # 三个分支均已运行但置信度低于 min_confidence: 按完整规则推断
+                    states[i] = self.engine.infer_driving_state(result)
+                results.append((result, states[i]))
+
+        with self._lock:
+            self.images += count
+            for branch in self.order:
+                self.branch_runs[branch] += runs[branch]
+                self.branch_skips[branch] += count - runs[branch]
+        for branch in self.order:
+            metrics.record_branches(branch, runs[branch], count - runs[branch])
+        return results
+
+    def _build_result(self, image, au_probs, fer_probs, va_values,
+                      au_threshold: float) -> CompactResult:
+        """由已运行分支的输出构建 CompactResult, 未运行的分支为 None"""
+        au_mask = None
+        if au_probs is not None:
+            au_mask = sum(1 << i for i in range(len(AU_NAMES)) if au_probs[i] > au_threshold)
+        emotion_index = None if fer_probs is None else int(np.argmax(fer_probs))
+        valence = arousal = None
+        if va_values is not None:
+            valence, arousal = float(va_values[0]), float(va_values[1])
+        return CompactResult(self.predictor._image_source(image), au_probs, au_mask,
+                             fer_probs, emotion_index, valence, arousal)
\ No newline at end of file
@@ -0,0 +1,293 @@
+import json
+import os
+import struct
+import tempfile
+import zipfile
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from driving_state_inference import AU_NAMES, EMOTION_LABELS, CompactResult
+
+# 支持的格式及对应的文件扩展名 / MIME类型
+FORMATS = {
+    'parquet': ('.parquet', 'application/vnd.apache.parquet'),
+    'arrow': ('.arrow', 'application/vnd.apache.arrow.file'),
+    'npz': ('.npz', 'application/octet-stream')
+}
+
+# 状态编号对照表在元数据(Arrow/Parquet)或 NPZ 中的键名
+STATE_CODES_KEY = 'state_codes'
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError("Parquet/Arrow 导出需要安装 pyarrow") from e
+    return pyarrow
+
+
+def format_from_path(path: str) -> str:
+    """由文件扩展名推断格式(.feather 视为 arrow)"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.feather':
+        return 'arrow'
+    for name, (suffix, _) in FORMATS.items():
+        if extension == suffix:
+            return name
+    raise ValueError(f"无法由扩展名推断列式格式: {path}, 可选 {[s for s, _ in FORMATS.values()]}")
+
+
+def columns_from_results(results_list: List[CompactResult], states: List[Dict[str, Any]],
+                         state_codes: Sequence[str],
+                         images: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+    """
+    将 CompactResult 与驾驶状态整理为定宽列
+
+    Args:
+        results_list: predict_batch(compact=True) 的输出
+        states: 对应的 infer_driving_state 输出
+        state_codes: DrivingStateInference.state_codes, state_code 列保存其中的下标
+        images: 每行的图像标识, 默认使用 CompactResult.image
+
+    Returns:
+        {'image': [N] 字符串, 'au_probs': [N, 17] float32, 'fer_probs': [N, 7] float32,
+         'valence' / 'arousal': [N] float32, 'state_code': [N] uint8, 'confidence': [N] float64}
+    """
+    count = len(results_list)
+    if images is None:
+        images = [results.image or '' for results in results_list]
+    return {
+        'image': np.array(images, dtype=str),
+        'au_probs': np.array([results.au_probs for results in results_list],
+                             dtype=np.float32).reshape(count, len(AU_NAMES)),
+        'fer_probs': np.array([results.fer_probs for results in results_list],
+                              dtype=np.float32).reshape(count, len(EMOTION_LABELS)),
+        'valence': np.array([results.valence for results in results_list], dtype=np.float32),
+        'arousal': np.array([results.arousal for results in results_list], dtype=np.float32),
+        'state_code': np.array([state_codes.index(state['state_code']) for state in states],
+                               dtype=np.uint8),
+        'confidence': np.array([state['confidence'] for state in states], dtype=np.float64)
+    }
+
+
+def columns_from_rows(rows: List[Dict[str, Any]], state_codes: Sequence[str]) -> Dict[str, np.ndarray]:
+    """将 {'image', 'results', 'driving_state'} 行(predict() 字典格式, 如批量分析的JSONL)整理为定宽列"""
+    results_list = [row['results'] for row in rows]
+    states = [row['driving_state'] for row in rows]
+    return {
+        'image': np.array([row['image'] for row in rows], dtype=str),
+        'au_probs': np.array([[results['AU_Recognition']['detailed_results'][au]['confidence']
+                               for au in AU_NAMES] for results in results_list],
+                             dtype=np.float32).reshape(len(rows), len(AU_NAMES)),
+        'fer_probs': np.array([[results['Emotion_Classification']['probabilities'][label]
+                                for label in EMOTION_LABELS] for results in results_list],
+                              dtype=np.float32).reshape(len(rows), len(EMOTION_LABELS)),
+        'valence': np.array([results['Valence_Arousal']['valence'] for results in results_list],
+                            dtype=np.float32),
+        'arousal': np.array([results['Valence_Arousal']['arousal'] for results in results_list],
+                            dtype=np.float32),
+        'state_code': np.array([state_codes.index(state['state_code']) for state in states],
+                               dtype=np.uint8),
+        'confidence': np.array([state['confidence'] for state in states], dtype=np.float64)
+    }
+
+
+def _to_arrow_batch(pa, columns: Dict[str, np.ndarray], metadata: Dict[str, str]):
+    arrays = []
+    for values in columns.values():
+        if values.ndim == 2:
+            # 定宽向量列: FixedSizeList, 底层为连续的 [N * width] 缓冲区
+            arrays.append(pa.FixedSizeListArray.from_arrays(pa.array(values.reshape(-1)),
+                                                            values.shape[1]))
+        else:
+            arrays.append(pa.array(values))
+    batch = pa.RecordBatch.from_arrays(arrays, names=list(columns))
+    return batch.replace_schema_metadata(metadata)
+
+
+class _NpyColumnSpool:
+    """
+    NPZ 的单列暂存: 每个分块到达时即写入临时文件, close() 时再逐块复制到 .npy 成员中,
+    任意时刻内存中只有一个分块
+
+    字符串列各分块的宽度可能不同, 复制时按最宽的分块统一宽度。
+    """
+
+    def __init__(self):
+        self.file = tempfile.TemporaryFile()
+        self.chunks = []  # (行数, dtype)
+        self.row_shape = None
+
+    def append(self, values: np.ndarray):
+        values = np.ascontiguousarray(values)
+        if self.row_shape is None:
+            self.row_shape = values.shape[1:]
+        elif values.shape[1:] != self.row_shape:
+            raise ValueError(f"分块的列形状不一致: {values.shape[1:]} != {self.row_shape}")
+        self.file.write(values.tobytes())
+        self.chunks.append((len(values), values.dtype))
+
+    def copy_to(self, archive: zipfile.ZipFile, name: str):
+        dtype = np.result_type(*(dtype for _, dtype in self.chunks))
+        rows = sum(count for count, _ in self.chunks)
+        header = {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False,
+                  'shape': (rows, *self.row_shape)}
+        self.file.seek(0)
+        width = int(np.prod(self.row_shape, dtype=np.int64))
+        with archive.open(name + '.npy', 'w', force_zip64=True) as member:
+            np.lib.format.write_array_header_2_0(member, header)
+            for count, chunk_dtype in self.chunks:
+                data = self.file.read(count * width * chunk_dtype.itemsize)
+                chunk = np.frombuffer(data, dtype=chunk_dtype)
+                member.write(chunk.astype(dtype, copy=False).tobytes())
+
+    def close(self):
+        self.file.close()
+
+
+class ColumnarWriter:
+    """
+    逐批写入列式文件; Parquet/Arrow 每次 write() 写出一个行组/记录批,
+    NPZ 每次 write() 将各列写入临时文件, close() 时逐块复制为未压缩的NPZ(读取时可内存映射),
+    内存占用与总行数无关
+    """
+
+    def __init__(self, sink: Union[str, BinaryIO], fmt: str, state_codes: Sequence[str]):
+        """
+        Args:
+            sink: 输出路径或二进制文件对象
+            fmt: 'parquet' / 'arrow' / 'npz'
+            state_codes: state_code 列对应的状态码列表, 写入文件元数据
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"未知的列式格式: {fmt}, 可选 {list(FORMATS)}")
+        self.sink = sink
+        self.format = fmt
+        self.state_codes = list(state_codes)
+        self.rows = 0
+        self._pa = _import_pyarrow() if fmt != 'npz' else None
+        self._writer = None
+        self._spools = {}  # NPZ: 列名 -> _NpyColumnSpool
+
+    def write(self, columns: Dict[str, np.ndarray]):
+        if self.format == 'npz':
+            if self._spools and set(columns) != set(self._spools):
+                raise ValueError(f"分块的列不一致: {sorted(columns)} != {sorted(self._spools)}")
+            for name, values in columns.items():
+                self._spools.setdefault(name, _NpyColumnSpool()).append(values)
+        else:
+            batch = _to_arrow_batch(self._pa, columns,
+                                    {STATE_CODES_KEY: json.dumps(self.state_codes)})
+            if self._writer is None:
+                if self.format == 'parquet':
+                    self._writer = self._pa.parquet.ParquetWriter(self.sink, batch.schema)
+                else:
+                    self._writer = self._pa.ipc.new_file(self.sink, batch.schema)
+            self._writer.write_batch(batch)
+        self.rows += len(next(iter(columns.values())))
+
+    def close(self):
+        if self.format == 'npz':
+            try:
+                with zipfile.ZipFile(self.sink, 'w', zipfile.ZIP_STORED, allowZip64=True) as archive:
+                    for name, spool in self._spools.items():
+                        spool.copy_to(archive, name)
+                    with archive.open(STATE_CODES_KEY + '.npy', 'w') as member:
+                        np.lib.format.write_array(member, np.array(self.state_codes, dtype=str))
+            finally:
+                for spool in self._spools.values():
+                    spool.close()
+                self._spools = {}
+        elif self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def write_columns(sink: Union[str, BinaryIO], fmt: str, columns: Dict[str, np.ndarray],
+                  state_codes: Sequence[str]):
+    """一次写出全部列"""
+    with ColumnarWriter(sink, fmt, state_codes) as writer:
+        writer.write(columns)
+
+
+def _memmap_npz(path: str, names: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+    """以内存映射方式读取未压缩NPZ中的各数组(压缩的成员退回普通读取)"""
+    columns = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            name = info.filename[:-len('.npy')]
+            if names is not None and name not in names:
+                continue
+            if info.compress_type != zipfile.ZIP_STORED:
+                with archive.open(info) as member:
+                    columns[name] = np.lib.format.read_array(member)
+                continue
+            # 跳过本地文件头(30字节 + 文件名 + 扩展字段)后即为 .npy 内容
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack('<HH', f.read(4))
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(f)
+            read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) \
+                else np.lib.format.read_array_header_2_0
+            shape, fortran_order, dtype = read_header(f)
+            if dtype.hasobject or 0 in shape:
+                f.seek(info.header_offset + 30 + name_length + extra_length)
+                columns[name] = np.lib.format.read_array(f, allow_pickle=False)
+                continue
+            columns[name] = np.memmap(path, dtype=dtype, mode='r', shape=shape,
+                                      order='F' if fortran_order else 'C', offset=f.tell())
+    return columns
+
+
+def _arrow_to_numpy(pa, column) -> np.ndarray:
+    column = column.combine_chunks()
+    if pa.types.is_fixed_size_list(column.type):
+        return column.flatten().to_numpy().reshape(-1, column.type.list_size)
+    if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+        return np.array(column.to_pylist(), dtype=str)
+    return column.to_numpy()
+
+
+def read_columns(path: str, columns: Optional[Sequence[str]] = None,
+                 mmap: bool = True) -> Dict[str, np.ndarray]:
+    """
+    读取列式文件为 numpy 数组字典(另含 'state_codes' 对照表)
+
+    NPZ 和 Arrow 在 mmap=True 时以内存映射方式读取, 只有访问到的数据才会读入内存。
+
+    Args:
+        path: 列式文件路径, 格式由扩展名推断
+        columns: 只读取这些列, 默认全部
+        mmap: 是否以内存映射方式读取
+    """
+    fmt = format_from_path(path)
+    names = None if columns is None else [*columns, STATE_CODES_KEY]
+    if fmt == 'npz':
+        if mmap:
+            return _memmap_npz(path, names)
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files if names is None or name in names}
+
+    pa = _import_pyarrow()
+    if fmt == 'arrow':
+        source = pa.memory_map(path) if mmap else pa.OSFile(path)
+        table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select(list(columns))
+    else:
+        table = pa.parquet.read_table(path, columns=columns, memory_map=mmap)
+    columns = {name: _arrow_to_numpy(pa, table.column(name)) for name in table.column_names}
+    metadata = table.schema.metadata or {}
+    if STATE_CODES_KEY.encode() in metadata:
+        columns[STATE_CODES_KEY] = np.array(json.loads(metadata[STATE_CODES_KEY.encode()]), dtype=str)
+    return columns
\ No newline at end of file
@@ -1,5 +1,191 @@
 import numpy as np
-from typing import Dict, Any, Tuple
+from collections.abc import Mapping
+from typing import Dict, Any, List, Optional, Tuple, Union
+
+import metrics
+
+# 与 IntegratedEmotionPredictor 输出顺序一致
+AU_NAMES = ['AU1', 'AU2', 'AU4', 'AU5', 'AU6', 'AU7', 'AU9',
+            'AU12', 'AU14', 'AU15', 'AU17', 'AU20', 'AU23',
+            'AU24', 'AU25', 'AU26', 'AU27']
+
+EMOTION_LABELS = ['Angry', 'Disgust', 'Fear', 'Happy',
+                  'Sad', 'Surprise', 'Neutral']
+
+# 每个AU在激活位掩码中对应的位
+AU_BITS = {au: 1 << i for i, au in enumerate(AU_NAMES)}
+
+# 各状态置信度计算所依赖的模态(va / fer / au), None 为默认状态
+CONFIDENCE_INPUTS = {
+    'drowsy': ('va', 'au'),
+    'angry': ('va', 'fer', 'au'),
+    'stressed': ('va', 'fer', 'au'),
+    'alert': ('va', 'fer'),  # 关键AU一项恒得分
+    'distracted': ('va', 'fer', 'au'),
+    'surprised': ('va',),
+    'sad': (),
+    'relaxed': ('va', 'fer'),
+    None: ()
+}
+
+
+def _and3(*values: Optional[bool]) -> Optional[bool]:
+    """三值逻辑与: 任一为假则为假, 全部为真则为真, 否则未知(None)"""
+    if any(value is False for value in values):
+        return False
+    if all(value is True for value in values):
+        return True
+    return None
+
+
+def _or3(*values: Optional[bool]) -> Optional[bool]:
+    """三值逻辑或: 任一为真则为真, 全部为假则为假, 否则未知(None)"""
+    if any(value is True for value in values):
+        return True
+    if all(value is False for value in values):
+        return False
+    return None
+
+
+class CompactResult:
+    """
+    predict(compact=True) 的紧凑结果
+
+    以原始概率数组和17位AU激活掩码保存三模态输出, 规则引擎直接消费,
+    只在需要JSON时通过 to_dict() 展开为 predict() 的字典格式。
+    级联推理中未运行的分支对应字段为 None。
+    """
+
+    __slots__ = ('image', 'au_probs', 'au_mask', 'fer_probs',
+                 'emotion_index', 'valence', 'arousal')
+
+    def __init__(self, image: Optional[str], au_probs: Optional[np.ndarray],
+                 au_mask: Optional[int], fer_probs: Optional[np.ndarray],
+                 emotion_index: Optional[int], valence: Optional[float],
+                 arousal: Optional[float]):
+        self.image = image
+        self.au_probs = au_probs
+        self.au_mask = au_mask
+        self.fer_probs = fer_probs
+        self.emotion_index = emotion_index
+        self.valence = valence
+        self.arousal = arousal
+
+    @property
+    def active_count(self) -> Optional[int]:
+        if self.au_mask is None:
+            return None
+        return bin(self.au_mask).count('1')
+
+    @property
+    def emotion(self) -> Optional[str]:
+        if self.emotion_index is None:
+            return None
+        return EMOTION_LABELS[self.emotion_index]
+
+    @property
+    def emotion_confidence(self) -> Optional[float]:
+        if self.fer_probs is None:
+            return None
+        return float(self.fer_probs[self.emotion_index])
+
+    @property
+    def skipped_branches(self) -> List[str]:
+        """级联推理中未运行的分支(完整推理时为空)"""
+        return [branch for branch, output in (('va', self.valence), ('fer', self.fer_probs),
+                                              ('au', self.au_probs)) if output is None]
+
+    def has_au(self, au: str) -> bool:
+        return bool(self.au_mask & AU_BITS[au])
+
+    def active_au_names(self) -> Optional[List[str]]:
+        if self.au_mask is None:
+            return None
+        return [au for au in AU_NAMES if self.au_mask & AU_BITS[au]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """展开为与 predict() 相同的结果字典(未运行的分支为 None)"""
+        au_recognition = None
+        if self.au_mask is not None:
+            active_aus = self.active_au_names()
+            au_recognition = {
+                'active_AUs': active_aus,
+                'total_active': len(active_aus),
+                'detailed_results': {
+                    au: {
+                        'present': bool(self.au_mask & AU_BITS[au]),
+                        'confidence': float(self.au_probs[i])
+                    }
+                    for i, au in enumerate(AU_NAMES)
+                }
+            }
+
+        emotion_classification = None
+        if self.emotion_index is not None:
+            emotion_classification = {
+                'predicted_emotion': self.emotion,
+                'emotion_index': self.emotion_index,
+                'probabilities': {
+                    label: float(prob)
+                    for label, prob in zip(EMOTION_LABELS, self.fer_probs)
+                },
+                'confidence': self.emotion_confidence
+            }
+
+        valence_arousal = None
+        if self.valence is not None:
+            valence_arousal = {'valence': self.valence, 'arousal': self.arousal}
+
+        return {
+            'image': self.image,
+            'AU_Recognition': au_recognition,
+            'Emotion_Classification': emotion_classification,
+            'Valence_Arousal': valence_arousal
+        }
+
+
+class _AUBitSet:
+    """以位掩码实现规则中用到的集合操作(成员判断、交集、计数)"""
+
+    __slots__ = ('mask',)
+
+    def __init__(self, mask: int):
+        self.mask = mask
+
+    def __contains__(self, au: str) -> bool:
+        return bool(self.mask & AU_BITS.get(au, 0))
+
+    def __and__(self, aus) -> List[str]:
+        return [au for au in AU_NAMES if au in aus and self.mask & AU_BITS[au]]
+
+    def __iter__(self):
+        return (au for au in AU_NAMES if self.mask & AU_BITS[au])
+
+    def __len__(self) -> int:
+        return bin(self.mask).count('1')
+
+
+class _CompactAUDetails(Mapping):
+    """按需生成单个AU明细的只读映射, 代替17个AU子字典"""
+
+    __slots__ = ('result',)
+
+    def __init__(self, result: CompactResult):
+        self.result = result
+
+    def __getitem__(self, au: str) -> Dict[str, Any]:
+        index = AU_NAMES.index(au)
+        return {'present': self.result.has_au(au),
+                'confidence': float(self.result.au_probs[index])}
+
+    def __contains__(self, au) -> bool:
+        return au in AU_BITS
+
+    def __iter__(self):
+        return iter(AU_NAMES)
+
+    def __len__(self) -> int:
+        return len(AU_NAMES)
 
 
 class DrivingStateInference:
@@ -29,31 +215,48 @@ class DrivingStateInference:
             'sad': ('黄色', 'medium')
         }
 
-    def infer_driving_state(self, results: Dict[str, Any]) -> Dict[str, Any]:
+        # infer_batch 返回的状态编号对应的状态码
+        self.state_codes = tuple(self.state_labels)
+
+    def infer_driving_state(self, results: Union[Dict[str, Any], CompactResult]) -> Dict[str, Any]:
         """
         根据三模态结果推断驾驶状态
 
         Args:
-            results: IntegratedEmotionPredictor.predict() 的输出结果
+            results: IntegratedEmotionPredictor.predict() 的输出结果(字典或 CompactResult)
 
         Returns:
             包含驾驶状态、风险等级、置信度等的字典
         """
-        # 解析三模态数据
-        va_data = results['Valence_Arousal']
-        fer_data = results['Emotion_Classification']
-        au_data = results['AU_Recognition']
-
-        valence = va_data['valence']
-        arousal = va_data['arousal']
-        emotion = fer_data['predicted_emotion']
-        active_aus = set(au_data['active_AUs'])
-        au_details = au_data['detailed_results']
-
-        # 计算AU活跃度指标
-        au_active_count = len(active_aus)
-        au_confidence_mean = np.mean([au_details[au]['confidence']
-                                      for au in au_details])
+        with metrics.timed('rules'):
+            return self._infer_driving_state(results)
+
+    def _infer_driving_state(self, results: Union[Dict[str, Any], CompactResult]) -> Dict[str, Any]:
+        if isinstance(results, CompactResult):
+            # 紧凑结果: 直接读取数组, AU判断使用位运算
+            valence = results.valence
+            arousal = results.arousal
+            emotion = results.emotion
+            active_aus = _AUBitSet(results.au_mask)
+            au_details = _CompactAUDetails(results)
+            au_active_count = len(active_aus)
+            au_confidence_mean = np.mean(results.au_probs.astype(np.float64))
+        else:
+            # 解析三模态数据
+            va_data = results['Valence_Arousal']
+            fer_data = results['Emotion_Classification']
+            au_data = results['AU_Recognition']
+
+            valence = va_data['valence']
+            arousal = va_data['arousal']
+            emotion = fer_data['predicted_emotion']
+            active_aus = set(au_data['active_AUs'])
+            au_details = au_data['detailed_results']
+
+            # 计算AU活跃度指标
+            au_active_count = len(active_aus)
+            au_confidence_mean = np.mean([au_details[au]['confidence']
+                                          for au in au_details])
 
         # 规则推断
         state, confidence, details = self._apply_rules(
@@ -62,7 +265,10 @@ class DrivingStateInference:
             au_confidence_mean, au_details
         )
 
-        # 组织输出
+        return self._format_state(state, confidence, details)
+
+    def _format_state(self, state: str, confidence: float, details: Dict) -> Dict[str, Any]:
+        """组织输出"""
         color, risk_level = self.risk_levels[state]
 
         return {
@@ -75,8 +281,240 @@ class DrivingStateInference:
             'details': details
         }
 
+    def infer_partial(self, valence: Optional[float] = None, arousal: Optional[float] = None,
+                      emotion: Optional[str] = None, au_probs: Optional[np.ndarray] = None,
+                      au_mask: Optional[int] = None,
+                      min_confidence: float = 0.0) -> Optional[Dict[str, Any]]:
+        """
+        部分模态未知时尝试提前确定驾驶状态(级联推理)
+
+        按 _apply_rules 的优先级以三值逻辑(真/假/未知)判断各规则: 前面的规则全部为假、
+        当前规则为真, 且该状态的置信度只依赖已知模态时, 结果与三模态齐全时完全一致。
+
+        Args:
+            valence / arousal: VA分支输出, 未运行时为 None
+            emotion: FER预测的表情标签, 未运行时为 None
+            au_probs: [17] AU概率, 未运行时为 None
+            au_mask: AU激活位掩码(与 au_probs 一同提供)
+            min_confidence: 提前确定状态所需的最低置信度
+
+        Returns:
+            与 infer_driving_state 相同的字典; 无法确定时返回 None(需要运行更多分支)
+        """
+        known = {'va': valence is not None and arousal is not None,
+                 'fer': emotion is not None,
+                 'au': au_mask is not None}
+
+        def va(predicate):
+            return bool(predicate(valence, arousal)) if known['va'] else None
+
+        def emotion_in(*labels):
+            return emotion in labels if known['fer'] else None
+
+        def au_count(predicate):
+            return predicate(bin(au_mask).count('1')) if known['au'] else None
+
+        def has(*aus):
+            return any(au_mask & AU_BITS[au] for au in aus) if known['au'] else None
+
+        # 与各 _check_* 函数的条件一一对应
+        angry_va = va(lambda v, a: v < 0.2 and a > 0.6)
+        rules = (
+            ('drowsy', _or3(_and3(va(lambda v, a: a < 0.25 and v < 0.3),
+                                  au_count(lambda n: n <= 3)),
+                            _and3(va(lambda v, a: a < 0.2), emotion_in('Sad', 'Neutral')))),
+            ('angry', _or3(_and3(emotion_in('Angry'), va(lambda v, a: a > 0.65)),
+                           _and3(angry_va, has('AU4', 'AU7')),
+                           _and3(emotion_in('Angry'), angry_va))),
+            ('stressed', _and3(va(lambda v, a: a > 0.6 and v < 0.3),
+                               _or3(emotion_in('Fear', 'Disgust', 'Angry'), has('AU4')))),
+            ('alert', _and3(va(lambda v, a: a > 0.65),
+                            _or3(emotion_in('Surprise', 'Happy', 'Neutral'),
+                                 has('AU1', 'AU2', 'AU5')))),
+            ('distracted', _or3(_and3(au_count(lambda n: n <= 2), emotion_in('Sad', 'Neutral')),
+                                _and3(va(lambda v, a: 0.2 < a < 0.5 and -0.1 < v < 0.2),
+                                      au_count(lambda n: n <= 3)))),
+            ('surprised', _and3(emotion_in('Surprise'), va(lambda v, a: a > 0.65))),
+            ('sad', _and3(emotion_in('Sad'), va(lambda v, a: a < 0.5))),
+            ('relaxed', _and3(va(lambda v, a: 0.3 <= a <= 0.7 and v > 0.1),
+                              emotion_in('Neutral', 'Happy', 'Surprise'),
+                              au_count(lambda n: 2 <= n <= 6))),
+        )
+
+        decided = None
+        for state, condition in rules:
+            if condition is None:
+                return None
+            if condition:
+                decided = state
+                break
+        if not all(known[modality] for modality in CONFIDENCE_INPUTS[decided]):
+            return None
+
+        # 状态和置信度已与未知模态无关, 以占位值复用 _apply_rules
+        if not known['au']:
+            au_probs, au_mask = np.zeros(len(AU_NAMES), dtype=np.float32), 0
+        placeholder = CompactResult(None, au_probs, au_mask, None, None, valence, arousal)
+        active_aus = _AUBitSet(au_mask)
+        state, confidence, details = self._apply_rules(
+            valence if known['va'] else 0.0, arousal if known['va'] else 0.0,
+            emotion if known['fer'] else 'Neutral',
+            active_aus, len(active_aus), np.mean(au_probs.astype(np.float64)),
+            _CompactAUDetails(placeholder)
+        )
+        if confidence < min_confidence:
+            return None
+        if not known['au']:
+            for key in ('key_aus', 'active_au_count', 'au_mean_confidence'):
+                if key in details:
+                    details[key] = None
+
+        return self._format_state(state, confidence, details)
+
+    def infer_driving_state_batch(self, results_list: List[Union[Dict[str, Any], CompactResult]]
+                                  ) -> List[Dict[str, Any]]:
+        """
+        批量推断驾驶状态
+
+        Args:
+            results_list: IntegratedEmotionPredictor.predict_batch() 的输出结果
+
+        Returns:
+            与输入顺序一致的驾驶状态字典列表
+        """
+        return [self.infer_driving_state(results) for results in results_list]
+
+    def format_batch(self, state_index, confidence) -> List[Dict[str, Any]]:
+        """
+        将 infer_batch 的输出整理为驾驶状态字典
+
+        字段与 infer_driving_state 的输出相同, 但不含规则触发细节('details'),
+        向量化推断不逐条生成这些信息。
+        """
+        states = []
+        for index, value in zip(state_index, confidence):
+            state = self._format_state(self.state_codes[index], float(value), {})
+            del state['details']
+            states.append(state)
+        return states
+
+    def infer_batch(self, valence, arousal, emotion_index, au_probs,
+                    au_threshold: float = 0.5) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        向量化批量推断: 以数组运算执行全部规则, 规则优先级与 _apply_rules 相同
+
+        Args:
+            valence: [N] valence
+            arousal: [N] arousal
+            emotion_index: [N] 表情编号(EMOTION_LABELS 中的下标)
+            au_probs: [N, 17] AU概率矩阵(列顺序同 AU_NAMES)
+            au_threshold: AU激活阈值
+
+        Returns:
+            (状态编号数组, 置信度数组), 状态编号为 self.state_codes 中的下标;
+            结果与逐条调用 infer_driving_state 完全一致
+        """
+        valence = np.asarray(valence, dtype=np.float64)
+        arousal = np.asarray(arousal, dtype=np.float64)
+        emotion = np.asarray(emotion_index)
+        au_probs = np.asarray(au_probs)
+
+        # 与 predict() 一致: 在原始精度上做阈值判断, 置信度比较使用float64
+        active = au_probs > au_threshold
+        au_count = active.sum(axis=1)
+        au4_confidence = au_probs[:, AU_NAMES.index('AU4')].astype(np.float64)
+
+        def has(*aus):
+            return np.logical_or.reduce([active[:, AU_NAMES.index(au)] for au in aus])
+
+        def emotion_in(*labels):
+            return np.isin(emotion, [EMOTION_LABELS.index(label) for label in labels])
+
+        def clip(score, upper):
+            return np.minimum(upper, np.maximum(0.5, score))
+
+        is_angry = emotion == EMOTION_LABELS.index('Angry')
+        is_sad = emotion == EMOTION_LABELS.index('Sad')
+        is_surprise = emotion == EMOTION_LABELS.index('Surprise')
+
+        # ===== 规则条件(对应各 _check_* 函数) =====
+        drowsy = ((arousal < 0.25) & (valence < 0.3) & (au_count <= 3)) | \
+                 ((arousal < 0.2) & emotion_in('Sad', 'Neutral'))
+
+        angry_va = (valence < 0.2) & (arousal > 0.6)
+        angry = (is_angry & (arousal > 0.65)) | \
+                (angry_va & has('AU4', 'AU7')) | \
+                (is_angry & angry_va)
+
+        stressed = (arousal > 0.6) & (valence < 0.3) & \
+                   (emotion_in('Fear', 'Disgust', 'Angry') | has('AU4'))
+
+        alert = (arousal > 0.65) & \
+                (emotion_in('Surprise', 'Happy', 'Neutral') | has('AU1', 'AU2', 'AU5'))
+
+        distracted = ((au_count <= 2) & emotion_in('Sad', 'Neutral')) | \
+                     ((0.2 < arousal) & (arousal < 0.5) &
+                      (-0.1 < valence) & (valence < 0.2) & (au_count <= 3))
+
+        surprised = is_surprise & (arousal > 0.65)
+        sad = is_sad & (arousal < 0.5)
+
+        relaxed = (0.3 <= arousal) & (arousal <= 0.7) & (valence > 0.1) & \
+                  emotion_in('Neutral', 'Happy', 'Surprise') & \
+                  (2 <= au_count) & (au_count <= 6)
+
+        # ===== 置信度(对应各 _calc_*_confidence 函数, 保持相同的累加顺序) =====
+        drowsy_conf = np.zeros_like(arousal)
+        drowsy_conf += np.where(arousal < 0.15, 0.4, np.where(arousal < 0.25, 0.3, 0.0))
+        drowsy_conf += np.where(valence < 0.2, 0.3, np.where(valence < 0.3, 0.2, 0.0))
+        drowsy_conf += np.where(au_count <= 2, 0.3, np.where(au_count <= 3, 0.2, 0.0))
+
+        angry_conf = np.zeros_like(arousal)
+        angry_conf += np.where(is_angry, 0.4, 0.0)
+        angry_conf += np.where((valence < 0.2) & (arousal > 0.65), 0.3, 0.0)
+        angry_conf += np.where(au4_confidence > 0.6, 0.3, 0.0)
+
+        stressed_conf = np.zeros_like(arousal)
+        stressed_conf += np.where((arousal > 0.6) & (valence < 0.3), 0.35, 0.0)
+        stressed_conf += np.where(emotion_in('Fear', 'Disgust'), 0.35, 0.0)
+        stressed_conf += np.where(au4_confidence > 0.5, 0.3, 0.0)
+
+        # detailed_results 总是包含全部AU, 关键AU一项恒得分
+        alert_conf = np.zeros_like(arousal)
+        alert_conf += np.where(arousal > 0.7, 0.4, 0.0)
+        alert_conf += np.where(emotion_in('Surprise', 'Happy'), 0.3, 0.0)
+        alert_conf += 0.3
+
+        distracted_conf = np.zeros_like(arousal)
+        distracted_conf += np.where(au_count <= 2, 0.4, 0.0)
+        distracted_conf += np.where(emotion_in('Sad', 'Neutral'), 0.3, 0.0)
+        distracted_conf += np.where((0.2 < arousal) & (arousal < 0.5), 0.3, 0.0)
+
+        relaxed_conf = np.zeros_like(arousal)
+        relaxed_conf += np.where((0.3 <= arousal) & (arousal <= 0.7), 0.35, 0.0)
+        relaxed_conf += np.where(valence > 0.3, 0.35, 0.0)
+        relaxed_conf += np.where(emotion_in('Neutral', 'Happy'), 0.3, 0.0)
+
+        # ===== 按优先级选择第一个满足的规则 =====
+        code = self.state_codes.index
+        conditions = [drowsy, angry, stressed, alert, distracted, surprised, sad, relaxed]
+        state_index = np.select(
+            conditions,
+            [code('drowsy'), code('angry'), code('stressed'), code('alert'),
+             code('distracted'), code('surprised'), code('sad'), code('relaxed')],
+            default=code('relaxed'))
+        confidence = np.select(
+            conditions,
+            [clip(drowsy_conf, 0.95), clip(angry_conf, 0.95), clip(stressed_conf, 0.9),
+             clip(alert_conf, 0.9), clip(distracted_conf, 0.85),
+             np.minimum(0.9, arousal * 0.8), np.full_like(arousal, 0.7),
+             clip(relaxed_conf, 0.9)],
+            default=0.5)
+
+        return state_index, confidence
+
     def _apply_rules(self, valence: float, arousal: float,
-                     emotion: str, active_aus: set,
+                     emotion: str, active_aus,
                      au_count: int, au_mean: float,
                      au_details: Dict) -> Tuple[str, float, Dict]:
         """
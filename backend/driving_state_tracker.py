@@ -0,0 +1,231 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Union
+
+from driving_state_inference import AU_NAMES, CompactResult, DrivingStateInference
+
+# 风险等级排序, 用于决定进入/退出状态所需的连续帧数
+RISK_RANK = {'safe': 0, 'medium': 1, 'high': 2, 'critical': 3}
+
+
+class DrivingStateTracker:
+    """
+    单个驾驶会话的时序状态跟踪器
+
+    在逐帧规则推断(_apply_rules)的结果之上维护:
+      - valence/arousal/AU活跃度的指数滑动平均
+      - 固定窗口内疲劳帧的滚动计数(类PERCLOS指标)
+      - 状态切换滞回: 候选状态需连续出现若干帧才会切换
+
+    每帧更新的时间和内存开销均为O(1); 同一会话的并发更新由跟踪器自身的锁串行化。
+    """
+
+    __slots__ = ('engine', 'alpha', 'perclos_window', 'perclos_threshold',
+                 'enter_frames', 'exit_frames',
+                 'ema_valence', 'ema_arousal', 'ema_au_activity', 'ema_confidence',
+                 '_drowsy_ring', '_ring_pos', 'drowsy_count', 'frames',
+                 'state', 'pending_state', 'pending_count', 'last_update', '_lock')
+
+    def __init__(self, engine: DrivingStateInference, alpha: float = 0.3,
+                 perclos_window: int = 30, perclos_threshold: float = 0.4,
+                 enter_frames: int = 2, exit_frames: int = 4):
+        """
+        Args:
+            engine: 共享的 DrivingStateInference 实例(提供状态标签和风险等级)
+            alpha: 滑动平均系数, 越大越偏向最新帧
+            perclos_window: 疲劳帧滚动计数的窗口帧数
+            perclos_threshold: 窗口内疲劳帧占比达到该值时判定为持续疲劳
+            enter_frames: 切换到风险更高状态所需的连续帧数
+            exit_frames: 切换到风险相同或更低状态所需的连续帧数
+        """
+        self.engine = engine
+        self.alpha = alpha
+        self.perclos_window = max(1, int(perclos_window))
+        self.perclos_threshold = perclos_threshold
+        self.enter_frames = max(1, int(enter_frames))
+        self.exit_frames = max(1, int(exit_frames))
+
+        self.ema_valence = None
+        self.ema_arousal = None
+        self.ema_au_activity = None
+        self.ema_confidence = 0.0
+
+        self._drowsy_ring = bytearray(self.perclos_window)
+        self._ring_pos = 0
+        self.drowsy_count = 0
+        self.frames = 0
+
+        self.state = None
+        self.pending_state = None
+        self.pending_count = 0
+        self.last_update = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def perclos(self) -> float:
+        """窗口内疲劳帧占比"""
+        return self.drowsy_count / min(self.frames, self.perclos_window) if self.frames else 0.0
+
+    def update(self, results: Union[Dict[str, Any], CompactResult],
+               frame_state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        用一帧的结果更新会话状态
+
+        Args:
+            results: IntegratedEmotionPredictor.predict() 的输出结果(字典或 CompactResult)
+            frame_state: DrivingStateInference.infer_driving_state() 对该帧的输出
+
+        Returns:
+            平滑后的驾驶状态字典
+        """
+        with self._lock:
+            return self._update(results, frame_state)
+
+    def _update(self, results: Union[Dict[str, Any], CompactResult],
+                frame_state: Dict[str, Any]) -> Dict[str, Any]:
+        self.frames += 1
+        self.last_update = time.monotonic()
+
+        # 1. 滑动平均
+        if isinstance(results, CompactResult):
+            valence, arousal = results.valence, results.arousal
+            # 级联推理跳过AU分支时为None, 保持之前的AU活跃度
+            au_activity = None if results.au_mask is None \
+                else results.active_count / len(AU_NAMES)
+        else:
+            valence = results['Valence_Arousal']['valence']
+            arousal = results['Valence_Arousal']['arousal']
+            au_activity = results['AU_Recognition']['total_active'] / len(
+                results['AU_Recognition']['detailed_results'])
+        if self.ema_valence is None:
+            self.ema_valence, self.ema_arousal, self.ema_au_activity = valence, arousal, au_activity
+        else:
+            a = self.alpha
+            self.ema_valence += a * (valence - self.ema_valence)
+            self.ema_arousal += a * (arousal - self.ema_arousal)
+            if au_activity is not None:
+                self.ema_au_activity = au_activity if self.ema_au_activity is None \
+                    else self.ema_au_activity + a * (au_activity - self.ema_au_activity)
+
+        # 2. 疲劳帧滚动计数: 移出最旧帧, 写入当前帧
+        frame_code = frame_state['state_code']
+        drowsy = 1 if frame_code == 'drowsy' else 0
+        self.drowsy_count += drowsy - self._drowsy_ring[self._ring_pos]
+        self._drowsy_ring[self._ring_pos] = drowsy
+        self._ring_pos = (self._ring_pos + 1) % self.perclos_window
+
+        # 3. 候选状态: 持续疲劳优先于单帧判断
+        candidate = frame_code
+        candidate_confidence = frame_state['confidence']
+        perclos = self.perclos
+        if perclos >= self.perclos_threshold:
+            candidate = 'drowsy'
+            candidate_confidence = max(candidate_confidence if frame_code == 'drowsy' else 0.0,
+                                       min(0.95, perclos))
+
+        # 4. 滞回切换
+        if self.state is None:
+            self._switch(candidate, candidate_confidence)
+        elif candidate == self.state:
+            self.pending_state, self.pending_count = None, 0
+            self.ema_confidence += self.alpha * (candidate_confidence - self.ema_confidence)
+        else:
+            if candidate == self.pending_state:
+                self.pending_count += 1
+            else:
+                self.pending_state, self.pending_count = candidate, 1
+            self.ema_confidence += self.alpha * (0.0 - self.ema_confidence)
+
+            if self.pending_count >= self._frames_required(candidate):
+                self._switch(candidate, candidate_confidence)
+
+        return self.snapshot(frame_code)
+
+    def snapshot(self, frame_code: Optional[str] = None) -> Dict[str, Any]:
+        """返回当前的平滑状态"""
+        state = self.state or 'relaxed'
+        color, risk_level = self.engine.risk_levels[state]
+        return {
+            'driving_state': self.engine.state_labels[state],
+            'state_code': state,
+            'risk_level': risk_level,
+            'risk_color': color,
+            'confidence': self.ema_confidence,
+            'recommendation': self.engine._get_recommendation(state),
+            'frame_state_code': frame_code,
+            'pending_state_code': self.pending_state,
+            'perclos': self.perclos,
+            'smoothed': {
+                'valence': self.ema_valence,
+                'arousal': self.ema_arousal,
+                'au_activity': self.ema_au_activity
+            },
+            'frames': self.frames
+        }
+
+    def _frames_required(self, candidate: str) -> int:
+        """进入更高风险状态快, 退出到同级或更低风险状态慢"""
+        current_rank = RISK_RANK[self.engine.risk_levels[self.state][1]]
+        candidate_rank = RISK_RANK[self.engine.risk_levels[candidate][1]]
+        return self.enter_frames if candidate_rank > current_rank else self.exit_frames
+
+    def _switch(self, state: str, confidence: float):
+        self.state = state
+        self.pending_state, self.pending_count = None, 0
+        self.ema_confidence = confidence
+
+
+class DrivingStateTrackerRegistry:
+    """
+    按会话ID管理跟踪器, 超出容量或空闲超时的会话按LRU淘汰
+
+    注册表的锁只保护会话的查找/淘汰/插入, 各会话的更新在跟踪器自身的锁内进行, 不同会话互不阻塞。
+    """
+
+    def __init__(self, engine: DrivingStateInference, max_sessions: int = 10000,
+                 idle_timeout: float = 600.0, **tracker_kwargs):
+        """
+        Args:
+            engine: 共享的 DrivingStateInference 实例
+            max_sessions: 同时保留的最大会话数
+            idle_timeout: 会话空闲超过该秒数后被淘汰
+            tracker_kwargs: 传给 DrivingStateTracker 的参数
+        """
+        self.engine = engine
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.tracker_kwargs = tracker_kwargs
+        self._trackers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._trackers)
+
+    def update(self, session_id: str, results: Union[Dict[str, Any], CompactResult],
+               frame_state: Dict[str, Any]) -> Dict[str, Any]:
+        """用一帧结果更新指定会话, 返回平滑后的驾驶状态"""
+        with self._lock:
+            tracker = self._trackers.get(session_id)
+            if tracker is None:
+                self._evict()
+                tracker = DrivingStateTracker(self.engine, **self.tracker_kwargs)
+                self._trackers[session_id] = tracker
+            else:
+                self._trackers.move_to_end(session_id)
+        return tracker.update(results, frame_state)
+
+    def reset(self, session_id: str):
+        """结束会话并丢弃其状态"""
+        with self._lock:
+            self._trackers.pop(session_id, None)
+
+    def _evict(self):
+        """淘汰空闲超时的会话, 并保证为新会话留出空间(调用方需持有锁)"""
+        now = time.monotonic()
+        while self._trackers:
+            session_id, tracker = next(iter(self._trackers.items()))
+            if len(self._trackers) < self.max_sessions and \
+                    now - tracker.last_update < self.idle_timeout:
+                break
+            del self._trackers[session_id]
\ No newline at end of file
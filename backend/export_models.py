@@ -0,0 +1,54 @@
+"""
+将 IntegratedEmotionPredictor 的三个模型导出为 ONNX / TorchScript, 并校验与 eager 输出一致
+
+用法:
+    python export_models.py --output-dir models/exported --format onnx torchscript
+"""
+import argparse
+import sys
+
+import torch
+
+from three import IntegratedEmotionPredictor
+from inference_backends import check_parity, export_models
+
+
+def main():
+    parser = argparse.ArgumentParser(description='导出推理模型')
+    parser.add_argument('--au-model', default='models/alexnet_ensemble.pth')
+    parser.add_argument('--fer-model', default='models/best_checkpoint.tar')
+    parser.add_argument('--affect-model', default='models/AffectNet.pth')
+    parser.add_argument('--output-dir', default='models/exported')
+    parser.add_argument('--format', nargs='+', default=['onnx', 'torchscript'],
+                        choices=['onnx', 'torchscript'])
+    parser.add_argument('--device', default='cpu')
+    parser.add_argument('--atol', type=float, default=1e-4, help='一致性校验的最大绝对误差')
+    parser.add_argument('--skip-check', action='store_true', help='跳过一致性校验')
+    args = parser.parse_args()
+
+    predictor = IntegratedEmotionPredictor(args.au_model, args.fer_model,
+                                           args.affect_model, device=args.device)
+    export_models(predictor, args.output_dir, backends=args.format)
+
+    if args.skip_check:
+        return
+
+    # 用随机图像(含非导出时使用的batch大小)校验各后端输出
+    images = torch.randint(0, 256, (5, 3, *predictor.input_size), dtype=torch.uint8)
+    failed = False
+    for backend in args.format:
+        candidate = IntegratedEmotionPredictor(args.au_model, args.fer_model, args.affect_model,
+                                               device=args.device, backend=backend,
+                                               backend_model_dir=args.output_dir)
+        try:
+            report = check_parity(predictor, candidate, images, atol=args.atol)
+            print(f"✓ {backend} 与 eager 输出一致: {report}")
+        except AssertionError as e:
+            print(f"✗ {backend}: {e}")
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
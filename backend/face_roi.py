@@ -0,0 +1,268 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# (x, y, w, h), 原始帧坐标
+Box = Tuple[int, int, int, int]
+
+
+def _import_cv2():
+    try:
+        import cv2
+    except ImportError as e:
+        raise RuntimeError("人脸区域跟踪需要安装 opencv-python") from e
+    return cv2
+
+
+class HaarFaceDetector:
+    """OpenCV 4.x 自带的 Haar 级联人脸检测器(OpenCV 5 已移除)"""
+
+    def __init__(self, scale_factor: float = 1.1, min_neighbors: int = 5,
+                 min_size: Tuple[int, int] = (24, 24)):
+        cv2 = _import_cv2()
+        self.cv2 = cv2
+        self.classifier = cv2.CascadeClassifier(
+            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        if self.classifier.empty():
+            raise RuntimeError("无法加载 Haar 人脸检测模型")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+
+    def __call__(self, image: np.ndarray) -> List[Box]:
+        gray = self.cv2.cvtColor(image, self.cv2.COLOR_RGB2GRAY)
+        faces = self.classifier.detectMultiScale(gray, scaleFactor=self.scale_factor,
+                                                 minNeighbors=self.min_neighbors,
+                                                 minSize=self.min_size)
+        return [tuple(int(v) for v in face) for face in faces]
+
+
+class YuNetFaceDetector:
+    """OpenCV FaceDetectorYN (YuNet, 需要 face_detection_yunet_*.onnx 模型文件)"""
+
+    def __init__(self, model_path: str, score_threshold: float = 0.6):
+        cv2 = _import_cv2()
+        self.cv2 = cv2
+        self.detector = cv2.FaceDetectorYN.create(model_path, '', (320, 320),
+                                                  score_threshold=score_threshold)
+        self._input_size = None
+
+    def __call__(self, image: np.ndarray) -> List[Box]:
+        height, width = image.shape[:2]
+        if self._input_size != (width, height):
+            self.detector.setInputSize((width, height))
+            self._input_size = (width, height)
+        _, faces = self.detector.detect(self.cv2.cvtColor(image, self.cv2.COLOR_RGB2BGR))
+        if faces is None:
+            return []
+        return [tuple(int(v) for v in face[:4]) for face in faces]
+
+
+def create_face_detector(model_path: Optional[str] = None) -> Callable[[np.ndarray], List[Box]]:
+    """提供 YuNet 模型路径时使用 YuNet, 否则使用 Haar 级联(需 OpenCV 4.x)"""
+    if model_path:
+        return YuNetFaceDetector(model_path)
+    if not hasattr(_import_cv2(), 'CascadeClassifier'):
+        raise RuntimeError("当前 OpenCV 版本不含 Haar 级联检测器, 请指定 YuNet 人脸检测模型路径")
+    return HaarFaceDetector()
+
+
+class FaceROITracker:
+    """
+    视频流的人脸区域跟踪: 每 detect_every 帧或跟踪得分过低时运行检测器,
+    其余帧在上一位置附近做模板匹配, 输出供三个模型使用的人脸裁剪
+
+    检测和跟踪都在缩小后的图像上进行; 未找到人脸时返回整帧(与不启用时相同)。
+    同一跟踪器的 update/crop 由自身的锁串行化, 不同跟踪器之间互不阻塞。
+    """
+
+    def __init__(self, detect_every: int = 10, min_track_score: float = 0.6,
+                 margin: float = 0.25, work_width: int = 320, search_scale: float = 2.0,
+                 detector: Optional[Callable[[np.ndarray], List[Box]]] = None):
+        """
+        Args:
+            detect_every: 两次检测之间最多跟踪的帧数
+            min_track_score: 模板匹配的最低归一化相关系数, 低于该值时立即重新检测
+            margin: 裁剪时人脸框每侧外扩的比例
+            work_width: 检测/跟踪所用图像的宽度(像素)
+            search_scale: 跟踪搜索窗口相对人脸框的边长倍数
+            detector: 检测函数 RGB图像 -> [(x, y, w, h), ...], 默认由 create_face_detector() 创建
+        """
+        self.cv2 = _import_cv2()
+        self.detect_every = max(1, detect_every)
+        self.min_track_score = min_track_score
+        self.margin = margin
+        self.work_width = work_width
+        self.search_scale = search_scale
+        self.detector = detector if detector is not None else create_face_detector()
+
+        self.detections = 0
+        self.tracked_frames = 0
+        self.missed_frames = 0
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """清除跟踪状态(切换视频流时调用)"""
+        self.box = None  # 缩小后图像中的人脸框
+        self.score = 0.0
+        self._template = None
+        self._frames_since_detection = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'detections': self.detections,
+            'tracked_frames': self.tracked_frames,
+            'missed_frames': self.missed_frames
+        }
+
+    def update(self, frame: np.ndarray) -> Optional[Box]:
+        """
+        处理一帧RGB图像, 返回原始帧坐标下的人脸框(未找到时为None)
+        """
+        with self._lock:
+            return self._update(frame)
+
+    def _update(self, frame: np.ndarray) -> Optional[Box]:
+        height, width = frame.shape[:2]
+        scale = min(1.0, self.work_width / width)
+        small = frame
+        if scale < 1.0:
+            small = self.cv2.resize(frame, (round(width * scale), round(height * scale)),
+                                    interpolation=self.cv2.INTER_AREA)
+        gray = self.cv2.cvtColor(small, self.cv2.COLOR_RGB2GRAY)
+
+        tracked = False
+        if self.box is not None and self._frames_since_detection < self.detect_every:
+            tracked = self._track(gray)
+        if not tracked:
+            self._detect(small, gray)
+
+        if self.box is None:
+            self.missed_frames += 1
+            return None
+        x, y, w, h = self.box
+        return (round(x / scale), round(y / scale), round(w / scale), round(h / scale))
+
+    def crop(self, frame: np.ndarray) -> Tuple[np.ndarray, Optional[Box]]:
+        """
+        返回 (外扩后的正方形人脸裁剪, 人脸框); 未找到人脸时返回 (整帧, None)
+        """
+        with self._lock:
+            box = self._update(frame)
+        if box is None:
+            return frame, None
+
+        height, width = frame.shape[:2]
+        x, y, w, h = box
+        side = min(round(max(w, h) * (1 + 2 * self.margin)), width, height)
+        x0 = min(max(0, x + w // 2 - side // 2), width - side)
+        y0 = min(max(0, y + h // 2 - side // 2), height - side)
+        return frame[y0:y0 + side, x0:x0 + side], box
+
+    def _detect(self, image: np.ndarray, gray: np.ndarray):
+        self.detections += 1
+        self._frames_since_detection = 0
+        # 检测器在图像边缘可能返回超出画面的框, 裁剪到画面内并丢弃面积为0的框
+        height, width = gray.shape[:2]
+        faces = []
+        for x, y, w, h in self.detector(image):
+            x0, y0 = max(0, x), max(0, y)
+            x1, y1 = min(width, x + w), min(height, y + h)
+            if x1 > x0 and y1 > y0:
+                faces.append((x0, y0, x1 - x0, y1 - y0))
+        if not faces:
+            self.reset()
+            return
+        # 驾驶员通常是画面中最大的人脸
+        x, y, w, h = max(faces, key=lambda face: face[2] * face[3])
+        self.box = (x, y, w, h)
+        self.score = 1.0
+        self._template = gray[y:y + h, x:x + w].copy()
+
+    def _track(self, gray: np.ndarray) -> bool:
+        """在上一位置附近做模板匹配, 得分足够高时更新人脸框"""
+        x, y = self.box[:2]
+        # 以模板的实际尺寸为准
+        h, w = self._template.shape[:2]
+        pad_x = int(w * (self.search_scale - 1) / 2)
+        pad_y = int(h * (self.search_scale - 1) / 2)
+        x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+        x1 = min(gray.shape[1], x + w + pad_x)
+        y1 = min(gray.shape[0], y + h + pad_y)
+        window = gray[y0:y1, x0:x1]
+        if h == 0 or w == 0 or window.shape[0] < h or window.shape[1] < w:
+            return False
+
+        scores = self.cv2.matchTemplate(window, self._template, self.cv2.TM_CCOEFF_NORMED)
+        _, score, _, (dx, dy) = self.cv2.minMaxLoc(scores)
+        if score < self.min_track_score:
+            return False
+
+        self.box = (x0 + dx, y0 + dy, w, h)
+        self.score = float(score)
+        self._frames_since_detection += 1
+        self.tracked_frames += 1
+        return True
+
+
+class FaceROITrackerRegistry:
+    """
+    按会话ID管理人脸区域跟踪器(单帧接口的监控流), 超出容量或空闲超时的会话按LRU淘汰
+
+    注册表的锁只保护会话的查找/淘汰/插入, 各会话的跟踪在自身的锁内并行进行;
+    所有会话共享一个检测器, 检测器不是线程安全的, 仅检测调用本身在单独的锁内串行执行。
+    """
+
+    def __init__(self, max_sessions: int = 10000, idle_timeout: float = 600.0,
+                 detector: Optional[Callable[[np.ndarray], List[Box]]] = None, **tracker_kwargs):
+        """
+        Args:
+            max_sessions: 同时保留的最大会话数
+            idle_timeout: 会话空闲超过该秒数后被淘汰
+            detector: 共享的检测函数, 默认由 create_face_detector() 创建
+            tracker_kwargs: 传给 FaceROITracker 的参数
+        """
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.detector = detector if detector is not None else create_face_detector()
+        self.tracker_kwargs = tracker_kwargs
+        self._trackers = OrderedDict()  # session_id -> (最近使用时间, 跟踪器)
+        self._lock = threading.Lock()
+        self._detector_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._trackers)
+
+    def crop(self, session_id: str, frame: np.ndarray) -> Tuple[np.ndarray, Optional[Box]]:
+        """用指定会话的跟踪器处理一帧, 返回值同 FaceROITracker.crop"""
+        with self._lock:
+            entry = self._trackers.pop(session_id, None)
+            if entry is None:
+                self._evict()
+                tracker = FaceROITracker(detector=self._detect, **self.tracker_kwargs)
+            else:
+                tracker = entry[1]
+            self._trackers[session_id] = (time.monotonic(), tracker)
+        return tracker.crop(frame)
+
+    def _detect(self, image: np.ndarray) -> List[Box]:
+        with self._detector_lock:
+            return self.detector(image)
+
+    def reset(self, session_id: str):
+        """结束会话并丢弃其状态"""
+        with self._lock:
+            self._trackers.pop(session_id, None)
+
+    def _evict(self):
+        """淘汰空闲超时的会话, 并保证为新会话留出空间(调用方需持有锁)"""
+        now = time.monotonic()
+        while self._trackers:
+            session_id, (last_used, _) = next(iter(self._trackers.items()))
+            if len(self._trackers) < self.max_sessions and now - last_used < self.idle_timeout:
+                break
+            del self._trackers[session_id]
\ No newline at end of file
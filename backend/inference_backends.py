@@ -0,0 +1,182 @@
+import os
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+# 导出的三个分支及其输入通道数; VA 分支为 特征提取器 + AffectNet回归头 的整条链路
+BRANCHES = {'au': 3, 'fer': 1, 'va': 3}
+
+# 各后端的文件扩展名(int8 为 quantization.py 生成的量化 TorchScript 模型)
+BACKEND_EXTENSIONS = {'onnx': '.onnx', 'torchscript': '.pt', 'int8': '.int8.pt'}
+
+
+def branch_modules(predictor) -> Dict[str, nn.Module]:
+    """取出已加载的eager模型, 按分支名组织"""
+    predictor.wait_until_loaded()
+    return {
+        'au': predictor.au_model,
+        'fer': predictor.fer_model,
+        'va': nn.Sequential(predictor.affect_feature_extractor, predictor.affect_model).eval()
+    }
+
+
+def branch_path(output_dir: str, branch: str, backend: str) -> str:
+    return os.path.join(output_dir, branch + BACKEND_EXTENSIONS[backend])
+
+
+def export_models(predictor, output_dir: str, backends: Iterable[str] = ('onnx', 'torchscript'),
+                  opset_version: int = 17, input_size: Tuple[int, int] = (224, 224)) -> Dict[str, str]:
+    """
+    将预测器中已加载的三个模型导出为 ONNX 和/或 TorchScript, batch 维为动态维度
+
+    注意: VA 链路中的特征提取器没有独立的权重文件, 导出文件固定了当前进程中的权重。
+
+    Args:
+        predictor: 使用 eager 后端加载的 IntegratedEmotionPredictor
+        output_dir: 导出目录
+        backends: 要导出的格式, 'onnx' / 'torchscript'
+        opset_version: ONNX opset 版本
+        input_size: 输入图像尺寸 (H, W)
+
+    Returns:
+        {'<分支>.<格式>': 文件路径}
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    exported = {}
+
+    for branch, module in branch_modules(predictor).items():
+        # BatchNorm/Dropout 必须处于推理模式; 示例输入用 batch=2 以免 batch 维被固定
+        module = module.eval()
+        example = torch.randn(2, BRANCHES[branch], *input_size, device=predictor.device)
+
+        for backend in backends:
+            path = branch_path(output_dir, branch, backend)
+            if backend == 'onnx':
+                torch.onnx.export(
+                    module, (example,), path,
+                    input_names=['input'], output_names=['output'],
+                    dynamic_axes={'input': {0: 'batch'}, 'output': {0: 'batch'}},
+                    opset_version=opset_version)
+            elif backend == 'torchscript':
+                with torch.no_grad():
+                    traced = torch.jit.freeze(torch.jit.trace(module, example))
+                torch.jit.save(traced, path)
+            else:
+                raise ValueError(f"未知的导出格式: {backend}")
+
+            exported[f'{branch}.{backend}'] = path
+            print(f"    ✓ 导出 {branch} -> {path}")
+
+    return exported
+
+
+class OnnxRuntimeModule:
+    """以 nn.Module 的调用方式运行 ONNX Runtime 会话"""
+
+    def __init__(self, model_path: str, device: torch.device, intra_op_threads: int = 0):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("ONNX 后端需要安装 onnxruntime") from e
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+
+        providers = ['CPUExecutionProvider']
+        if device.type == 'cuda' and 'CUDAExecutionProvider' in ort.get_available_providers():
+            providers.insert(0, 'CUDAExecutionProvider')
+
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=providers)
+        self.input_name = self.session.get_inputs()[0].name
+        self.device = device
+
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        inputs = {self.input_name: x.detach().cpu().numpy()}
+        outputs = self.session.run(None, inputs)[0]
+        return torch.from_numpy(outputs).to(x.device)
+
+    def eval(self):
+        return self
+
+
+def load_backend_models(backend: str, model_dir: str, device: torch.device,
+                        intra_op_threads: int = 0) -> Tuple:
+    """
+    加载导出的三个分支模型
+
+    Returns:
+        (au_model, fer_model, va_model), 调用方式与 eager 模型相同
+    """
+    models = []
+    for branch in BRANCHES:
+        path = branch_path(model_dir, branch, backend)
+        if backend == 'onnx':
+            model = OnnxRuntimeModule(path, device, intra_op_threads)
+        elif backend in ('torchscript', 'int8'):
+            if backend == 'int8' and device.type != 'cpu':
+                raise ValueError("int8 后端仅支持CPU推理")
+            model = torch.jit.load(path, map_location=device)
+            model.eval()
+        else:
+            raise ValueError(f"未知的推理后端: {backend}")
+        print(f"    ✓ 加载 {backend} 模型: {path}")
+        models.append(model)
+    return tuple(models)
+
+
+def check_parity(reference, candidate, images: torch.Tensor,
+                 atol: float = 1e-4) -> Dict[str, float]:
+    """
+    比较两个预测器在同一批uint8图像上的三分支输出
+
+    Args:
+        reference: 参照预测器(通常为 eager 后端)
+        candidate: 待验证的预测器
+        images: [N, 3, H, W] uint8张量
+        atol: 允许的最大绝对误差
+
+    Returns:
+        {'au_probs': 最大误差, 'fer_probs': ..., 'va_values': ...}
+
+    Raises:
+        AssertionError: 任一输出超出容差
+    """
+    expected = reference._run_branches(images)
+    actual = candidate._run_branches(images)
+
+    report = {}
+    for name, a, b in zip(('au_probs', 'fer_probs', 'va_values'), expected, actual):
+        report[name] = float(np.abs(a - b).max())
+
+    failed = {name: diff for name, diff in report.items() if diff > atol}
+    if failed:
+        raise AssertionError(f"输出超出容差 {atol}: {failed}")
+    return report
+
+
+def parity_report(reference, candidate, images: torch.Tensor,
+                  au_threshold: float = 0.5) -> Dict[str, Dict[str, float]]:
+    """
+    统计两个预测器在同一批uint8图像上的输出差异(不做断言)
+
+    Returns:
+        {'au_probs': {'max_abs', 'mean_abs', 'decision_agreement'},
+         'fer_probs': {'max_abs', 'mean_abs', 'top1_agreement'},
+         'va_values': {'max_abs', 'mean_abs'}}
+    """
+    expected = reference._run_branches(images)
+    actual = candidate._run_branches(images)
+
+    report = {}
+    for name, a, b in zip(('au_probs', 'fer_probs', 'va_values'), expected, actual):
+        diff = np.abs(a.astype(np.float64) - b.astype(np.float64))
+        report[name] = {'max_abs': float(diff.max()), 'mean_abs': float(diff.mean())}
+    report['au_probs']['decision_agreement'] = float(
+        ((expected[0] > au_threshold) == (actual[0] > au_threshold)).mean())
+    report['fer_probs']['top1_agreement'] = float(
+        (expected[1].argmax(axis=1) == actual[1].argmax(axis=1)).mean())
+    return report
\ No newline at end of file
@@ -0,0 +1,468 @@
+"""
+轻量级运行时指标: 各阶段耗时直方图(p50/p95/p99)、请求/错误计数、批大小和队列深度, 以 Prometheus 文本格式导出
+
+METRICS_ENABLED=0 (或 set_enabled(False)) 时 timed() 返回空上下文, 不读取时钟也不记录样本。
+
+耗时和批大小使用固定分桶的直方图(而不是按进程计算的滑动窗口分位数): 分桶计数可以在多个
+进程之间直接相加, Prometheus 端用 histogram_quantile() 计算任意分位数; 预派生服务的各
+worker 通过 enable_multiprocess() 将快照写入共享目录, /metrics 汇总所有进程的值。
+"""
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# 阶段耗时分桶(秒): 覆盖规则推断(数十微秒)到CPU上的大批量前向(数秒)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+enabled = os.environ.get('METRICS_ENABLED', '1') == '1'
+
+
+def set_enabled(value: bool):
+    """开启或关闭耗时统计(计数器和队列深度不受影响)"""
+    global enabled
+    enabled = bool(value)
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """按标签值取子指标(首次使用时创建)"""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def reset(self):
+        """丢弃已记录的值"""
+        with self._lock:
+            self._children.clear()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Any]:
+        """{标签值: 可JSON序列化的当前值}"""
+        raise NotImplementedError
+
+    @staticmethod
+    def merge(values: List[Any]) -> Any:
+        """合并多个进程中同一标签的值"""
+        raise NotImplementedError
+
+    def _samples(self, snapshot: Dict[Tuple[str, ...], Any]) -> List[str]:
+        raise NotImplementedError
+
+    def render(self, snapshot: Optional[Dict[Tuple[str, ...], Any]] = None) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type_name}']
+        lines.extend(self._samples(self.snapshot() if snapshot is None else snapshot))
+        return '\n'.join(lines)
+
+
+class _CounterChild:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+
+    type_name = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def snapshot(self) -> Dict[Tuple[str, ...], float]:
+        return {key: child.value for key, child in list(self._children.items())}
+
+    @staticmethod
+    def merge(values: List[float]) -> float:
+        return sum(values)
+
+    def _samples(self, snapshot: Dict[Tuple[str, ...], float]) -> List[str]:
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {value}'
+                for key, value in snapshot.items()]
+
+
+class _HistogramChild:
+    """各分桶的样本数(最后一个为 +Inf)及累计的样本总和"""
+
+    __slots__ = ('buckets', 'counts', 'total', '_lock')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        # 与 Prometheus 的 le 语义一致: 落在 (上一个边界, 边界] 内
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'counts': list(self.counts), 'sum': self.total}
+
+
+def histogram_quantile(q: float, buckets: Sequence[float], counts: Sequence[int]) -> float:
+    """
+    由分桶计数估计分位数(桶内线性插值, 与 Prometheus 的 histogram_quantile() 相同)
+
+    Args:
+        q: 分位数 (0, 1)
+        buckets: 各桶上界(不含 +Inf)
+        counts: 各桶(非累计)样本数, 最后一个为 +Inf 桶
+    """
+    total = sum(counts)
+    if not total:
+        return float('nan')
+    rank = q * total
+    cumulative = 0
+    for index, count in enumerate(counts):
+        if cumulative + count >= rank and count:
+            if index == len(buckets):
+                # 落在 +Inf 桶: 只能返回最大的有限上界
+                return float(buckets[-1])
+            lower = buckets[index - 1] if index > 0 else 0.0
+            return lower + (buckets[index] - lower) * (rank - cumulative) / count
+        cumulative += count
+    return float(buckets[-1])
+
+
+class Histogram(_Metric):
+    """固定分桶直方图: 导出 _bucket / _count / _sum, 分位数由分桶计数估计"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(float(bound) for bound in sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Dict[str, Any]]:
+        return {key: child.snapshot() for key, child in list(self._children.items())}
+
+    @staticmethod
+    def merge(values: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {'counts': [sum(counts) for counts in zip(*(value['counts'] for value in values))],
+                'sum': sum(value['sum'] for value in values)}
+
+    def _samples(self, snapshot: Dict[Tuple[str, ...], Dict[str, Any]]) -> List[str]:
+        lines = []
+        for key, value in snapshot.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), value['counts']):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{bound}"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+            lines.append(f'{self.name}_sum{labels} {value["sum"]}')
+        return lines
+
+
+class _GaugeChild:
+    __slots__ = ('function',)
+
+    def __init__(self):
+        self.function = None
+
+    def set_function(self, function: Callable[[], float]):
+        """导出时调用 function 取当前值"""
+        self.function = function
+
+
+class Gauge(_Metric):
+    """导出时读取的瞬时值(多进程时为各存活进程之和)"""
+
+    type_name = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def snapshot(self) -> Dict[Tuple[str, ...], float]:
+        return {key: float(child.function()) for key, child in list(self._children.items())
+                if child.function is not None}
+
+    @staticmethod
+    def merge(values: List[float]) -> float:
+        return sum(values)
+
+    def _samples(self, snapshot: Dict[Tuple[str, ...], float]) -> List[str]:
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {value}'
+                for key, value in snapshot.items()]
+
+
+STAGE_SECONDS = Histogram('drive_state_stage_seconds',
+                          'Latency of each inference stage in seconds', ['stage'])
+BATCH_SIZE = Histogram('drive_state_batch_size', 'Number of images per model forward',
+                       buckets=BATCH_SIZE_BUCKETS)
+REQUESTS = Counter('drive_state_requests_total', 'HTTP requests handled', ['endpoint'])
+ERRORS = Counter('drive_state_errors_total', 'HTTP requests that failed', ['endpoint'])
+ITEMS = Counter('drive_state_items_total',
+                'Images or video frames returned by batch and streaming endpoints', ['endpoint'])
+ITEM_ERRORS = Counter('drive_state_item_errors_total',
+                      'Images or video streams that failed inside a batch or streaming response',
+                      ['endpoint'])
+QUEUE_DEPTH = Gauge('drive_state_queue_depth', 'Requests waiting in a queue', ['queue'])
+BRANCH_RUNS = Counter('drive_state_cascade_branch_runs_total',
+                      'Images a model branch was run for in cascade mode', ['branch'])
+BRANCH_SKIPS = Counter('drive_state_cascade_branch_skips_total',
+                       'Images a model branch was skipped for in cascade mode', ['branch'])
+MOTION_GATE = Counter('drive_state_motion_gate_total',
+                      'Session frames checked by the motion gate', ['result'])
+
+REGISTRY = [STAGE_SECONDS, BATCH_SIZE, REQUESTS, ERRORS, ITEMS, ITEM_ERRORS, QUEUE_DEPTH,
+            BRANCH_RUNS, BRANCH_SKIPS, MOTION_GATE]
+
+
+class _StageTimer:
+    __slots__ = ('child', 'start')
+
+    def __init__(self, child: _HistogramChild):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.child.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timed(stage: str):
+    """
+    统计代码块耗时:
+
+        with metrics.timed('decode'):
+            ...
+    """
+    if not enabled:
+        return _NULL_TIMER
+    return _StageTimer(STAGE_SECONDS.labels(stage))
+
+
+def observe_batch_size(size: int):
+    if enabled:
+        BATCH_SIZE.observe(size)
+
+
+def record_branches(branch: str, runs: int, skips: int):
+    """级联推理中分支的运行/跳过图像数"""
+    BRANCH_RUNS.labels(branch).inc(runs)
+    BRANCH_SKIPS.labels(branch).inc(skips)
+
+
+def record_motion_gate(hit: bool):
+    """运动门控命中(复用上次结果)或未命中(需要推理)"""
+    MOTION_GATE.labels('hit' if hit else 'miss').inc()
+
+
+def record_request(endpoint: str, failed: bool = False):
+    REQUESTS.labels(endpoint).inc()
+    if failed:
+        ERRORS.labels(endpoint).inc()
+
+
+def record_items(endpoint: str, count: int, failed: int = 0):
+    """
+    批量/流式接口中逐项的结果: 响应状态码已是200, 单张图片或视频流的失败只能在这里统计
+
+    Args:
+        endpoint: 路由
+        count: 返回的结果行数
+        failed: 其中失败的行数
+    """
+    if count:
+        ITEMS.labels(endpoint).inc(count)
+    if failed:
+        ITEM_ERRORS.labels(endpoint).inc(failed)
+
+
+# 多进程模式下各进程写入快照的目录(None 为单进程)
+_multiprocess_dir = None
+# 本进程快照文件的标识 (pid, 首次写入时间): 加入时间是因为 worker 重启后PID可能被复用,
+# 只按PID命名时新进程会覆盖已退出进程的计数
+_snapshot_id = None
+
+
+def clear_multiprocess_dir(directory: str):
+    """创建快照目录并删除上一次运行留下的快照(预派生主进程在fork前调用)"""
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        os.remove(path)
+
+
+def _snapshot_path() -> str:
+    global _snapshot_id
+    pid = os.getpid()
+    # fork 出的子进程继承父进程的标识, 以PID是否变化判断
+    if _snapshot_id is None or _snapshot_id[0] != pid:
+        _snapshot_id = (pid, time.time_ns())
+    return os.path.join(_multiprocess_dir, f'{pid}-{_snapshot_id[1]}.json')
+
+
+def _local_snapshot() -> Dict[str, List]:
+    return {metric.name: [[list(key), value] for key, value in metric.snapshot().items()]
+            for metric in REGISTRY}
+
+
+def write_snapshot():
+    """将本进程的当前值写入 <目录>/<pid>-<启动时间>.json (先写临时文件再替换, 读取方不会读到半个文件)"""
+    if _multiprocess_dir is None:
+        return
+    path = _snapshot_path()
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(_local_snapshot(), f)
+    os.replace(path + '.tmp', path)
+
+
+def enable_multiprocess(directory: str, interval: float = 1.0):
+    """
+    在预派生 worker 中启用多进程汇总: 丢弃从主进程继承的计数, 之后每 interval 秒
+    写一次本进程的快照; render_metrics() 合并目录中所有进程的快照
+
+    已退出进程的计数器/直方图仍计入总数(保证单调递增), 队列深度只统计存活的进程。
+    """
+    global _multiprocess_dir
+    for metric in REGISTRY:
+        if not isinstance(metric, Gauge):
+            metric.reset()
+    _multiprocess_dir = directory
+
+    def flush():
+        while True:
+            time.sleep(interval)
+            try:
+                write_snapshot()
+            except OSError as e:
+                print(f"  ! 写入指标快照失败: {e}")
+
+    threading.Thread(target=flush, daemon=True, name='metrics-snapshot').start()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _merged_snapshots() -> Dict[str, Dict[Tuple[str, ...], Any]]:
+    """读取所有进程的快照, 按指标和标签合并"""
+    write_snapshot()
+    gauges = {metric.name for metric in REGISTRY if isinstance(metric, Gauge)}
+    collected = {metric.name: {} for metric in REGISTRY}
+    snapshots = []  # (pid, 启动时间, 快照)
+    for path in glob.glob(os.path.join(_multiprocess_dir, '*.json')):
+        try:
+            pid, started = (int(part) for part in
+                            os.path.basename(path)[:-len('.json')].split('-'))
+            with open(path, encoding='utf-8') as f:
+                snapshots.append((pid, started, json.load(f)))
+        except (OSError, ValueError) as e:
+            print(f"  ! 跳过无法读取的指标快照 {path}: {e}")
+    # 同一PID有多个快照时(PID被复用), 只有最新的一个可能属于存活的进程
+    latest = {}
+    for pid, started, _ in snapshots:
+        latest[pid] = max(started, latest.get(pid, started))
+    for pid, started, snapshot in snapshots:
+        alive = started == latest[pid] and (pid == os.getpid() or _pid_alive(pid))
+        for name, entries in snapshot.items():
+            if name not in collected or (name in gauges and not alive):
+                continue
+            for key, value in entries:
+                collected[name].setdefault(tuple(key), []).append(value)
+    return {metric.name: {key: metric.merge(values)
+                          for key, values in collected[metric.name].items()}
+            for metric in REGISTRY}
+
+
+def stage_quantiles() -> Dict[str, Dict[str, float]]:
+    """
+    由耗时直方图估计各阶段的 p50/p95/p99 (毫秒), 供 /health 展示;
+    多进程模式下为所有进程的汇总。精度受分桶边界限制, 精确分析请使用 /metrics
+    """
+    if _multiprocess_dir is None:
+        snapshot = STAGE_SECONDS.snapshot()
+    else:
+        snapshot = _merged_snapshots()[STAGE_SECONDS.name]
+    quantiles = {}
+    for (stage,), value in snapshot.items():
+        if sum(value['counts']):
+            quantiles[stage] = {
+                f'p{round(q * 100)}': histogram_quantile(q, STAGE_SECONDS.buckets,
+                                                         value['counts']) * 1000.0
+                for q in QUANTILES}
+    return quantiles
+
+
+def render_metrics() -> str:
+    """Prometheus 文本格式(text/plain; version=0.0.4); 多进程模式下为所有进程的汇总"""
+    if _multiprocess_dir is None:
+        return '\n'.join(metric.render() for metric in REGISTRY) + '\n'
+    merged = _merged_snapshots()
+    return '\n'.join(metric.render(merged[metric.name]) for metric in REGISTRY) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
\ No newline at end of file
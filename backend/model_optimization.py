@@ -0,0 +1,112 @@
+from typing import List, Tuple
+
+import torch
+import torch.nn as nn
+from torch.nn.utils.fusion import fuse_conv_bn_eval, fuse_linear_bn_eval
+
+# 可折叠的 (前一层, BatchNorm) 类型组合
+_FOLDABLE = ((nn.Conv2d, nn.BatchNorm2d), (nn.Linear, nn.BatchNorm1d))
+
+
+def _foldable(layer: nn.Module, norm: nn.Module) -> bool:
+    return any(type(layer) is layer_type and type(norm) is norm_type
+               for layer_type, norm_type in _FOLDABLE) and norm.track_running_stats
+
+
+def _graph_pairs(model: nn.Module) -> List[Tuple[str, str]]:
+    """用 FX 追踪前向, 找出输出只被紧随其后的BatchNorm使用的 conv/linear 层"""
+    modules = dict(model.named_modules())
+    graph = torch.fx.symbolic_trace(model).graph
+    calls = {}
+    for node in graph.nodes:
+        if node.op == 'call_module':
+            calls[node.target] = calls.get(node.target, 0) + 1
+
+    pairs = []
+    for node in graph.nodes:
+        if node.op != 'call_module' or len(node.args) != 1:
+            continue
+        previous = node.args[0]
+        if not isinstance(previous, torch.fx.Node) or previous.op != 'call_module' \
+                or len(previous.users) != 1:
+            continue
+        # 被多处调用的共享模块不能折叠
+        if calls[previous.target] != 1 or calls[node.target] != 1:
+            continue
+        if _foldable(modules[previous.target], modules[node.target]):
+            pairs.append((previous.target, node.target))
+    return pairs
+
+
+def _sequential_pairs(model: nn.Module) -> List[Tuple[str, str]]:
+    """无法追踪时的保守做法: 只折叠 nn.Sequential 中相邻的层"""
+    pairs = []
+    for name, module in model.named_modules():
+        if not isinstance(module, nn.Sequential):
+            continue
+        children = list(module.named_children())
+        for (layer_name, layer), (norm_name, norm) in zip(children, children[1:]):
+            if _foldable(layer, norm):
+                prefix = f'{name}.' if name else ''
+                pairs.append((prefix + layer_name, prefix + norm_name))
+    return pairs
+
+
+def _set_submodule(model: nn.Module, name: str, module: nn.Module):
+    parent_name, _, attr = name.rpartition('.')
+    parent = model.get_submodule(parent_name) if parent_name else model
+    setattr(parent, attr, module)
+
+
+def fold_batch_norm(model: nn.Module) -> int:
+    """
+    将推理模式下的 BatchNorm 折叠进前一个 Conv2d / Linear 的权重和偏置, BN替换为 Identity
+
+    Args:
+        model: 处于 eval() 模式的模型(原地修改)
+
+    Returns:
+        折叠的层数
+    """
+    if model.training:
+        raise ValueError("BatchNorm 折叠只适用于 eval() 模式的模型")
+    try:
+        pairs = _graph_pairs(model)
+    except Exception:
+        pairs = _sequential_pairs(model)
+
+    with torch.no_grad():
+        for layer_name, norm_name in pairs:
+            layer = model.get_submodule(layer_name)
+            norm = model.get_submodule(norm_name)
+            fuse = fuse_conv_bn_eval if isinstance(layer, nn.Conv2d) else fuse_linear_bn_eval
+            _set_submodule(model, layer_name, fuse(layer, norm))
+            _set_submodule(model, norm_name, nn.Identity())
+    return len(pairs)
+
+
+def has_conv(model: nn.Module) -> bool:
+    return any(isinstance(module, nn.Conv2d) for module in model.modules())
+
+
+def optimize_model(model: nn.Module, channels_last: bool = True,
+                   compile_model: bool = False, compile_mode: str = 'default') -> nn.Module:
+    """
+    推理优化: BatchNorm折叠 -> channels_last 内存布局(仅卷积模型) -> 可选 torch.compile
+
+    Args:
+        model: 处于 eval() 模式的模型
+        channels_last: 卷积模型是否转换为 NHWC 内存布局
+        compile_model: 是否用 torch.compile 编译
+        compile_mode: torch.compile 的 mode 参数
+
+    Returns:
+        优化后的模型(compile 时为编译后的包装模块)
+    """
+    fold_batch_norm(model)
+    if channels_last and has_conv(model):
+        model = model.to(memory_format=torch.channels_last)
+    if compile_model:
+        # 批大小可变, 以动态形状编译避免每种批大小各编译一次
+        model = torch.compile(model, mode=compile_mode, dynamic=True)
+    return model
\ No newline at end of file
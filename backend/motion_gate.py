@@ -0,0 +1,155 @@
+import io
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+import metrics
+
+# 差异签名的尺寸(宽, 高)
+SIGNATURE_SIZE = (32, 24)
+
+
+def frame_signature(image: Union[bytes, bytearray, memoryview, np.ndarray, Image.Image],
+                    size: Tuple[int, int] = SIGNATURE_SIZE) -> np.ndarray:
+    """
+    计算帧的差异签名: 缩小到 size 的灰度图, 取值 [0, 1]
+
+    JPEG 以 draft 模式解码(按DCT系数缩放), 开销只有完整解码的一小部分。
+
+    Args:
+        image: 编码后的图像字节、RGB uint8数组或PIL图像
+        size: 签名尺寸(宽, 高)
+    """
+    if isinstance(image, np.ndarray):
+        image = Image.fromarray(image)
+    elif not isinstance(image, Image.Image):
+        image = Image.open(io.BytesIO(image))
+        image.draft('L', size)
+    # BOX 缩放即区域平均, 可抑制传感器噪声
+    gray = image.convert('L').resize(size, Image.BOX)
+    return np.asarray(gray, dtype=np.float32) / 255.0
+
+
+class MotionGate:
+    """
+    单个视频流的运动门控: 当前帧与上一次推理帧的签名差异低于阈值时复用上次结果
+
+    与上一次"推理"帧而非上一帧比较, 缓慢的累积变化最终也会超过阈值;
+    连续复用次数和结果的存在时间都有上限, 保证结果不会无限陈旧。
+    """
+
+    def __init__(self, threshold: float = 0.02, max_reuse: int = 10,
+                 max_age: Optional[float] = 2.0):
+        """
+        Args:
+            threshold: 签名的平均绝对差异阈值(灰度 0~1)
+            max_reuse: 两次推理之间最多复用的帧数
+            max_age: 复用结果的最长存在时间(秒), None 表示不限
+        """
+        self.threshold = threshold
+        self.max_reuse = max_reuse
+        self.max_age = max_age
+
+        self.last_update = time.monotonic()
+        self._signature = None
+        self._value = None
+        self._inferred_at = 0.0
+        self._reuses = 0
+
+    def lookup(self, signature: np.ndarray) -> Optional[Any]:
+        """可以复用时返回上一次推理保存的结果, 否则返回None(需要推理)"""
+        now = time.monotonic()
+        self.last_update = now
+        if self._signature is None or self._reuses >= self.max_reuse:
+            return None
+        if self.max_age is not None and now - self._inferred_at > self.max_age:
+            return None
+        if float(np.abs(signature - self._signature).mean()) >= self.threshold:
+            return None
+        self._reuses += 1
+        return self._value
+
+    def store(self, signature: np.ndarray, value: Any):
+        """记录一次推理的签名和结果"""
+        self._signature = signature
+        self._value = value
+        self._inferred_at = self.last_update = time.monotonic()
+        self._reuses = 0
+
+
+class MotionGateRegistry:
+    """按会话ID管理运动门控, 超出容量或空闲超时的会话按LRU淘汰"""
+
+    def __init__(self, max_sessions: int = 10000, idle_timeout: float = 600.0, **gate_kwargs):
+        """
+        Args:
+            max_sessions: 同时保留的最大会话数
+            idle_timeout: 会话空闲超过该秒数后被淘汰
+            gate_kwargs: 传给 MotionGate 的参数
+        """
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.gate_kwargs = gate_kwargs
+        self._gates = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._gates)
+
+    def lookup(self, session_id: str, signature: np.ndarray) -> Optional[Any]:
+        """查询指定会话能否复用上一次推理的结果"""
+        with self._lock:
+            gate = self._gates.get(session_id)
+            value = None
+            if gate is not None:
+                self._gates.move_to_end(session_id)
+                value = gate.lookup(signature)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        metrics.record_motion_gate(value is not None)
+        return value
+
+    def store(self, session_id: str, signature: np.ndarray, value: Any):
+        """记录指定会话最近一次推理的签名和结果"""
+        with self._lock:
+            gate = self._gates.get(session_id)
+            if gate is None:
+                self._evict()
+                gate = MotionGate(**self.gate_kwargs)
+                self._gates[session_id] = gate
+            else:
+                self._gates.move_to_end(session_id)
+            gate.store(signature, value)
+
+    def reset(self, session_id: str):
+        """结束会话并丢弃其状态"""
+        with self._lock:
+            self._gates.pop(session_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'sessions': len(self._gates),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+    def _evict(self):
+        """淘汰空闲超时的会话, 并保证为新会话留出空间(调用方需持有锁)"""
+        now = time.monotonic()
+        while self._gates:
+            session_id, gate = next(iter(self._gates.items()))
+            if len(self._gates) < self.max_sessions and \
+                    now - gate.last_update < self.idle_timeout:
+                break
+            del self._gates[session_id]
\ No newline at end of file
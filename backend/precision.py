@@ -0,0 +1,51 @@
+from typing import Optional, Tuple
+
+import torch
+
+# 推理精度 -> autocast 数据类型(fp32 不启用 autocast)
+PRECISIONS = {'fp32': None, 'bf16': torch.bfloat16, 'fp16': torch.float16}
+
+
+def supports_bf16(device: torch.device) -> bool:
+    """GPU: 由CUDA判断; CPU: 需要 AVX512-BF16 或 AMX 指令(否则bf16比fp32更慢)"""
+    if device.type == 'cuda':
+        return torch.cuda.is_bf16_supported()
+    cpu = getattr(torch, 'cpu', None)
+    for check in ('_is_avx512_bf16_supported', '_is_amx_tile_supported'):
+        if hasattr(cpu, check) and getattr(cpu, check)():
+            return True
+    return False
+
+
+def supports_fp16(device: torch.device) -> bool:
+    """fp16 只在GPU上启用(CPU上除 AMX-FP16 外没有原生fp16计算)"""
+    if device.type == 'cuda':
+        return True
+    cpu = getattr(torch, 'cpu', None)
+    return hasattr(cpu, '_is_amx_fp16_supported') and cpu._is_amx_fp16_supported()
+
+
+def resolve_precision(precision: str, device: torch.device,
+                      backend: str = 'torch') -> Tuple[str, Optional[torch.dtype]]:
+    """
+    根据硬件和推理后端确定实际使用的精度, 不支持时自动回退
+
+    回退顺序: fp16 -> bf16 -> fp32; 非 eager 后端始终为 fp32(精度由导出/量化的模型决定)
+
+    Returns:
+        (实际精度名称, autocast 数据类型或None)
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"未知的推理精度: {precision}, 可选 {list(PRECISIONS)}")
+
+    resolved = precision
+    if backend != 'torch':
+        resolved = 'fp32'
+    if resolved == 'fp16' and not supports_fp16(device):
+        resolved = 'bf16'
+    if resolved == 'bf16' and not supports_bf16(device):
+        resolved = 'fp32'
+
+    if resolved != precision:
+        print(f"    ! 当前硬件/后端不支持 {precision} 推理, 回退到 {resolved}")
+    return resolved, PRECISIONS[resolved]
\ No newline at end of file
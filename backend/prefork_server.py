@@ -0,0 +1,170 @@
+"""
+预派生多进程服务: 主进程加载一次模型, fork 出多个 worker 共享同一监听端口
+
+模型权重在fork后以写时复制方式共享(推理不写权重, 内存页不会被复制), 内存占用随
+worker数次线性增长; 每个worker有独立的GIL和intra-op线程数, 预处理/规则推断可用满多核。
+
+注意:
+  - 仅支持CPU推理(CUDA上下文无法跨fork使用)
+  - 会话时序状态和结果缓存的内存层保存在各worker内: 同一会话应复用同一长连接(连接
+    始终由接受它的worker处理); 结果缓存可配置 RESULT_CACHE_DIR 在worker间共享磁盘层
+  - 各worker的指标快照写入 METRICS_MULTIPROC_DIR(默认为临时目录), 任一worker的
+    /metrics 均返回所有worker的汇总
+
+用法:
+    python prefork_server.py --workers 4 --threads-per-worker 2
+"""
+import argparse
+import os
+
+# 主进程只负责加载模型和管理worker, 不创建intra-op线程池(fork后线程池状态不可用)
+os.environ['OMP_NUM_THREADS'] = '1'
+os.environ['MKL_NUM_THREADS'] = '1'
+
+import gc
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+
+import torch
+from werkzeug.serving import make_server
+
+import metrics
+
+# worker 启动后在该时间内退出视为启动失败, 重启前等待, 避免反复fork
+MIN_WORKER_LIFETIME = 1.0
+
+
+def _create_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(service, sock: socket.socket, index: int, threads: int, metrics_dir: str):
+    """worker 进程入口: 设置线程数, 启动本进程的后台线程, 在共享socket上处理请求"""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    torch.set_num_threads(threads)
+    metrics.enable_multiprocess(metrics_dir)
+
+    service.start_scheduler()
+    service.start_warmup()
+    host, port = sock.getsockname()[:2]
+    server = make_server(host, port, service.app, threaded=True, fd=sock.fileno())
+    print(f"  worker {index} (pid {os.getpid()}) 已启动, intra-op 线程数 {threads}")
+    server.serve_forever()
+
+
+def _spawn(service, sock: socket.socket, index: int, threads: int, metrics_dir: str) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            _run_worker(service, sock, index, threads, metrics_dir)
+        except BaseException as e:
+            print(f"  worker {index} 异常退出: {e}")
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def serve(workers: int, threads_per_worker: int, host: str = '0.0.0.0', port: int = 5001):
+    """
+    加载模型并运行预派生服务, worker 意外退出时自动重启
+
+    Args:
+        workers: worker 进程数
+        threads_per_worker: 每个worker的 torch intra-op 线程数
+        host: 监听地址
+        port: 监听端口
+    """
+    torch.set_num_threads(1)
+    import python_service as service
+
+    predictor = service.predictor
+    if predictor.device.type == 'cuda':
+        sys.exit("预派生模式仅支持CPU推理, GPU 请使用单进程服务")
+    # lazy 模式下须在fork前完成加载, 否则每个worker会各自加载一份
+    predictor.wait_until_loaded()
+
+    sock = _create_socket(host, port)
+
+    metrics_dir = os.environ.get('METRICS_MULTIPROC_DIR')
+    owns_metrics_dir = metrics_dir is None
+    if owns_metrics_dir:
+        metrics_dir = tempfile.mkdtemp(prefix='drive_state_metrics_')
+    metrics.clear_multiprocess_dir(metrics_dir)
+
+    # 冻结已有对象, 避免fork后垃圾回收修改对象头导致共享内存页被复制
+    gc.collect()
+    gc.freeze()
+
+    children = {}  # pid -> (worker序号, 启动时间)
+    for index in range(workers):
+        pid = _spawn(service, sock, index, threads_per_worker, metrics_dir)
+        children[pid] = (index, time.monotonic())
+    print(f"预派生服务监听 {host}:{port}, worker 数 {workers}")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        if pid not in children:
+            continue
+        index, started_at = children.pop(pid)
+        if stopping:
+            continue
+        print(f"  worker {index} (pid {pid}) 已退出, 状态 {status}, 正在重启")
+        if time.monotonic() - started_at < MIN_WORKER_LIFETIME:
+            time.sleep(MIN_WORKER_LIFETIME)
+        pid = _spawn(service, sock, index, threads_per_worker, metrics_dir)
+        children[pid] = (index, time.monotonic())
+
+    sock.close()
+    if owns_metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+def main():
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description='预派生多进程检测服务')
+    parser.add_argument('--workers', type=int,
+                        default=int(os.environ.get('PREFORK_WORKERS', '0')) or max(1, cpu_count // 2))
+    parser.add_argument('--threads-per-worker', type=int,
+                        default=int(os.environ.get('PREFORK_THREADS_PER_WORKER', '0')),
+                        help='每个worker的intra-op线程数, 默认按CPU核数平均分配')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5001)
+    args = parser.parse_args()
+
+    threads = args.threads_per_worker or max(1, cpu_count // args.workers)
+    serve(args.workers, threads, args.host, args.port)
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
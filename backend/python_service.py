@@ -1,77 +1,517 @@
-from flask import Flask, request, jsonify
-from werkzeug.utils import secure_filename
+import time
+
+# 服务冷启动计时起点
+_startup_begin = time.perf_counter()
+
+from flask import Flask, Request, Response, request, jsonify, stream_with_context
 import sys
 import os
+import io
+import json
+import tempfile
+import numpy as np
 
 sys.path.append('/path/to/your/model')  # 添加你的模型路径
 
 from three import IntegratedEmotionPredictor
-from driving_state_inference import DrivingStateInference
+from driving_state_inference import CompactResult, DrivingStateInference
+from batch_scheduler import MicroBatchScheduler
+from cascade import DEFAULT_ORDER, CascadePredictor
+from video_pipeline import analyze_video
+from face_roi import FaceROITracker, FaceROITrackerRegistry, create_face_detector
+from driving_state_tracker import DrivingStateTracker, DrivingStateTrackerRegistry
+from warmup import WarmupRunner
+from result_cache import ResultCache
+from columnar_export import FORMATS as COLUMNAR_FORMATS, ColumnarWriter, columns_from_results
+from motion_gate import MotionGateRegistry, frame_signature
+import metrics
+
+# 启动各阶段耗时(秒)
+startup_timings = {'imports': time.perf_counter() - _startup_begin}
+
+
+# 上传文件边接收边写入磁盘临时文件的接口: 视频只能按路径解码, 不必先整段读入内存再拷贝
+DISK_UPLOAD_ENDPOINTS = {'detect_video'}
+
+
+class InMemoryRequest(Request):
+    """
+    上传文件默认保存在内存中, 不写入临时文件;
+    DISK_UPLOAD_ENDPOINTS 中的接口改为流式写入命名临时文件, 请求结束时删除未被接管的文件
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload_paths = []
+
+    def _get_file_stream(self, total_content_length, content_type,
+                         filename=None, content_length=None):
+        if self.endpoint in DISK_UPLOAD_ENDPOINTS:
+            suffix = os.path.splitext(filename or '')[1]
+            stream = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+            self.upload_paths.append(stream.name)
+            return stream
+        return io.BytesIO()
+
+    def take_upload(self, file) -> str:
+        """接管写入磁盘的上传文件: 关闭写入句柄并返回路径, 此后由调用方负责删除"""
+        file.stream.close()
+        self.upload_paths.remove(file.stream.name)
+        return file.stream.name
+
+    def close(self):
+        super().close()
+        for path in self.upload_paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.upload_paths = []
+
 
 app = Flask(__name__)
+app.request_class = InMemoryRequest
 app.config['MAX_CONTENT_LENGTH'] = 52428800  # 50MB
 
 # 初始化模型（在启动时只加载一次）
 print("Initializing models...")
+_phase_begin = time.perf_counter()
 predictor = IntegratedEmotionPredictor(
     au_model_path='models/alexnet_ensemble.pth',
     fer_model_path='models/best_checkpoint.tar',
     affect_model_path='models/AffectNet.pth',
-    device='cuda'
+    device='cuda',
+    # 三分支并发执行, 降低单图延迟
+    parallel_branches=os.environ.get('PARALLEL_BRANCHES', '0') == '1',
+    # 推理后端: torch / onnx / torchscript / int8
+    # (onnx/torchscript 需先运行 export_models.py, int8 需先运行 quantize_models.py)
+    backend=os.environ.get('INFERENCE_BACKEND', 'torch'),
+    backend_model_dir=os.environ.get('BACKEND_MODEL_DIR', 'models/exported'),
+    # 模型加载方式: sequential / parallel / lazy(后台加载, 先绑定端口)
+    load_mode=os.environ.get('MODEL_LOAD_MODE', 'parallel'),
+    # 推理优化: BatchNorm折叠 + channels_last, 以及可选的 torch.compile(仅 torch 后端)
+    optimize=os.environ.get('OPTIMIZE_MODELS', '0') == '1',
+    compile_models=os.environ.get('COMPILE_MODELS', '0') == '1',
+    # 前向精度: fp32 / bf16 / fp16, 硬件不支持时自动回退
+    precision=os.environ.get('INFERENCE_PRECISION', 'fp32')
 )
 driving_state_engine = DrivingStateInference()
+startup_timings['models'] = time.perf_counter() - _phase_begin
 
+# 动态微批: 合并并发的单图请求(MICRO_BATCH_SIZE=1 时关闭)
+MICRO_BATCH_SIZE = int(os.environ.get('MICRO_BATCH_SIZE', '8'))
+MICRO_BATCH_WAIT_MS = float(os.environ.get('MICRO_BATCH_WAIT_MS', '5'))
+scheduler = None  # 由 start_scheduler() 在服务进程中创建
 
-@app.route('/api/detect/image', methods=['POST'])
-def detect_image():
-    try:
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file provided'}), 400
+# 预热: 在各批大小上执行合成批次, 完成前 /ready 返回未就绪(WARMUP_ITERATIONS=0 时跳过)
+WARMUP_BATCH_SIZES = [int(size) for size in
+                      os.environ.get('WARMUP_BATCH_SIZES', f'1,{MICRO_BATCH_SIZE}').split(',')]
+WARMUP_ITERATIONS = int(os.environ.get('WARMUP_ITERATIONS', '3'))
+# 预热失败时的重试次数和间隔(秒); 重试用尽后以降级状态就绪(/ready 中 degraded=true)
+WARMUP_RETRIES = int(os.environ.get('WARMUP_RETRIES', '2'))
+WARMUP_RETRY_DELAY = float(os.environ.get('WARMUP_RETRY_DELAY', '5'))
+warmup_runner = WarmupRunner(predictor, driving_state_engine,
+                             batch_sizes=WARMUP_BATCH_SIZES, iterations=WARMUP_ITERATIONS,
+                             retries=WARMUP_RETRIES, retry_delay=WARMUP_RETRY_DELAY)
 
-        file = request.files['file']
-        if file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
+# 按会话(session_id)维护的时序状态跟踪
+session_trackers = DrivingStateTrackerRegistry(driving_state_engine)
 
-        # 保存临时文件
-        filename = secure_filename(file.filename)
-        filepath = os.path.join('/tmp', filename)
-        file.save(filepath)
+# 内容寻址结果缓存: 重复提交相同图像时直接返回结果(RESULT_CACHE_SIZE=0 时关闭)
+RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', '1024'))
+RESULT_CACHE_MAX_MB = float(os.environ.get('RESULT_CACHE_MAX_MB', '64'))
+RESULT_CACHE_TTL = float(os.environ.get('RESULT_CACHE_TTL', '0')) or None  # 秒, 0 为不过期
+RESULT_CACHE_DIR = os.environ.get('RESULT_CACHE_DIR') or None  # 磁盘层目录, 重启后仍可命中
+RESULT_CACHE_DISK_MAX_MB = float(os.environ.get('RESULT_CACHE_DISK_MAX_MB', '1024'))  # 0 为不限
+RESULT_CACHE_SWEEP_INTERVAL = float(os.environ.get('RESULT_CACHE_SWEEP_INTERVAL', '300'))  # 秒
+result_cache = None
+if RESULT_CACHE_SIZE > 0:
+    result_cache = ResultCache(max_entries=RESULT_CACHE_SIZE,
+                               max_bytes=int(RESULT_CACHE_MAX_MB * 1024 * 1024),
+                               ttl=RESULT_CACHE_TTL, disk_dir=RESULT_CACHE_DIR,
+                               disk_max_bytes=int(RESULT_CACHE_DISK_MAX_MB * 1024 * 1024) or None,
+                               disk_sweep_interval=RESULT_CACHE_SWEEP_INTERVAL)
 
-        # 运行检测
-        results = predictor.predict(filepath, au_threshold=0.5)
+# 运动门控: 同一会话中与上一次推理帧几乎相同的帧直接复用其结果(MOTION_GATE=1 时开启)
+MOTION_GATE = os.environ.get('MOTION_GATE', '0') == '1'
+MOTION_GATE_THRESHOLD = float(os.environ.get('MOTION_GATE_THRESHOLD', '0.02'))  # 灰度平均绝对差
+MOTION_GATE_MAX_REUSE = int(os.environ.get('MOTION_GATE_MAX_REUSE', '10'))  # 两次推理间最多复用帧数
+MOTION_GATE_MAX_AGE = float(os.environ.get('MOTION_GATE_MAX_AGE', '2')) or None  # 秒, 0 为不限
+motion_gates = None
+if MOTION_GATE:
+    motion_gates = MotionGateRegistry(threshold=MOTION_GATE_THRESHOLD,
+                                      max_reuse=MOTION_GATE_MAX_REUSE,
+                                      max_age=MOTION_GATE_MAX_AGE)
 
-        # 推断驾驶状态
-        driving_state = driving_state_engine.infer_driving_state(results)
+# 级联推理: 按顺序逐个运行分支, 规则已能确定状态时跳过剩余分支(仅单图接口, 不经过微批调度)
+CASCADE_MODE = os.environ.get('CASCADE_MODE', '0') == '1'
+CASCADE_ORDER = os.environ.get('CASCADE_ORDER', ','.join(DEFAULT_ORDER)).split(',')
+CASCADE_MIN_CONFIDENCE = float(os.environ.get('CASCADE_MIN_CONFIDENCE', '0'))
+cascade = None
+if CASCADE_MODE:
+    cascade = CascadePredictor(predictor, driving_state_engine, order=CASCADE_ORDER,
+                               min_confidence=CASCADE_MIN_CONFIDENCE)
+
+# 检测接口(单图、批量、视频)的AU激活阈值
+AU_THRESHOLD = 0.5
 
-        # 组织返回数据
-        response = {
+# 批量接口每个子批次的最大图片数
+BATCH_CHUNK_SIZE = 16
+
+# 视频检测的默认抽帧帧率和上限
+VIDEO_SAMPLE_FPS = 5.0
+VIDEO_MAX_SAMPLE_FPS = 30.0
+
+# 视频检测默认是否只将人脸区域送入模型(查询参数 face_roi=0/1 可覆盖), 及两次人脸检测间的最大帧数
+VIDEO_FACE_ROI = os.environ.get('VIDEO_FACE_ROI', '0') == '1'
+FACE_DETECT_EVERY = int(os.environ.get('FACE_DETECT_EVERY', '10'))
+FACE_DETECTOR_MODEL = os.environ.get('FACE_DETECTOR_MODEL') or None  # YuNet 模型路径, 默认 Haar
+
+# 带 session_id 的单帧监控流是否只将人脸区域送入模型(每个会话独立跟踪)
+SESSION_FACE_ROI = os.environ.get('SESSION_FACE_ROI', '0') == '1'
+session_face_rois = None
+if SESSION_FACE_ROI:
+    session_face_rois = FaceROITrackerRegistry(detector=create_face_detector(FACE_DETECTOR_MODEL),
+                                               detect_every=FACE_DETECT_EVERY)
+
+
+def build_response(results, driving_state):
+    """将模型结果(字典或 CompactResult)与驾驶状态整理为接口返回数据"""
+    if isinstance(results, CompactResult):
+        summary = {
+            'emotion': results.emotion,
+            'emotion_confidence': results.emotion_confidence,
+            'valence': results.valence,
+            'arousal': results.arousal,
+            'active_aus': results.active_au_names(),
+            # 级联模式下跳过的分支, 其对应字段(emotion / emotion_confidence / active_aus)为 None
+            'cascade_skipped': results.skipped_branches
+        }
+    else:
+        summary = {
             'emotion': results['Emotion_Classification']['predicted_emotion'],
             'emotion_confidence': float(results['Emotion_Classification']['confidence']),
             'valence': float(results['Valence_Arousal']['valence']),
             'arousal': float(results['Valence_Arousal']['arousal']),
             'active_aus': results['AU_Recognition']['active_AUs'],
-            'driving_state': driving_state['driving_state'],
-            'driving_state_confidence': float(driving_state['confidence']),
-            'risk_level': driving_state['risk_level'],
-            'risk_color': driving_state['risk_color'],
-            'recommendation': driving_state['recommendation'],
-            'details': driving_state['details']
+            'cascade_skipped': []
         }
 
-        # 清理临时文件
-        os.remove(filepath)
+    return {
+        **summary,
+        'driving_state': driving_state['driving_state'],
+        'driving_state_confidence': float(driving_state['confidence']),
+        'risk_level': driving_state['risk_level'],
+        'risk_color': driving_state['risk_color'],
+        'recommendation': driving_state['recommendation'],
+        'details': driving_state['details']
+    }
+
+
+@app.after_request
+def record_first_request(response):
+    """记录从进程启动到第一个请求完成的耗时"""
+    if 'first_request' not in startup_timings:
+        startup_timings['first_request'] = time.perf_counter() - _startup_begin
+    return response
+
+
+@app.after_request
+def record_request_metrics(response):
+    """按路由统计请求数和错误数(不统计 /metrics 自身)"""
+    if request.url_rule is not None and request.url_rule.rule != '/metrics':
+        metrics.record_request(request.url_rule.rule, failed=response.status_code >= 500)
+    return response
+
+
+def detect_image_bytes(data: bytes, session_id: str = None) -> dict:
+    """
+    单图检测: 查询结果缓存 -> 推理 -> 驾驶状态推断 -> 组织返回数据
+
+    Args:
+        data: 编码后的图像字节
+        session_id: 会话ID, 提供时额外返回平滑后的时序状态(不走缓存, 可经运动门控复用结果,
+            SESSION_FACE_ROI=1 时只分析跟踪到的人脸区域并返回 face_box)
+    """
+    signature = None
+    if session_id and motion_gates is not None:
+        signature = frame_signature(data)
+        reused = motion_gates.lookup(session_id, signature)
+        if reused is not None:
+            results, driving_state, response = reused
+            response = dict(response)
+            response['temporal_state'] = session_trackers.update(
+                session_id, results, driving_state)
+            return response
+
+    cache_key = None
+    if result_cache is not None:
+        # 级联模式的结果不含被跳过的模态(取决于分支顺序和最低置信度), 与完整结果分开缓存
+        config = None
+        if cascade is not None:
+            config = {'cascade_order': list(cascade.order),
+                      'cascade_min_confidence': cascade.min_confidence}
+        cache_key = ResultCache.make_key(data, AU_THRESHOLD, predictor.model_version, config)
+        if not session_id:
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+    # 会话监控流: 只将跟踪到的人脸区域送入模型(裁剪后的结果与图像内容不再一一对应, 不写入缓存)
+    image = data
+    face_box = None
+    if session_id and session_face_rois is not None:
+        frame = np.asarray(IntegratedEmotionPredictor.open_image(data))
+        image, face_box = session_face_rois.crop(session_id, frame)
+        cache_key = None
+
+    # 运行检测(直接从内存中的上传数据解码)
+    if cascade is not None:
+        results, driving_state = cascade.predict(image, au_threshold=AU_THRESHOLD)
+    else:
+        if scheduler is not None:
+            results = scheduler.predict(image, au_threshold=AU_THRESHOLD, compact=True)
+        else:
+            results = predictor.predict(image, au_threshold=AU_THRESHOLD, compact=True)
+
+        # 推断驾驶状态
+        driving_state = driving_state_engine.infer_driving_state(results)
+
+    # 组织返回数据
+    response = build_response(results, driving_state)
+    if session_face_rois is not None and session_id:
+        response['face_box'] = face_box
+    if cache_key is not None:
+        result_cache.put(cache_key, dict(response))
+    if signature is not None:
+        motion_gates.store(session_id, signature, (results, driving_state, dict(response)))
+
+    # 携带会话ID时返回平滑后的时序状态
+    if session_id:
+        response['temporal_state'] = session_trackers.update(
+            session_id, results, driving_state)
+    return response
+
 
-        return jsonify(response)
+def health_status() -> dict:
+    status = {
+        'status': 'ok',
+        'startup_ms': {phase: seconds * 1000.0 for phase, seconds in startup_timings.items()},
+        'model_load_ms': {phase: seconds * 1000.0
+                          for phase, seconds in predictor.startup_timings.items()},
+        # 由 /metrics 的耗时直方图估计的各阶段分位数
+        'stage_latency_ms': metrics.stage_quantiles()
+    }
+    if scheduler is not None:
+        status['micro_batching'] = scheduler.stats()
+    if result_cache is not None:
+        status['result_cache'] = result_cache.stats()
+    if cascade is not None:
+        status['cascade'] = cascade.stats()
+    if motion_gates is not None:
+        status['motion_gate'] = motion_gates.stats()
+    return status
+
+
+@app.route('/api/detect/image', methods=['POST'])
+def detect_image():
+    try:
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file provided'}), 400
+
+        file = request.files['file']
+        if file.filename == '':
+            return jsonify({'error': 'No file selected'}), 400
+
+        return jsonify(detect_image_bytes(file.read(), request.form.get('session_id')))
 
     except Exception as e:
         print(f"Error: {e}")
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/detect/batch', methods=['POST'])
+def detect_batch():
+    """
+    批量检测: 按子批次推理, 以NDJSON逐行流式返回每张图片的结果
+
+    format=parquet/arrow/npz 时改为返回一个列式文件(每张图片一行, 推理失败的子批次不含在内,
+    'index' 列为图片在上传列表中的位置)
+    """
+    files = [f for f in request.files.getlist('files') if f.filename != '']
+    if not files:
+        return jsonify({'error': 'No files provided'}), 400
+
+    try:
+        chunk_size = int(request.args.get('batch_size', BATCH_CHUNK_SIZE))
+    except ValueError:
+        return jsonify({'error': 'Invalid batch_size'}), 400
+    chunk_size = max(1, min(chunk_size, BATCH_CHUNK_SIZE))
+
+    output_format = request.args.get('format', 'ndjson')
+    if output_format != 'ndjson' and output_format not in COLUMNAR_FORMATS:
+        return jsonify({'error': f"format must be one of {['ndjson', *COLUMNAR_FORMATS]}"}), 400
+
+    # 上传文件流在响应开始后会被关闭, 先读出内存中的字节数据
+    items = [(index, file.filename, file.read()) for index, file in enumerate(files)]
+
+    if output_format != 'ndjson':
+        return detect_batch_columnar(items, chunk_size, output_format)
+
+    def generate():
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start:start + chunk_size]
+            try:
+                results_list = predictor.predict_batch(
+                    [data for _, _, data in chunk], au_threshold=AU_THRESHOLD, compact=True)
+                states = driving_state_engine.infer_driving_state_batch(results_list)
+                lines = [
+                    dict(index=index, filename=name,
+                         **build_response(results, driving_state))
+                    for (index, name, _), results, driving_state
+                    in zip(chunk, results_list, states)
+                ]
+                metrics.record_items('/api/detect/batch', len(lines))
+            except Exception as e:
+                print(f"Error: {e}")
+                lines = [{'index': index, 'filename': name, 'error': str(e)}
+                         for index, name, _ in chunk]
+                metrics.record_items('/api/detect/batch', len(lines), failed=len(lines))
+
+            yield ''.join(json.dumps(line, ensure_ascii=False) + '\n'
+                          for line in lines)
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+def detect_batch_columnar(items, chunk_size: int, output_format: str):
+    """按子批次推理, 将全部结果写入一个列式文件后返回"""
+    buffer = io.BytesIO()
+    with ColumnarWriter(buffer, output_format, driving_state_engine.state_codes) as writer:
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start:start + chunk_size]
+            try:
+                results_list = predictor.predict_batch(
+                    [data for _, _, data in chunk], au_threshold=AU_THRESHOLD, compact=True)
+                states = driving_state_engine.infer_driving_state_batch(results_list)
+            except Exception as e:
+                print(f"Error: {e}")
+                metrics.record_items('/api/detect/batch', len(chunk), failed=len(chunk))
+                continue
+            metrics.record_items('/api/detect/batch', len(chunk))
+            columns = {'index': np.array([index for index, _, _ in chunk], dtype=np.int32)}
+            columns.update(columns_from_results(results_list, states,
+                                                driving_state_engine.state_codes,
+                                                images=[name for _, name, _ in chunk]))
+            writer.write(columns)
+    if writer.rows == 0:
+        return jsonify({'error': 'All images failed'}), 500
+
+    extension, mimetype = COLUMNAR_FORMATS[output_format]
+    return Response(buffer.getvalue(), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename=results{extension}'})
+
+
+@app.route('/api/detect/video', methods=['POST'])
+def detect_video():
+    """视频检测: 按帧率抽帧并分块批量推理, 以NDJSON逐帧流式返回结果"""
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file provided'}), 400
+
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+
+    try:
+        sample_fps = float(request.args.get('sample_fps', VIDEO_SAMPLE_FPS))
+        chunk_size = int(request.args.get('batch_size', BATCH_CHUNK_SIZE))
+        use_face_roi = bool(int(request.args.get('face_roi', int(VIDEO_FACE_ROI))))
+    except ValueError:
+        return jsonify({'error': 'Invalid sample_fps, batch_size or face_roi'}), 400
+    if not 0 < sample_fps <= VIDEO_MAX_SAMPLE_FPS:
+        return jsonify({'error': f'sample_fps must be in (0, {VIDEO_MAX_SAMPLE_FPS}]'}), 400
+    chunk_size = max(1, min(chunk_size, BATCH_CHUNK_SIZE))
+
+    face_roi = None
+    if use_face_roi:
+        try:
+            face_roi = FaceROITracker(detect_every=FACE_DETECT_EVERY,
+                                      detector=create_face_detector(FACE_DETECTOR_MODEL))
+        except RuntimeError as e:
+            return jsonify({'error': str(e)}), 500
+
+    # OpenCV 只能按路径解码视频: 上传时已流式写入临时文件(见 DISK_UPLOAD_ENDPOINTS)
+    video_path = request.take_upload(file)
+
+    def cleanup():
+        # 无论响应是否被完整读取都清理临时文件
+        if os.path.exists(video_path):
+            os.remove(video_path)
+
+    def generate():
+        tracker = DrivingStateTracker(driving_state_engine)
+        try:
+            for frame in analyze_video(predictor, driving_state_engine, video_path,
+                                       sample_fps=sample_fps, chunk_size=chunk_size,
+                                       au_threshold=AU_THRESHOLD, tracker=tracker,
+                                       compact=True, face_roi=face_roi):
+                line = dict(frame_index=frame['frame_index'],
+                            timestamp=frame['timestamp'],
+                            temporal_state=frame['temporal_state'],
+                            face_box=frame['face_box'],
+                            **build_response(frame['results'], frame['driving_state']))
+                metrics.record_items('/api/detect/video', 1)
+                yield json.dumps(line, ensure_ascii=False) + '\n'
+        except Exception as e:
+            print(f"Error: {e}")
+            metrics.record_items('/api/detect/video', 1, failed=1)
+            yield json.dumps({'error': str(e)}, ensure_ascii=False) + '\n'
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.call_on_close(cleanup)
+    return response
+
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """就绪检查: 预热完成前返回503, 完成后返回预热耗时; 预热重试用尽后以 degraded=true 就绪"""
+    status = warmup_runner.status()
+    return jsonify(status), (200 if status['ready'] else 503)
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus 文本格式的运行时指标"""
+    return Response(metrics.render_metrics(), content_type=metrics.CONTENT_TYPE)
+
+
 @app.route('/health', methods=['GET'])
 def health():
-    return jsonify({'status': 'ok'})
+    return jsonify(health_status())
+
+
+def start_scheduler():
+    """在服务进程中创建微批调度器(含后台线程, 预派生模式下须在fork之后调用)"""
+    global scheduler
+    if scheduler is None and MICRO_BATCH_SIZE > 1:
+        scheduler = MicroBatchScheduler(predictor, max_batch_size=MICRO_BATCH_SIZE,
+                                        max_wait_ms=MICRO_BATCH_WAIT_MS)
+        metrics.QUEUE_DEPTH.labels('micro_batch').set_function(scheduler.queue_depth)
+
+
+def start_warmup():
+    """在服务进程中启动后台预热"""
+    if WARMUP_ITERATIONS > 0:
+        warmup_runner.start()
+    else:
+        warmup_runner.ready = True
 
 
 if __name__ == '__main__':
+    start_scheduler()
+    start_warmup()
+    startup_timings['ready_to_serve'] = time.perf_counter() - _startup_begin
+    print("服务启动耗时:")
+    for phase, seconds in startup_timings.items():
+        print(f"  {phase:20s}: {seconds * 1000:8.1f} ms")
     app.run(host='0.0.0.0', port=5001, debug=False)
\ No newline at end of file
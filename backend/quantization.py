@@ -0,0 +1,200 @@
+import csv
+import json
+import os
+import warnings
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from driving_state_inference import AU_NAMES, EMOTION_LABELS
+from inference_backends import branch_path
+from three import IMAGE_EXTENSIONS
+
+
+def list_images(folder: str) -> List[str]:
+    """按文件名排序列出目录中的图像"""
+    return sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                  if name.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def split_calibration(images: List[str], max_calibration: int,
+                      eval_fraction: float = 0.2) -> Tuple[List[str], List[str]]:
+    """
+    划分校准集和评估集
+
+    图像多于 max_calibration 时前 max_calibration 张用于校准, 其余用于评估;
+    否则按 eval_fraction 均匀间隔地留出一部分用于评估(不参与校准), 保证总能报告精度偏移。
+
+    Returns:
+        (校准图像, 评估图像)
+    """
+    if len(images) > max_calibration:
+        return images[:max_calibration], images[max_calibration:]
+    # 至少留出一张(且至少保留一张用于校准)
+    held_out = min(len(images) - 1, max(1, int(len(images) * eval_fraction))) \
+        if eval_fraction > 0 else 0
+    if held_out <= 0:
+        return list(images), []
+    step = len(images) / held_out
+    evaluation_indices = {int(i * step) for i in range(held_out)}
+    return ([path for i, path in enumerate(images) if i not in evaluation_indices],
+            [path for i, path in enumerate(images) if i in evaluation_indices])
+
+
+def iter_batches(predictor, paths: List[str], batch_size: int) -> Iterator[torch.Tensor]:
+    """将图像路径按批读取为 [N, 3, H, W] uint8张量"""
+    for start in range(0, len(paths), batch_size):
+        yield torch.stack([predictor.load_image(path) for path in paths[start:start + batch_size]])
+
+
+def _static_quantize(model: nn.Module, example: torch.Tensor, calibration_inputs: List[torch.Tensor],
+                     engine: str) -> nn.Module:
+    """FX 图模式静态训练后量化: 插入观察器 -> 校准 -> 转换为int8"""
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    with warnings.catch_warnings():
+        # FX 量化接口在新版本中标记为弃用, 但仍是 eager 模型最直接的 PTQ 方式
+        warnings.simplefilter('ignore')
+        prepared = prepare_fx(model.eval(), get_default_qconfig_mapping(engine), (example,))
+        with torch.no_grad():
+            for x in calibration_inputs:
+                prepared(x)
+        return convert_fx(prepared)
+
+
+def quantize_predictor(predictor, calibration_paths: List[str], output_dir: str,
+                       batch_size: int = 16, engine: str = 'x86') -> Dict[str, str]:
+    """
+    量化预测器的三个分支并保存为 TorchScript (backend='int8' 直接加载, 启动时无需重新校准)
+
+      - alexnet / ResNet18 / SimpleFeatureExtractor: 静态训练后量化(需校准图像)
+      - AffectNetModel 回归头(以Linear为主): 动态量化
+
+    Args:
+        predictor: 使用 eager 后端在CPU上加载的 IntegratedEmotionPredictor
+        calibration_paths: 校准图像路径
+        output_dir: 量化模型保存目录
+        batch_size: 校准批大小
+        engine: 量化计算引擎, x86 服务器用 'x86', ARM 用 'qnnpack'
+
+    Returns:
+        {分支名: 文件路径}
+    """
+    if predictor.device.type != 'cpu':
+        raise ValueError("int8 量化仅支持CPU推理")
+    if not calibration_paths:
+        raise ValueError("没有可用的校准图像")
+    torch.backends.quantized.engine = engine
+    predictor.wait_until_loaded()
+
+    # 预先计算三个分支的校准输入
+    au_inputs, fer_inputs, affect_inputs = [], [], []
+    for batch in iter_batches(predictor, calibration_paths, batch_size):
+        au_input, fer_input, affect_input = predictor.preprocess(batch)
+        au_inputs.append(au_input)
+        fer_inputs.append(fer_input)
+        affect_inputs.append(affect_input)
+    print(f"    校准图像: {len(calibration_paths)} 张")
+
+    au_model = _static_quantize(predictor.au_model, au_inputs[0], au_inputs, engine)
+    fer_model = _static_quantize(predictor.fer_model, fer_inputs[0], fer_inputs, engine)
+    feature_extractor = _static_quantize(predictor.affect_feature_extractor, affect_inputs[0],
+                                         affect_inputs, engine)
+    affect_head = torch.ao.quantization.quantize_dynamic(
+        predictor.affect_model.eval(), {nn.Linear}, dtype=torch.qint8)
+    va_model = nn.Sequential(feature_extractor, affect_head).eval()
+
+    os.makedirs(output_dir, exist_ok=True)
+    saved = {}
+    for branch, model, example in (('au', au_model, au_inputs[0]),
+                                   ('fer', fer_model, fer_inputs[0]),
+                                   ('va', va_model, affect_inputs[0])):
+        path = branch_path(output_dir, branch, 'int8')
+        with torch.no_grad():
+            torch.jit.save(torch.jit.trace(model, example), path)
+        saved[branch] = path
+        print(f"    ✓ 保存 {branch} int8 模型 -> {path}")
+    return saved
+
+
+def load_labels(labels_path: str) -> Dict[str, Dict]:
+    """
+    读取标注CSV, 列为 image, emotion, valence, arousal, aus
+
+    aus 为以空格分隔的激活AU名称(如 "AU4 AU7"), image 为图像文件名。
+    """
+    labels = {}
+    with open(labels_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            aus = set(row['aus'].split())
+            labels[os.path.basename(row['image'])] = {
+                'emotion': EMOTION_LABELS.index(row['emotion']),
+                'va': (float(row['valence']), float(row['arousal'])),
+                'aus': np.array([au in aus for au in AU_NAMES])
+            }
+    return labels
+
+
+def _f1(pred: np.ndarray, target: np.ndarray) -> float:
+    """所有AU合并计算的micro F1"""
+    tp = np.logical_and(pred, target).sum()
+    fp = np.logical_and(pred, ~target).sum()
+    fn = np.logical_and(~pred, target).sum()
+    return float(2 * tp / (2 * tp + fp + fn)) if tp + fp + fn else 1.0
+
+
+def _metrics(au_probs, fer_probs, va_values, au_target, fer_target, va_target,
+             au_threshold: float) -> Dict[str, float]:
+    return {
+        'au_f1': _f1(au_probs > au_threshold, au_target),
+        'fer_accuracy': float((fer_probs.argmax(axis=1) == fer_target).mean()),
+        'va_mae': float(np.abs(va_values - va_target).mean()),
+        'va_max_error': float(np.abs(va_values - va_target).max())
+    }
+
+
+def accuracy_drift(reference, quantized, paths: List[str], labels: Optional[Dict[str, Dict]] = None,
+                   batch_size: int = 16, au_threshold: float = 0.5) -> Dict[str, Dict]:
+    """
+    评估量化带来的精度偏移
+
+    'vs_fp32' 以fp32输出为参照(无需标注): AU F1、FER一致率、VA误差;
+    提供标注时, 额外给出fp32与int8各自在标注上的指标及差值。
+    """
+    outputs = {'fp32': [[], [], []], 'int8': [[], [], []]}
+    for batch in iter_batches(reference, paths, batch_size):
+        for name, predictor in (('fp32', reference), ('int8', quantized)):
+            for store, values in zip(outputs[name], predictor._run_branches(batch)):
+                store.append(values)
+    fp32 = [np.concatenate(values) for values in outputs['fp32']]
+    int8 = [np.concatenate(values) for values in outputs['int8']]
+
+    report = {
+        'images': len(paths),
+        'vs_fp32': _metrics(*int8, fp32[0] > au_threshold, fp32[1].argmax(axis=1), fp32[2],
+                            au_threshold)
+    }
+
+    if labels:
+        index = [i for i, path in enumerate(paths) if os.path.basename(path) in labels]
+        if index:
+            rows = [labels[os.path.basename(paths[i])] for i in index]
+            target = (np.stack([row['aus'] for row in rows]),
+                      np.array([row['emotion'] for row in rows]),
+                      np.array([row['va'] for row in rows]))
+            report['labelled_images'] = len(index)
+            report['fp32'] = _metrics(*(values[index] for values in fp32), *target, au_threshold)
+            report['int8'] = _metrics(*(values[index] for values in int8), *target, au_threshold)
+            report['drift'] = {key: report['int8'][key] - report['fp32'][key]
+                               for key in report['fp32']}
+    return report
+
+
+def save_report(report: Dict, output_dir: str) -> str:
+    path = os.path.join(output_dir, 'quantization_report.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return path
\ No newline at end of file
@@ -0,0 +1,63 @@
+"""
+int8 量化: 用校准图像量化三个模型, 保存量化模型并输出精度偏移报告
+
+用法:
+    python quantize_models.py --calibration-dir data/calibration --eval-dir data/val \
+        --labels data/val/labels.csv --output-dir models/exported
+"""
+import argparse
+import json
+import sys
+
+from three import IntegratedEmotionPredictor
+from quantization import (accuracy_drift, list_images, load_labels, quantize_predictor,
+                          save_report, split_calibration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='int8 量化与精度偏移评估')
+    parser.add_argument('--au-model', default='models/alexnet_ensemble.pth')
+    parser.add_argument('--fer-model', default='models/best_checkpoint.tar')
+    parser.add_argument('--affect-model', default='models/AffectNet.pth')
+    parser.add_argument('--calibration-dir', required=True, help='校准图像目录')
+    parser.add_argument('--max-calibration', type=int, default=200, help='最多使用的校准图像数')
+    parser.add_argument('--eval-dir', default=None, help='评估图像目录(默认使用校准目录中未参与校准的图像)')
+    parser.add_argument('--eval-fraction', type=float, default=0.2,
+                        help='未指定评估目录且校准图像不超过上限时, 从校准目录留作评估的比例')
+    parser.add_argument('--labels', default=None, help='可选的标注CSV, 用于计算真实精度偏移')
+    parser.add_argument('--output-dir', default='models/exported')
+    parser.add_argument('--engine', default='x86', choices=['x86', 'fbgemm', 'qnnpack'])
+    parser.add_argument('--batch-size', type=int, default=16)
+    args = parser.parse_args()
+
+    predictor = IntegratedEmotionPredictor(args.au_model, args.fer_model,
+                                           args.affect_model, device='cpu')
+
+    images = list_images(args.calibration_dir)
+    if args.eval_dir:
+        calibration, evaluation = images[:args.max_calibration], list_images(args.eval_dir)
+    else:
+        calibration, evaluation = split_calibration(images, args.max_calibration,
+                                                    args.eval_fraction)
+        print(f"校准图像 {len(calibration)} 张, 留作评估 {len(evaluation)} 张")
+
+    quantize_predictor(predictor, calibration, args.output_dir,
+                       batch_size=args.batch_size, engine=args.engine)
+
+    if not evaluation:
+        print("  ! 警告: 没有评估图像, 未计算精度偏移, 量化模型的精度未经验证!")
+        print("  ! 请通过 --eval-dir 指定评估图像, 或在校准目录中提供更多图像")
+        sys.exit(1)
+
+    quantized = IntegratedEmotionPredictor(args.au_model, args.fer_model, args.affect_model,
+                                           device='cpu', backend='int8',
+                                           backend_model_dir=args.output_dir)
+    labels = load_labels(args.labels) if args.labels else None
+    report = accuracy_drift(predictor, quantized, evaluation, labels=labels,
+                            batch_size=args.batch_size)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    print(f"报告已保存至: {save_report(report, args.output_dir)}")
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,272 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class ResultCache:
+    """
+    内容寻址的检测结果缓存
+
+    键为 图像字节 + au_threshold + 模型版本 + 影响输出的推理配置 的SHA-256, 命中时跳过解码和推理。
+    内存层按LRU淘汰(条目数和字节数双重上限), 可选TTL和磁盘层(重启后仍可命中)。
+    磁盘层由后台清理扫描目录: 删除过期条目, 超出字节上限时按写入时间从旧到新删除;
+    扫描以目录为准, 多个进程共享同一目录时同样有效。
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024,
+                 ttl: Optional[float] = None, disk_dir: Optional[str] = None,
+                 disk_max_bytes: Optional[int] = 1024 * 1024 * 1024,
+                 disk_sweep_interval: float = 300.0):
+        """
+        Args:
+            max_entries: 内存中最多保留的条目数
+            max_bytes: 内存中结果(按JSON编码长度计)的总字节上限
+            ttl: 条目有效期(秒), None 表示永不过期
+            disk_dir: 磁盘层目录, None 表示不启用
+            disk_max_bytes: 磁盘层的总字节上限, None 表示不限
+            disk_sweep_interval: 磁盘层两次清理之间的最长间隔(秒); 自上次清理以来写入量
+                                 超过上限的 1/10 时提前清理
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.disk_sweep_interval = disk_sweep_interval
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+        self._entries = OrderedDict()  # key -> (created_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        self._sweep_lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        self._written_since_sweep = 0
+        self.disk_bytes = None  # 上次清理后磁盘层的字节数
+        self.disk_evictions = 0
+        self.disk_errors = 0
+
+    @staticmethod
+    def make_key(data: bytes, au_threshold: float, model_version: str,
+                 config: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Args:
+            data: 编码后的图像字节
+            au_threshold: AU激活阈值
+            model_version: 模型版本
+            config: 其他会改变返回内容的推理配置(如级联顺序和最低置信度), 需可JSON序列化
+        """
+        digest = hashlib.sha256(data)
+        digest.update(f'|{au_threshold!r}|{model_version}'.encode())
+        if config:
+            digest.update(b'|' + json.dumps(config, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """查询缓存, 未命中或已过期返回 None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._expired(entry[0], now):
+                    self._remove(key)
+                    self.expirations += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[2]
+
+        entry = self._disk_get(key, now)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        # 磁盘命中的条目提升到内存层, 保留原写入时间, TTL 不因提升而重新计算
+        created_at, value = entry
+        self._memory_put(key, value, created_at)
+        return value
+
+    def put(self, key: str, value: Dict[str, Any]):
+        """写入缓存(value 需可JSON序列化)"""
+        now = time.time()
+        encoded = self._memory_put(key, value, now)
+        if self.disk_dir:
+            try:
+                self._disk_put(key, encoded, now)
+            except OSError as e:
+                # 磁盘层只是加速, 写入失败(磁盘已满、权限等)不影响本次请求
+                self._disk_error('写入', key, e)
+                return
+            self._maybe_sweep(len(encoded))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'disk_bytes': self.disk_bytes,
+                'disk_evictions': self.disk_evictions,
+                'disk_errors': self.disk_errors,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0
+            }
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _memory_put(self, key: str, value: Dict[str, Any], created_at: float) -> bytes:
+        encoded = json.dumps(value, ensure_ascii=False).encode('utf-8')
+        size = len(encoded)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size <= self.max_bytes and self.max_entries > 0:
+                self._entries[key] = (created_at, size, value)
+                self._bytes += size
+                # 按LRU淘汰直到满足两个上限
+                while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                    self._remove(next(iter(self._entries)))
+                    self.evictions += 1
+        return encoded
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], key + '.json')
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """读取磁盘层条目, 返回 (写入时间, 结果); 未命中或已过期返回 None"""
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            created_at = os.path.getmtime(path)
+            if self._expired(created_at, now):
+                os.remove(path)
+                with self._lock:
+                    self.expirations += 1
+                return None
+            with open(path, 'rb') as f:
+                return created_at, json.loads(f.read())
+        except FileNotFoundError:
+            # 未命中, 或刚被其他进程/清理删除
+            return None
+        except OSError as e:
+            self._disk_error('读取', key, e)
+            return None
+        except ValueError as e:
+            # 内容损坏: 删除后按未命中处理
+            self._disk_error('解析', key, e)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def _disk_error(self, action: str, key: str, error: Exception):
+        with self._lock:
+            self.disk_errors += 1
+        print(f"  ! 结果缓存磁盘层{action}失败 ({key[:12]}): {error}")
+
+    def _disk_put(self, key: str, encoded: bytes, created_at: float):
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先写临时文件再原子替换, 避免并发读到不完整的文件
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(encoded)
+        os.utime(tmp_path, (created_at, created_at))
+        os.replace(tmp_path, path)
+
+    def _maybe_sweep(self, written: int):
+        """到达清理间隔, 或写入量超过上限的 1/10 时, 在后台线程中清理磁盘层"""
+        with self._lock:
+            self._written_since_sweep += written
+            due = time.monotonic() - self._last_sweep >= self.disk_sweep_interval or (
+                self.disk_max_bytes is not None
+                and self._written_since_sweep > self.disk_max_bytes // 10)
+            if not due or self._sweep_lock.locked():
+                return
+            self._last_sweep = time.monotonic()
+            self._written_since_sweep = 0
+        threading.Thread(target=self.sweep_disk, daemon=True, name='result-cache-sweep').start()
+
+    def sweep_disk(self) -> Dict[str, int]:
+        """
+        扫描磁盘层: 删除过期条目和残留的临时文件, 总大小超出 disk_max_bytes 时
+        按写入时间从旧到新删除, 直到降到上限的 90%
+
+        Returns:
+            {'files', 'bytes', 'expired', 'evicted'}
+        """
+        if not self.disk_dir or not self._sweep_lock.acquire(blocking=False):
+            return {}
+        try:
+            now = time.time()
+            entries = []  # (mtime, size, path)
+            expired = 0
+            for root, _, files in os.walk(self.disk_dir):
+                for name in files:
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                        if name.endswith('.tmp'):
+                            # 写入中途退出的进程留下的临时文件
+                            if now - stat.st_mtime > 3600:
+                                os.remove(path)
+                            continue
+                        if self._expired(stat.st_mtime, now):
+                            os.remove(path)
+                            expired += 1
+                            continue
+                    except FileNotFoundError:
+                        continue
+                    except OSError as e:
+                        self._disk_error('清理', name, e)
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            evicted = 0
+            if self.disk_max_bytes is not None and total > self.disk_max_bytes:
+                target = self.disk_max_bytes * 0.9
+                entries.sort()
+                for _, size, path in entries:
+                    if total <= target:
+                        break
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                    except OSError as e:
+                        self._disk_error('清理', os.path.basename(path), e)
+                        continue
+                    total -= size
+                    evicted += 1
+
+            with self._lock:
+                self.expirations += expired
+                self.disk_evictions += evicted
+                self.disk_bytes = total
+            return {'files': len(entries) - evicted, 'bytes': total,
+                    'expired': expired, 'evicted': evicted}
+        finally:
+            self._sweep_lock.release()
\ No newline at end of file
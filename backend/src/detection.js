@@ -35,7 +35,10 @@ const callPythonDetectionService = async (imagePath) => {
 exports.callPythonDetectionService = callPythonDetectionService;
 // 保存分析结果
 const saveAnalysisResult = async (detectionId, analysisData) => {
-    const { emotion, emotion_confidence, valence, arousal, active_aus, driving_state, driving_state_confidence, risk_level, risk_color, recommendation, details, } = analysisData;
+    const { emotion, emotion_confidence, valence, arousal, active_aus, driving_state, driving_state_confidence, risk_level, risk_color, recommendation, details, cascade_skipped, } = analysisData;
+    // 级联模式(CASCADE_MODE)下被跳过的分支没有输出, 对应字段为 null:
+    // 跳过AU分支时 au_count 也记为 null, 而不是"没有激活的AU"
+    const auSkipped = Array.isArray(cascade_skipped) && cascade_skipped.includes('au');
     const result = await db_1.default.query(`INSERT INTO analysis_results 
     (detection_id, emotion, emotion_confidence, valence, arousal, active_aus, au_count, 
      driving_state, driving_state_confidence, risk_level, risk_color, recommendation, analysis_details)
@@ -47,7 +50,7 @@ const saveAnalysisResult = async (detectionId, analysisData) => {
         valence,
         arousal,
         active_aus,
-        active_aus?.length || 0,
+        auSkipped ? null : active_aus?.length || 0,
         driving_state,
         driving_state_confidence,
         risk_level,
@@ -59,8 +59,13 @@ export const saveAnalysisResult = async (
     risk_color,
     recommendation,
     details,
+    cascade_skipped,
   } = analysisData;
 
+  // 级联模式(CASCADE_MODE)下被跳过的分支没有输出, 对应字段为 null:
+  // 跳过AU分支时 au_count 也记为 null, 而不是"没有激活的AU"
+  const auSkipped = Array.isArray(cascade_skipped) && cascade_skipped.includes('au');
+
   const result = await pool.query(
     `INSERT INTO analysis_results 
     (detection_id, emotion, emotion_confidence, valence, arousal, active_aus, au_count, 
@@ -74,7 +79,7 @@ export const saveAnalysisResult = async (
       valence,
       arousal,
       active_aus,
-      active_aus?.length || 0,
+      auSkipped ? null : active_aus?.length || 0,
       driving_state,
       driving_state_confidence,
       risk_level,
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# 后端模块均为顶层模块(与服务启动方式一致), 测试时将 backend/ 加入导入路径;
+# benchmarks/ 放在最后, 避免其中的同名脚本(如 precision.py)遮蔽后端模块
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.append(os.path.join(BACKEND_DIR, 'benchmarks'))
\ No newline at end of file
@@ -0,0 +1,92 @@
+import asyncio
+import importlib
+import sys
+import types
+
+import pytest
+
+pytest.importorskip('starlette')
+pytest.importorskip('httpx')
+
+from starlette.testclient import TestClient  # noqa: E402
+
+UPLOAD_LIMIT = 1024
+
+
+@pytest.fixture
+def async_service(monkeypatch):
+    """以替身代替 python_service(后者在导入时加载真实模型), 只测试异步接口层"""
+    service = types.ModuleType('python_service')
+    service.app = types.SimpleNamespace(config={'MAX_CONTENT_LENGTH': UPLOAD_LIMIT})
+    service.calls = []
+
+    def detect_image_bytes(data, session_id=None):
+        service.calls.append((data, session_id))
+        return {'bytes': len(data), 'session_id': session_id}
+
+    service.detect_image_bytes = detect_image_bytes
+    service.start_scheduler = service.start_warmup = lambda: None
+    monkeypatch.setitem(sys.modules, 'python_service', service)
+    monkeypatch.delitem(sys.modules, 'async_service', raising=False)
+    module = importlib.import_module('async_service')
+    yield module
+    sys.modules.pop('async_service', None)
+
+
+def run_receive(receive, count):
+    async def consume():
+        return [await receive() for _ in range(count)]
+
+    return asyncio.run(consume())
+
+
+def body_messages(*chunks):
+    messages = [{'type': 'http.request', 'body': chunk, 'more_body': i < len(chunks) - 1}
+                for i, chunk in enumerate(chunks)]
+
+    async def receive():
+        return messages.pop(0)
+
+    return receive
+
+
+def test_limit_body_passes_uploads_within_limit(async_service):
+    receive = async_service.limit_body(body_messages(b'a' * 600, b'b' * 424), UPLOAD_LIMIT)
+    messages = run_receive(receive, 2)
+    assert b''.join(message['body'] for message in messages) == b'a' * 600 + b'b' * 424
+
+
+def test_limit_body_rejects_oversized_upload(async_service):
+    # 单个分块未超限, 累计超限时中止
+    receive = async_service.limit_body(body_messages(b'a' * 600, b'b' * 600, b'c'), UPLOAD_LIMIT)
+    with pytest.raises(async_service.UploadTooLarge):
+        run_receive(receive, 3)
+
+
+def test_endpoint_rejects_oversized_uploads(async_service):
+    def chunks():
+        # 分块传输, 没有 content-length
+        for _ in range(4):
+            yield b'x' * 512
+
+    boundary = 'testboundary'
+    head = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; '
+            f'filename="a.jpg"\r\nContent-Type: image/jpeg\r\n\r\n').encode()
+
+    def body():
+        yield head
+        yield from chunks()
+        yield f'\r\n--{boundary}--\r\n'.encode()
+
+    with TestClient(async_service.app) as client:
+        content_type = f'multipart/form-data; boundary={boundary}'
+        response = client.post('/api/detect/image', content=body(),
+                               headers={'Content-Type': content_type})
+        assert response.status_code == 413
+        assert client.post('/api/detect/image',
+                           files={'file': ('a.jpg', b'x' * 2048, 'image/jpeg')}).status_code == 413
+        response = client.post('/api/detect/image', data={'session_id': 's1'},
+                               files={'file': ('a.jpg', b'x' * 100, 'image/jpeg')})
+        assert response.status_code == 200
+        assert response.json() == {'bytes': 100, 'session_id': 's1'}
+    assert sys.modules['python_service'].calls == [(b'x' * 100, 's1')]
\ No newline at end of file
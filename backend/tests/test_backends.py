@@ -0,0 +1,35 @@
+import pytest
+import torch
+
+from inference_backends import check_parity, export_models
+from random_models import build_predictor
+
+
+@pytest.fixture(scope='module')
+def reference(tmp_path_factory):
+    return build_predictor(checkpoint_dir=str(tmp_path_factory.mktemp('checkpoints')))
+
+
+@pytest.fixture(scope='module')
+def images():
+    generator = torch.Generator().manual_seed(0)
+    return torch.randint(0, 256, (4, 3, 224, 224), dtype=torch.uint8, generator=generator)
+
+
+@pytest.mark.parametrize('backend', ['onnx', 'torchscript'])
+def test_exported_backend_matches_eager(reference, images, tmp_path, backend):
+    if backend == 'onnx':
+        pytest.importorskip('onnxruntime')
+    exported = export_models(reference, str(tmp_path), backends=[backend])
+    assert len(exported) == 3
+
+    candidate = build_predictor(checkpoint_dir=str(tmp_path / 'checkpoints'), backend=backend,
+                                backend_model_dir=str(tmp_path))
+    report = check_parity(reference, candidate, images, atol=1e-4)
+    assert set(report) == {'au_probs', 'fer_probs', 'va_values'}
+
+
+def test_check_parity_detects_mismatch(reference, images, tmp_path):
+    other = build_predictor(checkpoint_dir=str(tmp_path), seed=1)
+    with pytest.raises(AssertionError):
+        check_parity(reference, other, images, atol=1e-4)
\ No newline at end of file
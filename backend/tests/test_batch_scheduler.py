@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+from batch_scheduler import MicroBatchScheduler
+
+
+class RecordingPredictor:
+    """记录每次批量前向的输入; gate 未打开时第一次前向阻塞, 便于让后续请求在队列中积压"""
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+        self.gate = threading.Event()
+        self.gate.set()
+        self.entered = threading.Event()
+
+    def load_image(self, image):
+        return image
+
+    def predict_batch(self, images, au_threshold=0.5, compact=False):
+        self.entered.set()
+        self.gate.wait(5)
+        self.calls.append((list(images), au_threshold, compact))
+        if self.fail:
+            raise ValueError('forward failed')
+        return [(image, au_threshold, compact) for image in images]
+
+
+@pytest.fixture
+def make_scheduler():
+    schedulers = []
+
+    def make(predictor, **kwargs):
+        scheduler = MicroBatchScheduler(predictor, **kwargs)
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield make
+    for scheduler in schedulers:
+        scheduler.shutdown()
+
+
+def test_flushes_when_batch_is_full(make_scheduler):
+    predictor = RecordingPredictor()
+    scheduler = make_scheduler(predictor, max_batch_size=4, max_wait_ms=10000)
+    started = time.perf_counter()
+    futures = [scheduler.submit(i) for i in range(4)]
+    assert [future.result(timeout=5)[0] for future in futures] == [0, 1, 2, 3]
+    # 凑满批次立即执行, 不等待 max_wait
+    assert time.perf_counter() - started < 5
+    assert predictor.calls == [([0, 1, 2, 3], 0.5, False)]
+    assert scheduler.stats()['batches'] == 1
+
+
+def test_flushes_partial_batch_at_deadline(make_scheduler):
+    predictor = RecordingPredictor()
+    scheduler = make_scheduler(predictor, max_batch_size=8, max_wait_ms=50)
+    started = time.perf_counter()
+    assert scheduler.predict('a', timeout=5) == ('a', 0.5, False)
+    assert time.perf_counter() - started >= 0.045
+    assert predictor.calls == [(['a'], 0.5, False)]
+
+
+def test_groups_by_threshold_and_compact(make_scheduler):
+    predictor = RecordingPredictor()
+    predictor.gate.clear()
+    scheduler = make_scheduler(predictor, max_batch_size=16, max_wait_ms=1)
+    blocker = scheduler.submit('blocker')
+    assert predictor.entered.wait(5)
+
+    # 调度线程阻塞在第一批上, 以下请求会进入同一个批次
+    requests = [('a', 0.5, False), ('b', 0.3, False), ('c', 0.5, True),
+                ('d', 0.5, False), ('e', 0.3, False)]
+    futures = [scheduler.submit(image, au_threshold, compact)
+               for image, au_threshold, compact in requests]
+    predictor.gate.set()
+    blocker.result(timeout=5)
+    for request, future in zip(requests, futures):
+        assert future.result(timeout=5) == request
+
+    assert sorted(predictor.calls[1:]) == sorted([
+        (['a', 'd'], 0.5, False), (['b', 'e'], 0.3, False), (['c'], 0.5, True)])
+    stats = scheduler.stats()
+    assert stats['batches'] == 2 and stats['requests'] == 6
+
+
+def test_exception_reaches_every_waiter(make_scheduler):
+    predictor = RecordingPredictor(fail=True)
+    predictor.gate.clear()
+    scheduler = make_scheduler(predictor, max_batch_size=16, max_wait_ms=1)
+    first = scheduler.submit('first')
+    assert predictor.entered.wait(5)
+    futures = [scheduler.submit(i, au_threshold) for i, au_threshold in
+               enumerate([0.5, 0.5, 0.3])]
+    predictor.gate.set()
+    for future in [first, *futures]:
+        with pytest.raises(ValueError, match='forward failed'):
+            future.result(timeout=5)
+    # 调度线程在异常后继续工作
+    predictor.fail = False
+    assert scheduler.predict('next', timeout=5) == ('next', 0.5, False)
\ No newline at end of file
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+import torch
+
+from inference_backends import check_parity
+from random_models import build_predictor
+from suite import synthetic_jpegs
+
+
+@pytest.fixture(scope='module')
+def predictors(tmp_path_factory):
+    checkpoint_dir = str(tmp_path_factory.mktemp('checkpoints'))
+    sequential = build_predictor(checkpoint_dir=checkpoint_dir)
+    parallel = build_predictor(checkpoint_dir=checkpoint_dir, parallel_branches=True)
+    return sequential, parallel
+
+
+def test_parallel_branches_match_sequential(predictors):
+    sequential, parallel = predictors
+    generator = torch.Generator().manual_seed(0)
+    images = torch.randint(0, 256, (3, 3, 224, 224), dtype=torch.uint8, generator=generator)
+    report = check_parity(sequential, parallel, images, atol=1e-5)
+    assert set(report) == {'au_probs', 'fer_probs', 'va_values'}
+
+
+def test_parallel_predict_matches_sequential(predictors):
+    sequential, parallel = predictors
+    for data in synthetic_jpegs(2):
+        expected = sequential.predict(data, compact=True)
+        actual = parallel.predict(data, compact=True)
+        assert actual.au_mask == expected.au_mask
+        assert actual.emotion_index == expected.emotion_index
+        np.testing.assert_allclose(actual.fer_probs, expected.fer_probs, atol=1e-5)
+        assert actual.valence == pytest.approx(expected.valence, abs=1e-5)
+        assert actual.arousal == pytest.approx(expected.arousal, abs=1e-5)
\ No newline at end of file
@@ -0,0 +1,77 @@
+import json
+
+import numpy as np
+import pytest
+import torch
+from PIL import Image
+
+from bulk_analysis import collect_images, completed_images, run_bulk_analysis
+from driving_state_inference import DrivingStateInference
+from random_models import build_predictor
+
+
+@pytest.fixture(scope='module')
+def predictor(tmp_path_factory):
+    return build_predictor(checkpoint_dir=str(tmp_path_factory.mktemp('checkpoints')))
+
+
+def write_images(directory, count):
+    rng = np.random.RandomState(0)
+    for i in range(count):
+        pixels = rng.randint(0, 256, (48, 64, 3), dtype=np.uint8)
+        Image.fromarray(pixels).save(directory / f'{i:02d}.jpg')
+
+
+def read_rows(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_bulk_analysis_matches_predict_batch_and_retries_errors(predictor, tmp_path):
+    images = tmp_path / 'images'
+    images.mkdir()
+    write_images(images, 5)
+    (images / '05.jpg').write_bytes(b'not an image')
+    paths = collect_images(str(images))
+    output = tmp_path / 'results.jsonl'
+    engine = DrivingStateInference()
+
+    stats = run_bulk_analysis(predictor, engine, paths, str(output), batch_size=2, num_workers=0)
+    assert (stats['processed'], stats['failed']) == (5, 1)
+    rows = {row['image']: row for row in read_rows(output)}
+    assert 'error' in rows[paths[5]]
+
+    expected = predictor.predict_batch(paths[:5], compact=True)
+    for path, result in zip(paths, expected):
+        au = rows[path]['results']['AU_Recognition']['detailed_results']
+        np.testing.assert_allclose([au[name]['confidence'] for name in au], result.au_probs,
+                                   atol=1e-5)
+        expected_state = engine.infer_driving_state(result)
+        del expected_state['details']
+        assert rows[path]['driving_state'] == expected_state
+
+    # 续跑: 只重试失败的图像, 仍然失败时替换原错误行而不是追加
+    for _ in range(2):
+        stats = run_bulk_analysis(predictor, engine, paths, str(output), batch_size=2,
+                                  num_workers=0)
+        assert (stats['skipped'], stats['processed'], stats['failed']) == (5, 0, 1)
+        assert [row['image'] for row in read_rows(output)].count(paths[5]) == 1
+    assert completed_images(str(output)) == set(paths[:5])
+    write_images(images, 6)
+    stats = run_bulk_analysis(predictor, engine, paths, str(output), batch_size=2, num_workers=0)
+    assert (stats['skipped'], stats['processed'], stats['failed']) == (5, 1, 0)
+    assert completed_images(str(output)) == set(paths)
+    assert sorted(row['image'] for row in read_rows(output)) == paths
+
+
+def test_resume_drops_incomplete_last_line(tmp_path):
+    output = tmp_path / 'results.jsonl'
+    output.write_text('{"image": "a", "results": {}}\n{"image": "b", "error": "x"}\n{"ima',
+                      encoding='utf-8')
+    assert completed_images(str(output)) == {'a'}
+    assert read_rows(output) == [{'image': 'a', 'results': {}}]
+
+
+def test_predict_decoded_batch_checks_shape(predictor):
+    with pytest.raises(ValueError):
+        predictor.predict_decoded_batch(torch.zeros(2, 3, 100, 100, dtype=torch.uint8))
\ No newline at end of file
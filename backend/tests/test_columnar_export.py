@@ -0,0 +1,82 @@
+import io
+import zipfile
+
+import numpy as np
+import pytest
+
+from columnar_export import ColumnarWriter, FORMATS, read_columns, write_columns
+from driving_state_inference import AU_NAMES, EMOTION_LABELS, DrivingStateInference
+
+STATE_CODES = DrivingStateInference().state_codes
+
+
+def random_columns(count, seed, image_prefix='img'):
+    rng = np.random.RandomState(seed)
+    return {
+        'image': np.array([f'{image_prefix}_{seed}_{i}.jpg' for i in range(count)], dtype=str),
+        'au_probs': rng.rand(count, len(AU_NAMES)).astype(np.float32),
+        'fer_probs': rng.rand(count, len(EMOTION_LABELS)).astype(np.float32),
+        'valence': rng.uniform(-1, 1, count).astype(np.float32),
+        'arousal': rng.rand(count).astype(np.float32),
+        'state_code': rng.randint(len(STATE_CODES), size=count).astype(np.uint8),
+        'confidence': rng.rand(count)
+    }
+
+
+def available_formats():
+    formats = ['npz']
+    try:
+        import pyarrow  # noqa: F401
+        formats += ['parquet', 'arrow']
+    except ImportError:
+        pass
+    return formats
+
+
+def assert_columns_equal(actual, expected):
+    assert set(actual) == set(expected) | {'state_codes'}
+    assert list(actual['state_codes']) == list(STATE_CODES)
+    for name, values in expected.items():
+        assert actual[name].dtype.kind == values.dtype.kind, name
+        np.testing.assert_array_equal(np.asarray(actual[name]), values, err_msg=name)
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+@pytest.mark.parametrize('fmt', available_formats())
+def test_streamed_chunks_round_trip(tmp_path, fmt, mmap):
+    # 分块的图像名宽度不同, 行数不同(含空分块)
+    chunks = [random_columns(5, 0), random_columns(0, 1), random_columns(7, 2, 'a_longer_prefix')]
+    path = str(tmp_path / f'out{FORMATS[fmt][0]}')
+    with ColumnarWriter(path, fmt, STATE_CODES) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    assert writer.rows == 12
+
+    expected = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+    assert_columns_equal(read_columns(path, mmap=mmap), expected)
+
+    selected = read_columns(path, columns=['valence', 'state_code'], mmap=mmap)
+    assert set(selected) == {'valence', 'state_code', 'state_codes'}
+    np.testing.assert_array_equal(selected['valence'], expected['valence'])
+
+
+def test_npz_is_memory_mappable_and_readable_by_numpy(tmp_path):
+    path = str(tmp_path / 'out.npz')
+    columns = random_columns(10, 3)
+    write_columns(path, 'npz', columns, STATE_CODES)
+    with zipfile.ZipFile(path) as archive:
+        assert all(info.compress_type == zipfile.ZIP_STORED for info in archive.infolist())
+    assert isinstance(read_columns(path)['au_probs'], np.memmap)
+    with np.load(path) as data:
+        np.testing.assert_array_equal(data['au_probs'], columns['au_probs'])
+        np.testing.assert_array_equal(data['image'], columns['image'])
+
+
+def test_npz_writes_chunks_to_disk_as_they_arrive(tmp_path):
+    writer = ColumnarWriter(io.BytesIO(), 'npz', STATE_CODES)
+    writer.write(random_columns(100, 0))
+    # 分块已写入临时文件, 不在内存中保留
+    assert writer._spools['au_probs'].file.tell() == 100 * len(AU_NAMES) * 4
+    with pytest.raises(ValueError):
+        writer.write({'image': np.array(['x'])})
+    writer.close()
\ No newline at end of file
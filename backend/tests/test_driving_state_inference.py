@@ -0,0 +1,168 @@
+import numpy as np
+import pytest
+import torch
+
+from cascade import CascadePredictor
+from driving_state_inference import AU_NAMES, EMOTION_LABELS, CompactResult, DrivingStateInference
+
+# 规则中出现的VA阈值, 边界样本恰好落在阈值上
+VA_THRESHOLDS = (-0.1, 0.1, 0.15, 0.2, 0.25, 0.3, 0.5, 0.6, 0.65, 0.7)
+
+# 已知模态的组合 (va, fer, au)
+KNOWN = [(True, False, False), (True, True, False), (True, False, True),
+         (False, True, True), (False, True, False), (False, False, True)]
+
+
+def random_results(count, seed=0, au_threshold=0.5):
+    rng = np.random.RandomState(seed)
+    results = []
+    for i in range(count):
+        if i % 2:
+            valence, arousal = (float(rng.choice(VA_THRESHOLDS)) for _ in range(2))
+        else:
+            valence, arousal = float(rng.uniform(-0.3, 0.8)), float(rng.uniform(0, 1))
+        au_probs = rng.beta(0.5, 0.8, len(AU_NAMES)).astype(np.float32)
+        if i % 3 == 0:
+            # AU概率恰好等于激活阈值
+            au_probs[rng.randint(len(AU_NAMES))] = au_threshold
+        au_mask = sum(1 << j for j in range(len(AU_NAMES)) if au_probs[j] > au_threshold)
+        fer_probs = rng.dirichlet(np.ones(len(EMOTION_LABELS))).astype(np.float32)
+        results.append(CompactResult(None, au_probs, au_mask, fer_probs, int(fer_probs.argmax()),
+                                     valence, arousal))
+    return results
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return DrivingStateInference()
+
+
+@pytest.mark.parametrize('au_threshold', [0.5, 0.3])
+def test_infer_batch_matches_infer_driving_state(engine, au_threshold):
+    results = random_results(4000, seed=3, au_threshold=au_threshold)
+    codes, confidences = engine.infer_batch(
+        [result.valence for result in results], [result.arousal for result in results],
+        [result.emotion_index for result in results],
+        np.stack([result.au_probs for result in results]), au_threshold=au_threshold)
+    # 'surprised' 的条件(Surprise 且 arousal > 0.65)总是先命中优先级更高的 'alert'
+    reachable = set(engine.state_codes) - {'surprised'}
+    assert {engine.state_codes[code] for code in codes} == reachable
+    for result, code, confidence in zip(results, codes, confidences):
+        for single in (result, result.to_dict()):
+            expected = engine.infer_driving_state(single)
+            assert engine.state_codes[code] == expected['state_code']
+            assert confidence == expected['confidence']
+
+
+def test_infer_partial_matches_full_inference(engine):
+    decided = 0
+    for result in random_results(4000):
+        full = engine.infer_driving_state(result)
+        assert engine.infer_partial(result.valence, result.arousal, result.emotion,
+                                    result.au_probs, result.au_mask) == full
+        for known_va, known_fer, known_au in KNOWN:
+            partial = engine.infer_partial(
+                result.valence if known_va else None, result.arousal if known_va else None,
+                result.emotion if known_fer else None,
+                result.au_probs if known_au else None, result.au_mask if known_au else None)
+            if partial is None:
+                continue
+            decided += 1
+            assert partial['state_code'] == full['state_code']
+            assert partial['confidence'] == full['confidence']
+            for key, value in partial['details'].items():
+                if value is not None:
+                    assert full['details'][key] == value
+    # 确认测试覆盖到了提前确定的情况
+    assert decided > 1000
+
+
+def test_infer_partial_needs_va(engine):
+    for result in random_results(2000, seed=1):
+        assert engine.infer_partial(None, None, result.emotion, result.au_probs, result.au_mask) is None
+
+
+def test_infer_partial_respects_min_confidence(engine):
+    for result in random_results(500, seed=2):
+        partial = engine.infer_partial(result.valence, result.arousal, result.emotion,
+                                       min_confidence=0.99)
+        assert partial is None or partial['confidence'] >= 0.99
+
+
+def test_cascade_runs_va_first(engine):
+    cascade = CascadePredictor(None, engine, order=('fer', 'au', 'va'))
+    assert cascade.order == ('va', 'fer', 'au')
+    with pytest.raises(ValueError):
+        CascadePredictor(None, engine, order=('va', 'fer'))
+
+
+def test_skipped_branches():
+    result = random_results(1)[0]
+    assert result.skipped_branches == []
+    skipped = CompactResult(None, None, None, None, None, result.valence, result.arousal)
+    assert skipped.skipped_branches == ['fer', 'au']
+
+class ScriptedPredictor:
+    """按图像序号返回预设分支输出的预测器, 记录每个分支前向的图像"""
+
+    device = torch.device('cpu')
+    input_size = (4, 4)
+
+    def __init__(self, results):
+        self.results = results
+        self.calls = {'au': [], 'fer': [], 'va': []}
+
+    def load_image(self, index):
+        return torch.full((1, 1, 1), index, dtype=torch.uint8)
+
+    def wait_until_loaded(self):
+        pass
+
+    def _image_source(self, image):
+        return image
+
+    def _au_input(self, x):
+        return x
+
+    _fer_input = _affect_input = _au_input
+
+    def _indices(self, x):
+        return [int(value) for value in x.flatten(1)[:, 0].round()]
+
+    def _forward_au(self, x):
+        indices = self._indices(x * 255)
+        self.calls['au'].extend(indices)
+        return [self.results[i].au_probs for i in indices]
+
+    def _forward_fer(self, x):
+        indices = self._indices(x)
+        self.calls['fer'].extend(indices)
+        return [self.results[i].fer_probs for i in indices]
+
+    def _forward_va(self, x):
+        indices = self._indices(x * 255)
+        self.calls['va'].extend(indices)
+        return [np.array([self.results[i].valence, self.results[i].arousal]) for i in indices]
+
+
+def test_cascade_skips_fer_when_va_and_au_decide(engine):
+    results = random_results(200, seed=4)
+    # 第一张为典型的疲劳样本: 低唤醒、低效价、几乎无AU激活
+    results[0].valence, results[0].arousal = 0.0, 0.1
+    results[0].au_probs = np.zeros(len(AU_NAMES), dtype=np.float32)
+    results[0].au_mask = 0
+    predictor = ScriptedPredictor(results)
+    cascade = CascadePredictor(predictor, engine)
+    assert cascade.order == ('va', 'au', 'fer')
+
+    outputs = cascade.predict_batch(list(range(len(results))))
+    assert outputs[0][1]['state_code'] == 'drowsy'
+    assert outputs[0][0].fer_probs is None
+    assert 0 not in predictor.calls['fer']
+    assert len(predictor.calls['fer']) < len(results)
+    assert cascade.stats()['branch_skips']['fer'] == len(results) - len(predictor.calls['fer'])
+    for result, (cascaded, state) in zip(results, outputs):
+        expected = engine.infer_driving_state(result)
+        assert state['state_code'] == expected['state_code']
+        assert state['confidence'] == expected['confidence']
+        assert cascaded.skipped_branches == ([] if cascaded.fer_probs is not None else ['fer'])
\ No newline at end of file
@@ -0,0 +1,142 @@
+import threading
+
+import pytest
+
+import driving_state_tracker
+from driving_state_inference import AU_NAMES, CompactResult, DrivingStateInference
+from driving_state_tracker import DrivingStateTracker, DrivingStateTrackerRegistry
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return DrivingStateInference()
+
+
+def frame(valence=0.0, arousal=0.5, active_aus=0):
+    """只含VA和AU掩码的单帧结果(跟踪器不读取FER)"""
+    return CompactResult(None, None, (1 << active_aus) - 1 if active_aus is not None else None,
+                         None, None, valence, arousal)
+
+
+def state(code, confidence=0.8):
+    return {'state_code': code, 'confidence': confidence}
+
+
+def test_ema_smooths_va_and_au_activity(engine):
+    tracker = DrivingStateTracker(engine, alpha=0.5)
+    tracker.update(frame(valence=0.0, arousal=1.0, active_aus=0), state('relaxed'))
+    snapshot = tracker.update(frame(valence=1.0, arousal=0.0, active_aus=len(AU_NAMES)),
+                              state('relaxed'))
+    assert snapshot['smoothed'] == {'valence': 0.5, 'arousal': 0.5, 'au_activity': 0.5}
+    # 级联推理跳过AU分支的帧不改变AU活跃度
+    snapshot = tracker.update(frame(valence=1.0, arousal=0.0, active_aus=None), state('relaxed'))
+    assert snapshot['smoothed'] == {'valence': 0.75, 'arousal': 0.25, 'au_activity': 0.5}
+    assert snapshot['frames'] == 3
+
+
+def test_perclos_window_rolls_over(engine):
+    tracker = DrivingStateTracker(engine, perclos_window=4, perclos_threshold=2.0)
+    codes = ['drowsy', 'alert', 'drowsy', 'alert', 'alert', 'alert', 'alert']
+    expected = [1 / 1, 1 / 2, 2 / 3, 2 / 4, 1 / 4, 1 / 4, 0 / 4]
+    for code, perclos in zip(codes, expected):
+        assert tracker.update(frame(), state(code))['perclos'] == pytest.approx(perclos)
+    assert tracker.drowsy_count == 0
+
+
+def test_sustained_perclos_forces_drowsy(engine):
+    tracker = DrivingStateTracker(engine, perclos_window=10, perclos_threshold=0.4,
+                                  enter_frames=1, exit_frames=100)
+    snapshot = tracker.update(frame(), state('alert'))
+    assert snapshot['state_code'] == 'alert'
+    for _ in range(3):
+        snapshot = tracker.update(frame(), state('drowsy', 0.7))
+    # 单帧仍为疲劳, 窗口内占比 3/4 即判定为持续疲劳
+    assert snapshot['state_code'] == 'drowsy' and snapshot['perclos'] == 0.75
+    # 第2帧(占比1/2)切换, 之后置信度取 max(单帧置信度, 占比) 的滑动平均: 0.7 -> 0.7 -> 0.715
+    assert snapshot['confidence'] == pytest.approx(0.715)
+    # 单帧不再疲劳, 但占比未降到阈值以下, 候选仍为疲劳
+    snapshot = tracker.update(frame(), state('alert'))
+    assert snapshot['frame_state_code'] == 'alert' and snapshot['state_code'] == 'drowsy'
+    assert snapshot['pending_state_code'] is None
+
+
+def test_hysteresis_transitions(engine):
+    tracker = DrivingStateTracker(engine, alpha=0.5, perclos_threshold=2.0,
+                                  enter_frames=2, exit_frames=3)
+    script = [
+        # (单帧状态, 期望的平滑状态, 期望的候选状态)
+        ('alert', 'alert', None),          # 第一帧直接采用
+        ('drowsy', 'alert', 'drowsy'),     # 风险更高: 需连续2帧
+        ('drowsy', 'drowsy', None),
+        ('alert', 'drowsy', 'alert'),      # 风险更低: 需连续3帧
+        ('alert', 'drowsy', 'alert'),
+        ('drowsy', 'drowsy', None),        # 候选被打断, 计数清零
+        ('alert', 'drowsy', 'alert'),
+        ('distracted', 'drowsy', 'distracted'),
+        ('distracted', 'drowsy', 'distracted'),
+        ('distracted', 'distracted', None),
+        ('angry', 'distracted', 'angry'),
+        ('angry', 'angry', None),
+    ]
+    for step, (code, expected, pending) in enumerate(script):
+        snapshot = tracker.update(frame(), state(code))
+        assert (snapshot['state_code'], snapshot['pending_state_code']) == (expected, pending), step
+
+
+def test_confidence_decays_while_pending(engine):
+    tracker = DrivingStateTracker(engine, alpha=0.5, perclos_threshold=2.0,
+                                  enter_frames=2, exit_frames=3)
+    assert tracker.update(frame(), state('alert', 0.8))['confidence'] == 0.8
+    assert tracker.update(frame(), state('alert', 0.4))['confidence'] == pytest.approx(0.6)
+    assert tracker.update(frame(), state('relaxed', 0.9))['confidence'] == pytest.approx(0.3)
+
+
+def test_registry_evicts_lru_and_idle_sessions(engine, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(driving_state_tracker.time, 'monotonic', lambda: now[0])
+    registry = DrivingStateTrackerRegistry(engine, max_sessions=2, idle_timeout=60)
+    registry.update('a', frame(), state('alert'))
+    registry.update('b', frame(), state('alert'))
+    registry.update('a', frame(), state('alert'))
+    registry.update('c', frame(), state('alert'))
+    assert list(registry._trackers) == ['a', 'c']
+    assert registry.update('a', frame(), state('alert'))['frames'] == 3
+
+    now[0] += 30
+    registry.update('c', frame(), state('alert'))
+    now[0] += 45
+    # a 已空闲75秒, c 空闲45秒
+    registry.update('d', frame(), state('alert'))
+    assert list(registry._trackers) == ['c', 'd']
+    assert registry.update('c', frame(), state('alert'))['frames'] == 3
+
+    registry.reset('c')
+    assert len(registry) == 1
+    assert registry.update('c', frame(), state('alert'))['frames'] == 1
+
+
+def test_registry_does_not_serialize_sessions(engine, monkeypatch):
+    entered, release = threading.Event(), threading.Event()
+    update = DrivingStateTracker._update
+
+    def blocking_update(self, results, frame_state):
+        if frame_state.get('block'):
+            entered.set()
+            release.wait(5)
+        return update(self, results, frame_state)
+
+    monkeypatch.setattr(DrivingStateTracker, '_update', blocking_update)
+    registry = DrivingStateTrackerRegistry(engine)
+    slow = threading.Thread(target=registry.update,
+                            args=('a', frame(), {**state('alert'), 'block': True}))
+    slow.start()
+    assert entered.wait(5)
+    done = []
+    fast = threading.Thread(target=lambda: done.append(registry.update('b', frame(), state('alert'))))
+    fast.start()
+    fast.join(2)
+    finished_while_blocked = bool(done)
+    release.set()
+    slow.join(5)
+    fast.join(5)
+    assert finished_while_blocked
\ No newline at end of file
@@ -0,0 +1,83 @@
+import threading
+
+import numpy as np
+import pytest
+
+pytest.importorskip('cv2')
+
+from face_roi import FaceROITracker, FaceROITrackerRegistry  # noqa: E402
+
+
+def textured_frame(x, y, size=60, shape=(240, 320), seed=0):
+    rng = np.random.RandomState(seed)
+    gray = (rng.rand(*shape) * 64).astype(np.uint8)
+    face = (np.random.RandomState(seed + 1).rand(size, size) * 255).astype(np.uint8)
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(shape[1], x + size), min(shape[0], y + size)
+    if x1 > x0 and y1 > y0:
+        gray[y0:y1, x0:x1] = face[y0 - y:y1 - y, x0 - x:x1 - x]
+    return np.stack([gray] * 3, axis=-1)
+
+
+@pytest.mark.parametrize('box', [(-20, -15, 60, 60), (290, 200, 60, 60), (-100, 10, 50, 50)])
+def test_out_of_frame_boxes_are_clipped(box):
+    """检测器返回超出画面(或完全在画面外)的框时, 检测和后续跟踪都不应出错"""
+    tracker = FaceROITracker(detect_every=5, work_width=320, detector=lambda image: [box])
+    for i in range(12):
+        frame = textured_frame(box[0] + i, box[1])
+        crop, face_box = tracker.crop(frame)
+        assert crop.size > 0
+        if face_box is not None:
+            x, y, w, h = face_box
+            assert x >= 0 and y >= 0 and w > 0 and h > 0
+            assert x + w <= frame.shape[1] and y + h <= frame.shape[0]
+    if box[0] + box[2] <= 0:
+        assert tracker.stats()['missed_frames'] == 12
+
+
+def test_tracks_moving_face():
+    positions = [(40 + 3 * i, 50 + 2 * i) for i in range(20)]
+    current = {}
+    tracker = FaceROITracker(detect_every=10, work_width=320,
+                             detector=lambda image: [(*current['xy'], 60, 60)])
+    for x, y in positions:
+        current['xy'] = (x, y)
+        _, face_box = tracker.crop(textured_frame(x, y))
+        assert abs(face_box[0] - x) <= 1 and abs(face_box[1] - y) <= 1
+    assert tracker.detections == 2
+
+
+def test_registry_keeps_sessions_separate():
+    registry = FaceROITrackerRegistry(max_sessions=1, detector=lambda image: [(10, 10, 60, 60)])
+    registry.crop('a', textured_frame(10, 10))
+    registry.crop('b', textured_frame(10, 10))
+    assert len(registry) == 1
+
+def test_registry_does_not_serialize_sessions():
+    """某个会话的检测阻塞时, 其他会话的跟踪不应等待"""
+    entered, release = threading.Event(), threading.Event()
+
+    def detector(image):
+        if block['on']:
+            entered.set()
+            release.wait(5)
+        return [(10, 10, 60, 60)]
+
+    block = {'on': False}
+    registry = FaceROITrackerRegistry(detector=detector, detect_every=10)
+    registry.crop('a', textured_frame(10, 10))
+
+    block['on'] = True
+    worker = threading.Thread(target=registry.crop, args=('b', textured_frame(10, 10)))
+    worker.start()
+    assert entered.wait(5)
+    done = []
+    tracker = threading.Thread(target=lambda: done.append(registry.crop('a', textured_frame(12, 10))))
+    tracker.start()
+    tracker.join(2)
+    released_late = not done
+    release.set()
+    worker.join(5)
+    tracker.join(5)
+    assert not released_late
+    assert done[0][1] is not None
\ No newline at end of file
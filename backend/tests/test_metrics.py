@@ -0,0 +1,92 @@
+import multiprocessing
+
+import pytest
+
+import metrics
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = metrics.Histogram('test_seconds', 'test', buckets=(0.01, 0.1, 1.0))
+    for value in [0.005] * 50 + [0.05] * 45 + [0.5] * 4 + [5.0]:
+        histogram.observe(value)
+    lines = histogram.render().splitlines()
+    assert 'test_seconds_bucket{le="0.01"} 50' in lines
+    assert 'test_seconds_bucket{le="0.1"} 95' in lines
+    assert 'test_seconds_bucket{le="+Inf"} 100' in lines
+    assert 'test_seconds_count 100' in lines
+
+    counts = histogram.snapshot()[()]['counts']
+    assert metrics.histogram_quantile(0.5, histogram.buckets, counts) == pytest.approx(0.01)
+    assert 0.01 < metrics.histogram_quantile(0.95, histogram.buckets, counts) <= 0.1
+    assert 0.1 < metrics.histogram_quantile(0.99, histogram.buckets, counts) <= 1.0
+
+
+def test_stage_quantiles_for_health(monkeypatch):
+    monkeypatch.setattr(metrics.STAGE_SECONDS, '_children', {})
+    for value in [0.002] * 90 + [0.2] * 10:
+        metrics.STAGE_SECONDS.labels('decode').observe(value)
+    quantiles = metrics.stage_quantiles()
+    assert set(quantiles) == {'decode'}
+    assert set(quantiles['decode']) == {'p50', 'p95', 'p99'}
+    assert 1.0 < quantiles['decode']['p50'] <= 2.5
+    assert 100.0 < quantiles['decode']['p99'] <= 250.0
+
+
+def _worker(directory, amount):
+    metrics._multiprocess_dir = directory
+    for metric in metrics.REGISTRY:
+        metric.reset()
+    metrics.record_request('/api/detect/image')
+    metrics.record_items('/api/detect/batch', amount, failed=1)
+    metrics.STAGE_SECONDS.labels('decode').observe(0.003)
+    metrics.QUEUE_DEPTH.labels('micro_batch').set_function(lambda: amount)
+    metrics.write_snapshot()
+
+
+def test_multiprocess_snapshots_are_merged(tmp_path, monkeypatch):
+    context = multiprocessing.get_context('fork')
+    metrics.clear_multiprocess_dir(str(tmp_path))
+    for amount in (3, 4):
+        process = context.Process(target=_worker, args=(str(tmp_path), amount))
+        process.start()
+        process.join()
+        assert process.exitcode == 0
+
+    monkeypatch.setattr(metrics, '_multiprocess_dir', str(tmp_path))
+    for metric in metrics.REGISTRY:
+        monkeypatch.setattr(metric, '_children', {})
+    lines = metrics.render_metrics().splitlines()
+    assert 'drive_state_requests_total{endpoint="/api/detect/image"} 2.0' in lines
+    assert 'drive_state_items_total{endpoint="/api/detect/batch"} 7.0' in lines
+    assert 'drive_state_item_errors_total{endpoint="/api/detect/batch"} 2.0' in lines
+    assert 'drive_state_stage_seconds_count{stage="decode"} 2' in lines
+    # 已退出进程的计数保留, 瞬时值(队列深度)不计入
+    assert not any(line.startswith('drive_state_queue_depth{') for line in lines)
+
+
+def test_reused_pid_does_not_overwrite_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, '_multiprocess_dir', str(tmp_path))
+    for metric in metrics.REGISTRY:
+        monkeypatch.setattr(metric, '_children', {})
+    monkeypatch.setattr(metrics.os, 'getpid', lambda: 12345)
+    # 已退出的 worker 与之后复用其PID的新 worker
+    for started, amount in ((1, 5), (2, 3)):
+        monkeypatch.setattr(metrics, '_snapshot_id', (12345, started))
+        for metric in metrics.REGISTRY:
+            metric.reset()
+        metrics.record_request('/api/detect/image')
+        metrics.record_items('/api/detect/batch', amount)
+        metrics.QUEUE_DEPTH.labels('micro_batch').set_function(lambda: amount)
+        metrics.write_snapshot()
+    monkeypatch.setattr(metrics.os, 'getpid', lambda: 99999)
+    monkeypatch.setattr(metrics, '_snapshot_id', (99999, 0))
+    monkeypatch.setattr(metrics, '_pid_alive', lambda pid: pid == 12345)
+    for metric in metrics.REGISTRY:
+        metric.reset()
+
+    assert len(list(tmp_path.glob('12345-*.json'))) == 2
+    lines = metrics.render_metrics().splitlines()
+    assert 'drive_state_requests_total{endpoint="/api/detect/image"} 2.0' in lines
+    assert 'drive_state_items_total{endpoint="/api/detect/batch"} 8.0' in lines
+    # 只有最新快照属于存活的进程
+    assert 'drive_state_queue_depth{queue="micro_batch"} 3.0' in lines
\ No newline at end of file
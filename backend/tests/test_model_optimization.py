@@ -0,0 +1,81 @@
+import copy
+
+import pytest
+import torch
+import torch.nn as nn
+
+from model_optimization import fold_batch_norm, optimize_model
+from three import ResNet18
+
+
+def randomize_norm_stats(model):
+    generator = torch.Generator().manual_seed(0)
+    for module in model.modules():
+        if isinstance(module, (nn.BatchNorm1d, nn.BatchNorm2d)):
+            for tensor, low, high in ((module.running_mean, -0.5, 0.5), (module.running_var, 0.5, 2.0),
+                                      (module.weight.data, 0.5, 1.5), (module.bias.data, -0.5, 0.5)):
+                tensor.copy_(torch.rand(tensor.shape, generator=generator) * (high - low) + low)
+    return model.eval()
+
+
+class TracedNet(nn.Module):
+    """conv/bn 为直接属性(非 nn.Sequential), 只有 FX 路径能找到可折叠的层"""
+
+    def __init__(self):
+        super().__init__()
+        self.conv = nn.Conv2d(3, 8, 3, padding=1)
+        self.bn = nn.BatchNorm2d(8)
+        self.fc = nn.Linear(8, 4)
+        self.bn_fc = nn.BatchNorm1d(4)
+
+    def forward(self, x):
+        x = torch.relu(self.bn(self.conv(x)))
+        return self.bn_fc(self.fc(x.mean(dim=(2, 3))))
+
+
+class UntraceableNet(nn.Module):
+    """前向中有依赖数据的分支, FX 追踪失败, 回退到只折叠 nn.Sequential 中的相邻层"""
+
+    def __init__(self):
+        super().__init__()
+        self.features = nn.Sequential(nn.Conv2d(3, 8, 3, padding=1), nn.BatchNorm2d(8), nn.ReLU())
+        self.head = nn.Sequential(nn.Linear(8, 4), nn.BatchNorm1d(4))
+
+    def forward(self, x):
+        x = self.features(x).mean(dim=(2, 3))
+        if x.sum() > 0:
+            x = x * 2
+        return self.head(x)
+
+
+@pytest.mark.parametrize('factory, channels, folded', [
+    (TracedNet, 3, 2),
+    (UntraceableNet, 3, 2),
+    (lambda: ResNet18(num_classes=7), 1, None),
+])
+def test_optimize_model_matches_eval(factory, channels, folded):
+    torch.manual_seed(0)
+    model = randomize_norm_stats(factory())
+    x = torch.randn(4, channels, 48, 48)
+    with torch.no_grad():
+        expected = model(x)
+        count = fold_batch_norm(copy.deepcopy(model))
+        actual = optimize_model(copy.deepcopy(model))(x)
+    if folded is not None:
+        assert count == folded
+    else:
+        assert count > 0
+    torch.testing.assert_close(actual, expected, atol=1e-4, rtol=1e-4)
+
+
+def test_untraceable_model_uses_sequential_fallback():
+    with pytest.raises(Exception):
+        torch.fx.symbolic_trace(UntraceableNet())
+    model = randomize_norm_stats(UntraceableNet())
+    fold_batch_norm(model)
+    assert not any(isinstance(m, nn.BatchNorm2d) for m in model.modules())
+
+
+def test_fold_requires_eval_mode():
+    with pytest.raises(ValueError):
+        fold_batch_norm(TracedNet().train())
\ No newline at end of file
@@ -0,0 +1,90 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import metrics
+import motion_gate
+from motion_gate import MotionGate, MotionGateRegistry, frame_signature
+
+
+def scene(seed=0, shape=(240, 320)):
+    rng = np.random.RandomState(seed)
+    # 平滑的背景, 缩小后签名稳定
+    base = rng.rand(6, 8, 3)
+    image = Image.fromarray((base * 255).astype(np.uint8)).resize(shape[::-1], Image.BILINEAR)
+    return np.asarray(image)
+
+
+def jitter(frame, amplitude=3, seed=1):
+    """模拟传感器噪声: 像素级的小幅随机扰动"""
+    noise = np.random.RandomState(seed).randint(-amplitude, amplitude + 1, frame.shape)
+    return np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def jpeg(frame):
+    buffer = io.BytesIO()
+    Image.fromarray(frame).save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def gate_counts():
+    counts = metrics.MOTION_GATE.snapshot()
+    return counts.get(('hit',), 0), counts.get(('miss',), 0)
+
+
+def test_signature_from_jpeg_matches_array():
+    frame = scene()
+    from_bytes = frame_signature(jpeg(frame))
+    assert from_bytes.shape == (24, 32)
+    assert np.abs(from_bytes - frame_signature(frame)).mean() < 0.01
+
+
+def test_identical_and_near_identical_frames_reuse_result():
+    gate = MotionGate(threshold=0.02, max_reuse=10, max_age=None)
+    frame = scene()
+    assert gate.lookup(frame_signature(frame)) is None
+    gate.store(frame_signature(frame), 'result')
+    assert gate.lookup(frame_signature(frame)) == 'result'
+    assert gate.lookup(frame_signature(jitter(frame))) == 'result'
+    assert gate.lookup(frame_signature(jpeg(jitter(frame, seed=2)))) == 'result'
+
+
+def test_changed_frame_is_a_miss():
+    gate = MotionGate(threshold=0.02, max_reuse=10, max_age=None)
+    gate.store(frame_signature(scene(0)), 'result')
+    assert gate.lookup(frame_signature(scene(1))) is None
+
+
+def test_reuse_is_bounded_by_count_and_age(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(motion_gate.time, 'monotonic', lambda: now[0])
+    signature = frame_signature(scene())
+    gate = MotionGate(max_reuse=2, max_age=1.0)
+    gate.store(signature, 'result')
+    assert [gate.lookup(signature) for _ in range(3)] == ['result', 'result', None]
+
+    gate.store(signature, 'fresh')
+    now[0] += 1.5
+    assert gate.lookup(signature) is None
+
+
+def test_registry_counts_hits_and_misses_in_metrics():
+    registry = MotionGateRegistry(threshold=0.02, max_reuse=10, max_age=None)
+    frame = scene()
+    hits, misses = gate_counts()
+
+    assert registry.lookup('a', frame_signature(frame)) is None
+    registry.store('a', frame_signature(frame), 'result')
+    assert registry.lookup('a', frame_signature(jitter(frame))) == 'result'
+    assert registry.lookup('a', frame_signature(scene(1))) is None
+    # 会话之间互不复用
+    assert registry.lookup('b', frame_signature(frame)) is None
+
+    stats = registry.stats()
+    assert (stats['hits'], stats['misses'], stats['sessions']) == (1, 3, 1)
+    assert stats['hit_rate'] == pytest.approx(0.25)
+    assert gate_counts() == (hits + 1, misses + 3)
+    rendered = metrics.MOTION_GATE.render()
+    assert 'drive_state_motion_gate_total{result="hit"}' in rendered
\ No newline at end of file
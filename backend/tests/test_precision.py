@@ -0,0 +1,47 @@
+import pytest
+import torch
+
+import precision
+from precision import resolve_precision
+
+CPU = torch.device('cpu')
+
+
+@pytest.mark.parametrize('requested, fp16, bf16, expected', [
+    ('fp16', True, True, 'fp16'),
+    ('fp16', False, True, 'bf16'),
+    ('fp16', False, False, 'fp32'),
+    ('bf16', True, True, 'bf16'),
+    ('bf16', True, False, 'fp32'),
+    ('fp32', True, True, 'fp32'),
+])
+def test_fallback_order(monkeypatch, capsys, requested, fp16, bf16, expected):
+    monkeypatch.setattr(precision, 'supports_fp16', lambda device: fp16)
+    monkeypatch.setattr(precision, 'supports_bf16', lambda device: bf16)
+    assert resolve_precision(requested, CPU) == (expected, precision.PRECISIONS[expected])
+    # 发生回退时打印提示
+    assert ('回退到' in capsys.readouterr().out) == (expected != requested)
+
+
+@pytest.mark.parametrize('backend', ['onnx', 'torchscript', 'int8'])
+def test_exported_backends_run_in_fp32(monkeypatch, backend):
+    monkeypatch.setattr(precision, 'supports_fp16', lambda device: True)
+    monkeypatch.setattr(precision, 'supports_bf16', lambda device: True)
+    assert resolve_precision('fp16', CPU, backend=backend) == ('fp32', None)
+
+
+def test_unknown_precision():
+    with pytest.raises(ValueError):
+        resolve_precision('int4', CPU)
+
+
+def test_cpu_fp16_needs_amx(monkeypatch):
+    class FakeCPU:
+        _is_amx_fp16_supported = staticmethod(lambda: False)
+        _is_avx512_bf16_supported = staticmethod(lambda: False)
+        _is_amx_tile_supported = staticmethod(lambda: True)
+
+    monkeypatch.setattr(torch, 'cpu', FakeCPU, raising=False)
+    assert not precision.supports_fp16(CPU)
+    assert precision.supports_bf16(CPU)
+    assert resolve_precision('fp16', CPU) == ('bf16', torch.bfloat16)
\ No newline at end of file
@@ -0,0 +1,98 @@
+import importlib
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+import types
+import urllib.request
+
+import pytest
+import torch
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'), reason='预派生服务需要 fork')
+
+
+@pytest.fixture
+def prefork_server():
+    # 导入时会设置主进程的线程数环境变量, 测试结束后恢复
+    saved = {name: os.environ.get(name) for name in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS')}
+    threads = torch.get_num_threads()
+    yield importlib.import_module('prefork_server')
+    torch.set_num_threads(threads)
+    for name, value in saved.items():
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = value
+
+
+def fake_service(device='cpu'):
+    """替代 python_service(后者在导入时加载真实模型): 每个请求返回处理它的 worker 的PID"""
+    service = types.ModuleType('python_service')
+
+    def app(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return [str(os.getpid()).encode()]
+
+    service.app = app
+    service.predictor = types.SimpleNamespace(device=torch.device(device),
+                                              wait_until_loaded=lambda: None)
+    service.start_scheduler = service.start_warmup = lambda: None
+    return service
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def worker_pid(port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=2) as response:
+                return int(response.read())
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def test_rejects_cuda(prefork_server, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'python_service', fake_service('cuda'))
+    with pytest.raises(SystemExit, match='仅支持CPU'):
+        prefork_server.serve(1, 1, host='127.0.0.1', port=free_port())
+
+
+def test_restarts_dead_workers(prefork_server, monkeypatch, tmp_path):
+    monkeypatch.setitem(sys.modules, 'python_service', fake_service())
+    monkeypatch.setenv('METRICS_MULTIPROC_DIR', str(tmp_path))
+    port = free_port()
+    master = multiprocessing.get_context('fork').Process(
+        target=prefork_server.serve, args=(2, 1), kwargs={'host': '127.0.0.1', 'port': port})
+    master.start()
+    try:
+        # 两个 worker 都已接受过连接, 之后出现的新PID只能来自重启
+        workers = set()
+        deadline = time.monotonic() + 10
+        while len(workers) < 2 and time.monotonic() < deadline:
+            workers.add(worker_pid(port))
+        assert len(workers) == 2 and master.pid not in workers
+
+        killed = workers.pop()
+        os.kill(killed, signal.SIGKILL)
+        deadline = time.monotonic() + 10
+        replacement = None
+        while replacement is None and time.monotonic() < deadline:
+            pid = worker_pid(port)
+            if pid != killed and pid not in workers:
+                replacement = pid
+        assert replacement is not None, '被杀死的 worker 没有被重启'
+        assert master.is_alive()
+    finally:
+        os.kill(master.pid, signal.SIGTERM)
+        master.join(10)
+    assert master.exitcode == 0
\ No newline at end of file
@@ -0,0 +1,25 @@
+import pytest
+
+from quantization import split_calibration
+
+
+def test_extra_images_are_used_for_evaluation():
+    images = [f'{i:03d}.jpg' for i in range(250)]
+    calibration, evaluation = split_calibration(images, 200)
+    assert calibration == images[:200] and evaluation == images[200:]
+
+
+@pytest.mark.parametrize('count', [2, 5, 50, 200])
+def test_small_calibration_set_holds_out_evaluation_images(count):
+    images = [f'{i:03d}.jpg' for i in range(count)]
+    calibration, evaluation = split_calibration(images, 200, eval_fraction=0.2)
+    assert evaluation
+    assert not set(calibration) & set(evaluation)
+    assert sorted(calibration + evaluation) == images
+    assert len(evaluation) == max(1, int(count * 0.2))
+
+
+@pytest.mark.parametrize('count', [0, 1])
+def test_too_few_images_for_evaluation(count):
+    images = [f'{i:03d}.jpg' for i in range(count)]
+    assert split_calibration(images, 200) == (images, [])
\ No newline at end of file
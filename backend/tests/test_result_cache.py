@@ -0,0 +1,89 @@
+import os
+import time
+
+from result_cache import ResultCache
+
+
+def disk_files(directory):
+    return sorted(name for _, _, files in os.walk(directory) for name in files)
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    cache = ResultCache(disk_dir=str(tmp_path))
+    cache.put('ab' * 32, {'state': 'alert'})
+    assert ResultCache(disk_dir=str(tmp_path)).get('ab' * 32) == {'state': 'alert'}
+
+
+def test_sweep_evicts_oldest_first(tmp_path):
+    cache = ResultCache(max_entries=0, disk_dir=str(tmp_path), disk_max_bytes=1000,
+                        disk_sweep_interval=3600)
+    keys = [f'{i:02d}' * 32 for i in range(20)]
+    for i, key in enumerate(keys):
+        cache._disk_put(key, b'"' + b'x' * 98 + b'"', time.time() - 100 + i)
+
+    stats = cache.sweep_disk()
+    assert stats['bytes'] <= 900 and stats['evicted'] == 11
+    assert all(cache.get(key) is None for key in keys[:11])
+    assert cache._disk_get(keys[-1], time.time()) is not None
+
+
+def test_sweep_removes_expired_entries(tmp_path):
+    cache = ResultCache(max_entries=0, ttl=60, disk_dir=str(tmp_path), disk_max_bytes=None)
+    cache._disk_put('aa' * 32, b'{}', time.time() - 120)
+    cache._disk_put('bb' * 32, b'{}', time.time())
+    assert cache.sweep_disk()['expired'] == 1
+    assert disk_files(tmp_path) == ['bb' * 32 + '.json']
+
+
+def test_put_triggers_background_sweep(tmp_path):
+    cache = ResultCache(max_entries=0, disk_dir=str(tmp_path), disk_max_bytes=2000,
+                        disk_sweep_interval=3600)
+    for i in range(100):
+        cache.put(f'{i:02d}' * 32, {'payload': 'x' * 100})
+    deadline = time.time() + 5
+    while cache._sweep_lock.locked() and time.time() < deadline:
+        time.sleep(0.01)
+    cache.sweep_disk()
+    assert sum(os.path.getsize(os.path.join(root, name))
+               for root, _, files in os.walk(tmp_path) for name in files) <= 2000
+    assert cache.stats()['disk_evictions'] > 0
+
+
+def test_disk_errors_are_counted_not_raised(tmp_path, capsys):
+    cache = ResultCache(max_entries=0, disk_dir=str(tmp_path))
+    key = 'cd' * 32
+    os.makedirs(os.path.dirname(cache._disk_path(key)))
+    with open(cache._disk_path(key), 'w') as f:
+        f.write('not json')
+    assert cache.get(key) is None
+    assert not os.path.exists(cache._disk_path(key))
+
+    # 目标路径被目录占用, 写入失败
+    os.makedirs(cache._disk_path(key))
+    cache.put(key, {'state': 'alert'})
+    assert cache.stats()['disk_errors'] == 2
+    assert '结果缓存磁盘层' in capsys.readouterr().out
+
+def test_disk_hit_keeps_original_creation_time(tmp_path):
+    cache = ResultCache(ttl=60, disk_dir=str(tmp_path))
+    key = 'ef' * 32
+    cache._disk_put(key, b'{"state": "alert"}', time.time() - 50)
+    assert cache.get(key) == {'state': 'alert'}
+    # 提升到内存层的条目仍按磁盘写入时间过期, 而不是从提升时重新计时
+    created_at = cache._entries[key][0]
+    assert time.time() - created_at >= 50
+    assert not cache._expired(created_at, created_at + 10)
+    assert cache._expired(created_at, created_at + 61)
+
+
+def test_key_includes_inference_config():
+    data = b'image bytes'
+    plain = ResultCache.make_key(data, 0.5, 'v1')
+    assert ResultCache.make_key(data, 0.5, 'v1', None) == plain
+    first = ResultCache.make_key(data, 0.5, 'v1', {'cascade_order': ['va', 'au', 'fer'],
+                                                   'cascade_min_confidence': 0.0})
+    other_order = ResultCache.make_key(data, 0.5, 'v1', {'cascade_order': ['va', 'fer', 'au'],
+                                                         'cascade_min_confidence': 0.0})
+    other_confidence = ResultCache.make_key(data, 0.5, 'v1', {'cascade_order': ['va', 'au', 'fer'],
+                                                              'cascade_min_confidence': 0.8})
+    assert len({plain, first, other_order, other_confidence}) == 4
\ No newline at end of file
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+
+from video_pipeline import chunked, iter_sampled_frames  # noqa: E402
+
+NATIVE_FPS = 10
+FRAME_COUNT = 20
+
+
+def frame_level(index):
+    return 10 + index * 12
+
+
+@pytest.fixture(scope='module')
+def video_path(tmp_path_factory):
+    """10fps、20帧的MJPG视频, 第i帧为亮度 frame_level(i) 的纯色图像"""
+    path = str(tmp_path_factory.mktemp('video') / 'clip.avi')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), NATIVE_FPS, (64, 48))
+    if not writer.isOpened():
+        pytest.skip('当前 OpenCV 不支持写入 MJPG 视频')
+    for index in range(FRAME_COUNT):
+        writer.write(np.full((48, 64, 3), frame_level(index), dtype=np.uint8))
+    writer.release()
+    return path
+
+
+@pytest.mark.parametrize('sample_fps, expected', [
+    (5.0, list(range(0, FRAME_COUNT, 2))),
+    (2.5, list(range(0, FRAME_COUNT, 4))),
+    # 采样时刻为 0, 1/3, 2/3, 1, ... 秒, 取时间戳不早于采样时刻的第一帧
+    (3.0, [0, 4, 7, 10, 14, 17]),
+    (NATIVE_FPS, list(range(FRAME_COUNT))),
+    (30.0, list(range(FRAME_COUNT))),
+    (0, list(range(FRAME_COUNT))),
+])
+def test_sampling_steps_through_video(video_path, sample_fps, expected):
+    frames = list(iter_sampled_frames(video_path, sample_fps=sample_fps))
+    assert [index for index, _, _ in frames] == expected
+    for index, timestamp, frame in frames:
+        assert timestamp == pytest.approx(index / NATIVE_FPS)
+        assert frame.shape == (48, 64, 3) and frame.dtype == np.uint8
+        # 解码出的是对应帧(而不是相邻帧)
+        assert abs(float(frame.mean()) - frame_level(index)) < 4
+
+
+def test_sampling_is_lazy(video_path):
+    frames = iter_sampled_frames(video_path, sample_fps=5.0)
+    assert next(frames)[0] == 0
+    assert next(frames)[0] == 2
+    frames.close()
+
+
+def test_unreadable_video(tmp_path):
+    path = tmp_path / 'broken.avi'
+    path.write_bytes(b'not a video')
+    with pytest.raises(ValueError):
+        list(iter_sampled_frames(str(path)))
+
+
+def test_chunked():
+    assert list(chunked(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(chunked([], 3)) == []
\ No newline at end of file
@@ -0,0 +1,57 @@
+import io
+
+import torch
+from PIL import Image
+
+from warmup import WarmupRunner, warm_up
+
+
+class FakePredictor:
+    device = torch.device('cpu')
+    input_size = (224, 224)
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.batches = []
+
+    def wait_until_loaded(self):
+        pass
+
+    def predict_batch(self, images, compact=False):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError('out of memory')
+        self.batches.append(images)
+        return [Image.open(io.BytesIO(data)).size for data in images]
+
+
+class FakeEngine:
+    def infer_driving_state_batch(self, results_list):
+        return results_list
+
+
+def test_warm_up_decodes_jpegs():
+    predictor = FakePredictor()
+    report = warm_up(predictor, FakeEngine(), batch_sizes=(1, 4), iterations=2)
+    assert sorted(report['batch_sizes']) == [1, 4]
+    # 以编码后的JPEG走 load_image 的解码路径
+    assert all(isinstance(data, bytes) and data[:2] == b'\xff\xd8'
+               for batch in predictor.batches for data in batch)
+    assert [len(batch) for batch in predictor.batches] == [1, 1, 4, 4]
+
+
+def test_warmup_retries_then_succeeds():
+    runner = WarmupRunner(FakePredictor(failures=1), FakeEngine(), retries=2, retry_delay=0)
+    runner.run()
+    status = runner.status()
+    assert status['ready'] and not status['degraded']
+    assert status['attempts'] == 2 and 'error' not in status
+
+
+def test_warmup_becomes_degraded_after_retries():
+    runner = WarmupRunner(FakePredictor(failures=10), FakeEngine(), retries=2, retry_delay=0)
+    runner.start().wait(timeout=10)
+    status = runner.status()
+    assert status['ready'] and status['degraded']
+    assert status['attempts'] == 3
+    assert 'out of memory' in status['error']
\ No newline at end of file
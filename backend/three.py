@@ -1,13 +1,38 @@
 import torch
 import torch.nn as nn
-from torchvision import transforms
+import hashlib
+import io
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from PIL import Image
-import matplotlib.pyplot as plt
-from typing import Dict, List, Tuple, Any
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple, Any, Union
 
 # 导入你的模型结构
-from Model.alexnet import alexnet  # AU模型
+try:
+    from Model.alexnet import alexnet  # AU模型
+except ImportError:
+    # Model 包不随本仓库分发; 未安装时仍可导入本模块, 但需通过 au_model_factory 提供AU模型结构
+    alexnet = None
+from driving_state_inference import AU_NAMES, EMOTION_LABELS, CompactResult
+from inference_backends import BRANCHES, branch_path, load_backend_models
+import metrics
+from model_optimization import optimize_model
+from precision import resolve_precision
+
+# 预测器可接受的图像输入: 路径、编码后的字节数据、类文件对象、PIL图像、uint8数组,
+# 或 load_image() 已处理好的 [3, H, W] uint8张量
+ImageInput = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO,
+                   Image.Image, np.ndarray, torch.Tensor]
+
+# 扫描目录时视为图像的文件扩展名(小写)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+# 特征提取器没有权重文件, 固定随机种子使其权重在重启和多进程间保持一致
+FEATURE_EXTRACTOR_SEED = 0
 
 
 # ========== FER模型结构定义 ==========
@@ -154,6 +179,12 @@ class SimpleFeatureExtractor(nn.Module):
 
 
 # ========== 集成预测器 ==========
+def _default_au_model() -> nn.Module:
+    if alexnet is None:
+        raise RuntimeError("加载AU模型需要 Model.alexnet, 请安装 Model 包或传入 au_model_factory")
+    return alexnet(pretrained=False)
+
+
 class IntegratedEmotionPredictor:
     """集成AU识别、FER分类和VA回归的多模态情感预测器"""
 
@@ -161,7 +192,15 @@ class IntegratedEmotionPredictor:
                  au_model_path: str,
                  fer_model_path: str,
                  affect_model_path: str,
-                 device='cuda'):
+                 device='cuda',
+                 parallel_branches: bool = False,
+                 backend: str = 'torch',
+                 backend_model_dir: str = 'models/exported',
+                 load_mode: str = 'sequential',
+                 optimize: bool = False,
+                 compile_models: bool = False,
+                 precision: str = 'fp32',
+                 au_model_factory: Optional[Callable[[], nn.Module]] = None):
         """
         初始化集成预测器
 
@@ -170,52 +209,147 @@ class IntegratedEmotionPredictor:
             fer_model_path: FER表情分类模型路径
             affect_model_path: AffectNet VA回归模型路径
             device: 计算设备
+            parallel_branches: 是否让AU/FER/VA三个分支在独立线程(GPU上为独立CUDA流)中并发执行
+            backend: 推理后端, 'torch'(eager) / 'onnx' / 'torchscript' / 'int8'(量化, 仅CPU)
+            backend_model_dir: 非eager后端时, export_models.py / quantize_models.py 输出的模型目录
+            load_mode: 模型加载方式, 'sequential' / 'parallel'(多线程并行) /
+                       'lazy'(后台并行加载, 构造函数立即返回, 首次推理时等待)
+            optimize: 加载后折叠BatchNorm并将卷积模型转换为channels_last(仅eager后端)
+            compile_models: 加载后再用 torch.compile 编译各模型(仅eager后端, 首次推理较慢)
+            precision: 前向计算精度, 'fp32' / 'bf16' / 'fp16' (autocast, 后处理仍为fp32;
+                       硬件或后端不支持时自动回退)
+            au_model_factory: 构建AU模型结构的函数, 默认为 Model.alexnet(pretrained=False)
         """
+        self.au_model_factory = au_model_factory or _default_au_model
         self.device = torch.device(device if torch.cuda.is_available() else 'cpu')
 
+        # 三分支并发执行所用的线程池和CUDA流(首次使用时创建)
+        self.parallel_branches = parallel_branches
+        self._branch_executor = None
+        self._branch_streams = None
+
         # 加载三个模型
         print("=" * 60)
         print("正在加载模型...")
         print("=" * 60)
 
-        self.au_model = self._load_au_model(au_model_path)
-        self.fer_model = self._load_fer_model(fer_model_path)
-        self.affect_model = self._load_affect_model(affect_model_path)
-
-        # 为AffectNet创建特征提取器
-        self.affect_feature_extractor = SimpleFeatureExtractor().to(self.device)
-        self.affect_feature_extractor.eval()
-
-        # 定义图像预处理
-        self.au_transform = self._get_au_transform()
-        self.fer_transform = self._get_fer_transform()
-        self.affect_transform = self._get_affect_transform()
+        self.load_mode = load_mode
+        self.startup_timings = {}
+        self._pending_models = {}
+        self._load_lock = threading.Lock()
+        self._load_started = time.perf_counter()
+
+        # 推理优化(在模型全部加载后执行一次)
+        self.optimize = optimize
+        self.compile_models = compile_models
+        self.memory_format = torch.contiguous_format
+        self._optimized = False
+
+        self.backend = backend
+        self.precision, self.autocast_dtype = resolve_precision(precision, self.device, backend)
+        if backend == 'torch':
+            # 为AffectNet创建特征提取器(没有独立的权重文件, 使用固定种子的随机初始化)
+            self.affect_feature_extractor = self._timed(
+                'feature_extractor', self._build_feature_extractor)
+            self.va_model = None
+            self._weight_files = [au_model_path, fer_model_path, affect_model_path]
+            self._load_models({
+                'au_model': (self._load_au_model, au_model_path),
+                'fer_model': (self._load_fer_model, fer_model_path),
+                'affect_model': (self._load_affect_model, affect_model_path),
+            }, load_mode)
+            if not self._pending_models:
+                self._optimize_models()
+        else:
+            # 导出的VA模型已包含特征提取器和回归头
+            self.au_model, self.fer_model, self.va_model = self._timed(
+                'backend_models', load_backend_models, backend, backend_model_dir, self.device)
+            self.affect_model = None
+            self.affect_feature_extractor = None
+            self._weight_files = [branch_path(backend_model_dir, branch, backend)
+                                  for branch in BRANCHES]
+        self._model_version = None
+
+        # 定义融合预处理参数(三个模型共用一次解码和缩放)
+        self.input_size = (224, 224)
+        self.affect_mean = torch.tensor([0.485, 0.456, 0.406], device=self.device).view(1, 3, 1, 1)
+        self.affect_std = torch.tensor([0.229, 0.224, 0.225], device=self.device).view(1, 3, 1, 1)
 
         # 定义AU名称和表情标签
-        self.au_names = ['AU1', 'AU2', 'AU4', 'AU5', 'AU6', 'AU7', 'AU9',
-                         'AU12', 'AU14', 'AU15', 'AU17', 'AU20', 'AU23',
-                         'AU24', 'AU25', 'AU26', 'AU27']
+        self.au_names = list(AU_NAMES)
 
-        self.emotion_labels = ['Angry', 'Disgust', 'Fear', 'Happy',
-                               'Sad', 'Surprise', 'Neutral']
+        self.emotion_labels = list(EMOTION_LABELS)
 
-        print("\n所有模型加载完成!")
+        if self._pending_models:
+            print("\n模型正在后台加载...")
+        else:
+            self.startup_timings.setdefault('total', time.perf_counter() - self._load_started)
+            self.print_startup_timings()
+            print("\n所有模型加载完成!")
         print("=" * 60 + "\n")
 
-    def _load_au_model(self, model_path: str) -> nn.Module:
-        """加载AU识别模型"""
-        print(f"[1/3] 加载AU识别模型: {model_path}")
-
-        checkpoint = torch.load(model_path, map_location=self.device, weights_only=False)
-        model = alexnet(pretrained=False)
+    def _build_feature_extractor(self) -> nn.Module:
+        with torch.random.fork_rng(devices=[]):
+            torch.manual_seed(FEATURE_EXTRACTOR_SEED)
+            model = SimpleFeatureExtractor()
+        return model.to(self.device).eval()
 
+    @property
+    def model_version(self) -> str:
+        """
+        模型版本标识(用于结果缓存键): 推理后端、推理优化选项、各权重文件的 路径/大小/修改时间,
+        以及特征提取器的参数摘要; 任一变化都会得到不同的版本
+        """
+        if self._model_version is None:
+            self.wait_until_loaded()
+            digest = hashlib.sha256(
+                f'{self.backend}|optimize={self.optimize}|compile={self.compile_models}'
+                f'|precision={self.precision}'.encode())
+            for path in self._weight_files:
+                stat = os.stat(path)
+                digest.update(f'|{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}'.encode())
+            if self.affect_feature_extractor is not None:
+                for tensor in self.affect_feature_extractor.state_dict().values():
+                    digest.update(tensor.detach().cpu().numpy().tobytes())
+            self._model_version = digest.hexdigest()[:16]
+        return self._model_version
+
+    def _load_checkpoint(self, model_path: str):
+        """
+        读取检查点: 优先以内存映射+仅权重方式读取(不整体读入内存, 也不执行任意pickle),
+        旧版序列化格式或含非张量对象的检查点回退到完整读取
+        """
+        try:
+            return torch.load(model_path, map_location='cpu', weights_only=True, mmap=True)
+        except (RuntimeError, pickle.UnpicklingError) as e:
+            reason = str(e).splitlines()[0] if str(e) else type(e).__name__
+            print(f"    ! 无法以内存映射方式读取 {model_path}, 回退到完整读取: {reason}")
+            return torch.load(model_path, map_location='cpu', weights_only=False)
+
+    @staticmethod
+    def _extract_state_dict(checkpoint) -> Dict[str, torch.Tensor]:
         if 'model_state_dict' in checkpoint:
-            model.load_state_dict(checkpoint['model_state_dict'])
-        else:
-            model.load_state_dict(checkpoint)
-
+            return checkpoint['model_state_dict']
+        if 'state_dict' in checkpoint:
+            return checkpoint['state_dict']
+        return checkpoint
+
+    def _instantiate(self, factory, state_dict: Dict[str, torch.Tensor]) -> nn.Module:
+        """在meta设备上构建模型结构(跳过随机初始化), 直接采用检查点中的张量作为参数"""
+        with torch.device('meta'):
+            model = factory()
+        model.load_state_dict(state_dict, assign=True)
         model.to(self.device)
         model.eval()
+        return model
+
+    def _load_au_model(self, model_path: str) -> nn.Module:
+        """加载AU识别模型"""
+        print(f"[1/3] 加载AU识别模型: {model_path}")
+
+        checkpoint = self._load_checkpoint(model_path)
+        model = self._instantiate(self.au_model_factory,
+                                  self._extract_state_dict(checkpoint))
         print("    ✓ AU模型加载成功")
         return model
 
@@ -223,19 +357,9 @@ class IntegratedEmotionPredictor:
         """加载FER表情分类模型"""
         print(f"[2/3] 加载FER表情分类模型: {model_path}")
 
-        checkpoint = torch.load(model_path, map_location=self.device, weights_only=False)
-        model = ResNet18(num_classes=7)
-
-        if 'model_state_dict' in checkpoint:
-            state_dict = checkpoint['model_state_dict']
-        elif 'state_dict' in checkpoint:
-            state_dict = checkpoint['state_dict']
-        else:
-            state_dict = checkpoint
-
-        model.load_state_dict(state_dict)
-        model.to(self.device)
-        model.eval()
+        checkpoint = self._load_checkpoint(model_path)
+        model = self._instantiate(lambda: ResNet18(num_classes=7),
+                                  self._extract_state_dict(checkpoint))
         print("    ✓ FER模型加载成功")
         return model
 
@@ -243,68 +367,326 @@ class IntegratedEmotionPredictor:
         """加载AffectNet VA回归模型"""
         print(f"[3/3] 加载AffectNet VA模型: {model_path}")
 
-        checkpoint = torch.load(model_path, map_location=self.device, weights_only=False)
-        model = AffectNetModel(pretrained=False, use_attention=True)
-
-        if 'model_state_dict' in checkpoint:
-            state_dict = checkpoint['model_state_dict']
-        elif 'state_dict' in checkpoint:
-            state_dict = checkpoint['state_dict']
-        else:
-            state_dict = checkpoint
-
-        model.load_state_dict(state_dict)
-        model.to(self.device)
-        model.eval()
+        checkpoint = self._load_checkpoint(model_path)
+        model = self._instantiate(lambda: AffectNetModel(pretrained=False, use_attention=True),
+                                  self._extract_state_dict(checkpoint))
         print("    ✓ AffectNet模型加载成功")
         return model
 
-    def _get_au_transform(self):
-        """AU模型的图像预处理"""
-        return transforms.Compose([
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.5, 0.5, 0.5], std=[0.5, 0.5, 0.5])
-        ])
-
-    def _get_fer_transform(self):
-        """FER模型的图像预处理(灰度图)"""
-        return transforms.Compose([
-            transforms.Resize((224, 224)),
-            transforms.Grayscale(num_output_channels=1),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.5], std=[0.5])
-        ])
-
-    def _get_affect_transform(self):
-        """AffectNet模型的图像预处理"""
-        return transforms.Compose([
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406],
-                                 std=[0.229, 0.224, 0.225])
-        ])
-
-    def predict(self, image_path: str, au_threshold: float = 0.5) -> Dict[str, Any]:
+    def _timed(self, phase: str, loader, *args):
+        """执行加载函数并记录耗时(秒)"""
+        start = time.perf_counter()
+        result = loader(*args)
+        self.startup_timings[phase] = time.perf_counter() - start
+        return result
+
+    def _load_models(self, loaders: Dict[str, Tuple], load_mode: str):
+        """
+        按 load_mode 加载模型
+
+        Args:
+            loaders: {属性名: (加载函数, 参数...)}
+            load_mode: 'sequential' 依次加载; 'parallel' 多线程并行加载并等待完成;
+                       'lazy' 后台并行加载, 首次推理时再等待
+        """
+        if load_mode == 'sequential':
+            for name, (loader, *args) in loaders.items():
+                setattr(self, name, self._timed(name, loader, *args))
+            return
+        if load_mode not in ('parallel', 'lazy'):
+            raise ValueError(f"未知的加载模式: {load_mode}")
+
+        executor = ThreadPoolExecutor(max_workers=len(loaders), thread_name_prefix='model-load')
+        for name, (loader, *args) in loaders.items():
+            setattr(self, name, None)
+            self._pending_models[name] = executor.submit(self._timed, name, loader, *args)
+        executor.shutdown(wait=False)
+
+        if load_mode == 'parallel':
+            self.wait_until_loaded()
+
+    def wait_until_loaded(self):
+        """等待后台加载的模型全部就绪(lazy 模式下首次推理时自动调用)"""
+        if not self._pending_models:
+            return
+        with self._load_lock:
+            if not self._pending_models:
+                return
+            for name, future in self._pending_models.items():
+                setattr(self, name, future.result())
+            self._pending_models = {}
+            self._optimize_models()
+            self.startup_timings['total'] = time.perf_counter() - self._load_started
+            if self.load_mode == 'lazy':
+                self.print_startup_timings()
+
+    def _optimize_models(self):
+        """对已加载的eager模型执行 BatchNorm折叠 / channels_last / torch.compile"""
+        if self._optimized or not (self.optimize or self.compile_models):
+            return
+        self._optimized = True
+        start = time.perf_counter()
+        for name in ('au_model', 'fer_model', 'affect_feature_extractor', 'affect_model'):
+            setattr(self, name, optimize_model(getattr(self, name), channels_last=self.optimize,
+                                               compile_model=self.compile_models))
+        if self.optimize:
+            self.memory_format = torch.channels_last
+        self.startup_timings['optimize'] = time.perf_counter() - start
+        print("    ✓ 模型推理优化完成")
+
+    def print_startup_timings(self):
+        """打印各启动阶段耗时"""
+        print("启动耗时:")
+        for phase, seconds in self.startup_timings.items():
+            print(f"  {phase:20s}: {seconds * 1000:8.1f} ms")
+
+    @staticmethod
+    def open_image(image: ImageInput) -> Image.Image:
+        """将各类图像输入统一解码为RGB的PIL图像(内存数据不经过临时文件)"""
+        if isinstance(image, Image.Image):
+            return image.convert('RGB')
+        if isinstance(image, np.ndarray):
+            if image.dtype != np.uint8:
+                raise TypeError(f"图像数组必须为uint8类型, 实际为 {image.dtype}")
+            return Image.fromarray(image).convert('RGB')
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            image = io.BytesIO(image)
+        # 路径或类文件对象
+        return Image.open(image).convert('RGB')
+
+    def load_image(self, image: ImageInput) -> torch.Tensor:
+        """读取图像并一次性缩放到模型输入尺寸, 返回 [3, H, W] 的uint8张量"""
+        height, width = self.input_size
+        if isinstance(image, torch.Tensor):
+            if image.dtype != torch.uint8 or image.shape != (3, height, width):
+                raise ValueError(f"图像张量必须为 [3, {height}, {width}] 的uint8张量")
+            return image
+        if isinstance(image, np.ndarray) and image.dtype == np.uint8 \
+                and image.shape == (height, width, 3):
+            # 已是目标尺寸的RGB数组, 无需解码和缩放
+            return torch.from_numpy(np.ascontiguousarray(image)).permute(2, 0, 1)
+
+        with metrics.timed('decode'):
+            return self.decode_resized(image, self.input_size)
+
+    @classmethod
+    def decode_resized(cls, image: ImageInput, input_size: Tuple[int, int]) -> torch.Tensor:
+        """
+        解码并缩放到 input_size (高, 宽), 返回 [3, H, W] 的uint8张量
+
+        不依赖已加载的模型, 可在 DataLoader 工作进程等不持有预测器的地方调用。
+        """
+        height, width = input_size
+        # 与 transforms.Resize 对PIL图像的处理一致(双线性插值)
+        image = cls.open_image(image).resize((width, height), Image.BILINEAR)
+        return torch.from_numpy(np.array(image)).permute(2, 0, 1)
+
+    def preprocess(self, images: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """
+        融合预处理: 由同一批uint8图像张量生成三个模型的归一化输入
+
+        Args:
+            images: [N, 3, H, W] 的uint8张量(load_image 的输出堆叠而成)
+
+        Returns:
+            (au_input, fer_input, affect_input)
+        """
+        with metrics.timed('preprocess'):
+            # 以uint8传输到设备, 归一化在设备上完成
+            images = images.to(self.device, non_blocking=True)
+            x = images.float().div_(255)
+            return self._au_input(x), self._fer_input(images), self._affect_input(x)
+
+    def _au_input(self, x: torch.Tensor) -> torch.Tensor:
+        """AU: mean=0.5, std=0.5 (x 为 [0, 1] 范围的浮点图像)"""
+        return (x - 0.5).div_(0.5)
+
+    def _fer_input(self, images: torch.Tensor) -> torch.Tensor:
+        """FER: 灰度通道, 与PIL 'L' 转换相同的定点加权和, 再按 mean=0.5, std=0.5 归一化"""
+        rgb = images.to(torch.int32)
+        gray = (rgb[:, 0:1] * 19595 + rgb[:, 1:2] * 38470 + rgb[:, 2:3] * 7471 + 0x8000) >> 16
+        return gray.float().div_(255).sub_(0.5).div_(0.5)
+
+    def _affect_input(self, x: torch.Tensor) -> torch.Tensor:
+        """AffectNet: ImageNet 均值/方差"""
+        return (x - self.affect_mean).div_(self.affect_std)
+
+    def _autocast(self):
+        """按配置的精度执行前向(fp32 时为空操作); autocast 为线程局部状态, 需在执行前向的线程中进入"""
+        return torch.autocast(self.device.type, dtype=self.autocast_dtype,
+                              enabled=self.autocast_dtype is not None)
+
+    def _forward_au(self, au_input: torch.Tensor) -> np.ndarray:
+        """AU识别前向, 返回 [N, 17] 概率"""
+        with metrics.timed('au_forward'):
+            with self._autocast():
+                au_outputs = self.au_model(au_input.contiguous(memory_format=self.memory_format))
+            return torch.sigmoid(au_outputs.float()).cpu().numpy()
+
+    def _forward_fer(self, fer_input: torch.Tensor) -> np.ndarray:
+        """FER表情分类前向, 返回 [N, 7] 概率"""
+        with metrics.timed('fer_forward'):
+            with self._autocast():
+                fer_outputs = self.fer_model(fer_input.contiguous(memory_format=self.memory_format))
+            return torch.softmax(fer_outputs.float(), dim=-1).cpu().numpy()
+
+    def _forward_va(self, affect_input: torch.Tensor) -> np.ndarray:
+        """AffectNet VA前向, 返回 [N, 2] (valence, arousal)"""
+        with metrics.timed('va_forward'):
+            if self.va_model is not None:
+                return self.va_model(affect_input).cpu().numpy()
+
+            with self._autocast():
+                # 先提取特征
+                affect_features = self.affect_feature_extractor(
+                    affect_input.contiguous(memory_format=self.memory_format))  # [N, 512]
+                # 再进行回归预测
+                va_outputs = self.affect_model(affect_features)
+            return va_outputs.float().cpu().numpy()
+
+    def _run_branches(self, batch: torch.Tensor) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """对一批uint8图像执行三个分支, 返回 (au_probs, fer_probs, va_values)"""
+        self.wait_until_loaded()
+        metrics.observe_batch_size(len(batch))
+        if self.parallel_branches:
+            return self._run_branches_parallel(batch)
+
+        au_input, fer_input, affect_input = self.preprocess(batch)
+        with torch.no_grad():
+            # 1. AU识别预测
+            au_probs = self._forward_au(au_input)
+            # 2. FER表情分类预测
+            fer_probs = self._forward_fer(fer_input)
+            # 3. AffectNet VA预测
+            va_values = self._forward_va(affect_input)
+        return au_probs, fer_probs, va_values
+
+    def _run_branches_parallel(self, batch: torch.Tensor) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """三个分支的预处理和前向在独立线程中并发执行, 全部完成后返回"""
+        if self._branch_executor is None:
+            self._branch_executor = ThreadPoolExecutor(max_workers=3,
+                                                       thread_name_prefix='branch')
+            if self.device.type == 'cuda':
+                self._branch_streams = [torch.cuda.Stream(self.device) for _ in range(3)]
+
+        images = batch.to(self.device, non_blocking=True)
+        tasks = [
+            lambda: self._forward_au(self._au_input(images.float().div_(255))),
+            lambda: self._forward_fer(self._fer_input(images)),
+            lambda: self._forward_va(self._affect_input(images.float().div_(255))),
+        ]
+        futures = [self._branch_executor.submit(self._run_branch, i, task)
+                   for i, task in enumerate(tasks)]
+        au_probs, fer_probs, va_values = (future.result() for future in futures)
+        return au_probs, fer_probs, va_values
+
+    def _run_branch(self, index: int, task):
+        """在工作线程中执行单个分支(no_grad 为线程局部状态, 需在线程内开启)"""
+        with torch.no_grad():
+            if self._branch_streams is None:
+                return task()
+            stream = self._branch_streams[index]
+            # 等待输入在默认流上传输完成
+            stream.wait_stream(torch.cuda.current_stream(self.device))
+            with torch.cuda.stream(stream):
+                return task()
+
+    def predict(self, image: ImageInput, au_threshold: float = 0.5,
+                compact: bool = False) -> Union[Dict[str, Any], CompactResult]:
         """
         对单张图像进行完整的情感识别预测
 
         Args:
-            image_path: 图像路径
+            image: 图像路径、字节数据(bytes/memoryview)、类文件对象、PIL图像或uint8数组
             au_threshold: AU激活阈值
+            compact: 为True时返回 CompactResult, 不构建嵌套字典
 
         Returns:
-            包含所有预测结果的字典
+            包含所有预测结果的字典(或 CompactResult)
         """
-        # 读取图像
-        image = Image.open(image_path).convert('RGB')
+        return self.predict_batch([image], au_threshold=au_threshold, compact=compact)[0]
 
-        # 1. AU识别预测
-        au_input = self.au_transform(image).unsqueeze(0).to(self.device)
-        with torch.no_grad():
-            au_outputs = self.au_model(au_input)
-            au_probs = torch.sigmoid(au_outputs).cpu().numpy().flatten()
-            au_predictions = (au_probs > au_threshold).astype(int)
+    def predict_batch(self, images: List[ImageInput], au_threshold: float = 0.5,
+                      compact: bool = False) -> List[Union[Dict[str, Any], CompactResult]]:
+        """
+        对多张图像进行批量预测, 三个模型各只做一次前向
+
+        Args:
+            images: 图像列表, 每项可为 predict() 支持的任意输入类型
+            au_threshold: AU激活阈值
+            compact: 为True时返回 CompactResult 列表
+
+        Returns:
+            与输入顺序一致的预测结果字典(或 CompactResult)列表
+        """
+        if not images:
+            return []
+
+        batch = torch.stack([self.load_image(image) for image in images])
+        return self.predict_decoded_batch(batch, images, au_threshold=au_threshold,
+                                          compact=compact)
+
+    def predict_decoded_batch(self, batch: torch.Tensor, images: Optional[List[ImageInput]] = None,
+                              au_threshold: float = 0.5, compact: bool = False
+                              ) -> List[Union[Dict[str, Any], CompactResult]]:
+        """
+        对已解码的图像批次进行预测(跳过 load_image), 供自行解码的调用方使用,
+        如在 DataLoader 工作进程中并行解码的离线批量分析
+
+        Args:
+            batch: [N, 3, H, W] uint8张量, 与 load_image() 的输出一致(尺寸为 input_size)
+            images: 每张图像的来源, 路径会记录在结果的 'image' 字段中; 默认均为None
+            au_threshold: AU激活阈值
+            compact: 为True时返回 CompactResult 列表
+
+        Returns:
+            与批次顺序一致的预测结果字典(或 CompactResult)列表
+        """
+        if batch.dim() != 4 or tuple(batch.shape[2:]) != self.input_size:
+            raise ValueError(f"批次形状须为 [N, 3, {self.input_size[0]}, {self.input_size[1]}]: "
+                             f"{list(batch.shape)}")
+        if images is None:
+            images = [None] * len(batch)
+        au_probs, fer_probs, va_values = self._run_branches(batch)
+
+        with metrics.timed('assemble'):
+            if compact:
+                return self._build_compact_results(images, au_probs, fer_probs,
+                                                   va_values, au_threshold)
+
+            return [
+                self._build_results(self._image_source(images[i]), au_probs[i],
+                                    fer_probs[i], va_values[i], au_threshold)
+                for i in range(len(images))
+            ]
+
+    @staticmethod
+    def _image_source(image: ImageInput) -> Optional[str]:
+        """结果中记录的图像来源: 路径输入返回路径, 内存输入返回None"""
+        if isinstance(image, (str, os.PathLike)):
+            return os.fspath(image)
+        return None
+
+    def _build_compact_results(self, images: List[ImageInput], au_probs: np.ndarray,
+                               fer_probs: np.ndarray, va_values: np.ndarray,
+                               au_threshold: float) -> List[CompactResult]:
+        """以数组运算生成整批的 CompactResult"""
+        bit_values = np.left_shift(1, np.arange(au_probs.shape[1], dtype=np.int64))
+        au_masks = ((au_probs > au_threshold) * bit_values).sum(axis=1).tolist()
+        fer_preds = fer_probs.argmax(axis=1).tolist()
+        va_list = va_values.tolist()
+
+        return [
+            CompactResult(self._image_source(images[i]), au_probs[i], au_masks[i],
+                          fer_probs[i], fer_preds[i], va_list[i][0], va_list[i][1])
+            for i in range(len(images))
+        ]
+
+    def _build_results(self, image_path: Optional[str], au_probs: np.ndarray,
+                       fer_probs: np.ndarray, va_values: np.ndarray,
+                       au_threshold: float) -> Dict[str, Any]:
+        """将单张图像的三模态输出整理为结果字典"""
+        au_predictions = (au_probs > au_threshold).astype(int)
 
         # 整理AU结果
         au_results = {}
@@ -317,21 +699,7 @@ class IntegratedEmotionPredictor:
             if au_predictions[i]:
                 active_aus.append(au_name)
 
-        # 2. FER表情分类预测
-        fer_input = self.fer_transform(image).unsqueeze(0).to(self.device)
-        with torch.no_grad():
-            fer_outputs = self.fer_model(fer_input)
-            fer_probs = torch.softmax(fer_outputs, dim=-1).cpu().numpy().flatten()
-            fer_pred = int(np.argmax(fer_probs))
-
-        # 3. AffectNet VA预测
-        affect_input = self.affect_transform(image).unsqueeze(0).to(self.device)
-        with torch.no_grad():
-            # 先提取特征
-            affect_features = self.affect_feature_extractor(affect_input)  # [1, 512]
-            # 再进行回归预测
-            va_outputs = self.affect_model(affect_features)
-            va_values = va_outputs.cpu().numpy().flatten()
+        fer_pred = int(np.argmax(fer_probs))
 
         # 整合所有结果
         results = {
@@ -361,6 +729,9 @@ class IntegratedEmotionPredictor:
     def visualize_results(self, image_path: str, results: Dict[str, Any],
                           save_path: str = None):
         """可视化所有预测结果"""
+        # matplotlib 仅可视化需要, 延迟导入以加快服务启动
+        import matplotlib.pyplot as plt
+
         image = Image.open(image_path)
 
         fig = plt.figure(figsize=(18, 8))
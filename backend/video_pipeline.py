@@ -0,0 +1,107 @@
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+def iter_sampled_frames(video_path: str,
+                        sample_fps: float = 5.0) -> Iterator[Tuple[int, float, np.ndarray]]:
+    """
+    逐帧惰性解码视频, 按目标帧率抽帧
+
+    Args:
+        video_path: 视频文件路径
+        sample_fps: 抽帧帧率(每秒输出的帧数)
+
+    Yields:
+        (帧序号, 时间戳秒, RGB uint8数组)
+    """
+    try:
+        import cv2
+    except ImportError as e:
+        raise RuntimeError("视频检测需要安装 opencv-python") from e
+
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise ValueError(f"无法打开视频: {video_path}")
+
+    try:
+        native_fps = capture.get(cv2.CAP_PROP_FPS)
+        if not native_fps or native_fps <= 0:
+            native_fps = sample_fps
+        interval = 1.0 / sample_fps if sample_fps > 0 else 0.0
+
+        frame_index = -1
+        next_sample_time = 0.0
+        while True:
+            # grab 只读取不做颜色转换, 未抽中的帧不会被 retrieve
+            if not capture.grab():
+                break
+            frame_index += 1
+            timestamp = frame_index / native_fps
+            if timestamp + 1e-6 < next_sample_time:
+                continue
+
+            ok, frame = capture.retrieve()
+            if not ok:
+                break
+            next_sample_time += interval
+            yield frame_index, timestamp, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    finally:
+        capture.release()
+
+
+def chunked(iterable: Iterable, size: int) -> Iterator[List]:
+    """将可迭代对象切分为最多 size 个元素的列表"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def analyze_video(predictor, engine, video_path: str, sample_fps: float = 5.0,
+                  chunk_size: int = 16, au_threshold: float = 0.5,
+                  tracker: Optional[Any] = None,
+                  compact: bool = False,
+                  face_roi: Optional[Any] = None) -> Iterator[Dict[str, Any]]:
+    """
+    流式视频分析: 抽帧 -> 分块批量推理 -> 逐帧输出驾驶状态
+
+    任意时刻只在内存中保留一个分块的帧, 内存占用与视频长度无关。
+
+    Args:
+        predictor: IntegratedEmotionPredictor 实例
+        engine: DrivingStateInference 实例
+        video_path: 视频文件路径
+        sample_fps: 抽帧帧率
+        chunk_size: 每次批量推理的帧数
+        au_threshold: AU激活阈值
+        tracker: 可选的 DrivingStateTracker, 提供时逐帧输出平滑后的时序状态
+        compact: 为True时 'results' 为 CompactResult
+        face_roi: 可选的 FaceROITracker, 提供时三个模型使用人脸裁剪而非整帧
+
+    Yields:
+        每帧的 {'frame_index', 'timestamp', 'results', 'driving_state', 'temporal_state',
+        'face_box'}
+    """
+    frames = iter_sampled_frames(video_path, sample_fps=sample_fps)
+    for chunk in chunked(frames, chunk_size):
+        images = [frame for _, _, frame in chunk]
+        boxes = [None] * len(chunk)
+        if face_roi is not None:
+            images, boxes = zip(*(face_roi.crop(frame) for frame in images))
+        results_list = predictor.predict_batch(list(images),
+                                               au_threshold=au_threshold, compact=compact)
+        states = engine.infer_driving_state_batch(results_list)
+        for (frame_index, timestamp, _), results, driving_state, box in zip(
+                chunk, results_list, states, boxes):
+            yield {
+                'frame_index': frame_index,
+                'timestamp': timestamp,
+                'results': results,
+                'driving_state': driving_state,
+                'temporal_state': tracker.update(results, driving_state) if tracker else None,
+                'face_box': box
+            }
\ No newline at end of file
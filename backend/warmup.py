@@ -0,0 +1,152 @@
+import io
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import torch
+from PIL import Image
+
+# 预热图像的尺寸(宽, 高), 接近摄像头帧, 使解码和缩放走与真实请求相同的路径
+WARMUP_IMAGE_SIZE = (640, 480)
+
+
+def enable_autotuning(device: torch.device):
+    """开启可用的内核自动调优: GPU上让cuDNN为每种输入尺寸选择最快的卷积算法(CPU无需设置)"""
+    if device.type == 'cuda':
+        torch.backends.cudnn.benchmark = True
+
+
+def synthetic_jpegs(count: int, size: Tuple[int, int] = WARMUP_IMAGE_SIZE,
+                    seed: int = 0) -> List[bytes]:
+    """生成平滑的随机JPEG图像(编码后的字节)"""
+    rng = np.random.RandomState(seed)
+    images = []
+    for _ in range(count):
+        small = rng.randint(0, 256, (size[1] // 16, size[0] // 16, 3), dtype=np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(small).resize(size, Image.BILINEAR).save(buffer, format='JPEG', quality=90)
+        images.append(buffer.getvalue())
+    return images
+
+
+def warm_up(predictor, engine, batch_sizes: Iterable[int] = (1,),
+            iterations: int = 3) -> Dict[str, Any]:
+    """
+    用合成JPEG在各批大小上执行完整的 解码(load_image) + 预测 + 驾驶状态推断,
+    触发图像解码库加载、内存分配器扩容、内核选择等首次调用开销
+
+    Args:
+        predictor: IntegratedEmotionPredictor 实例
+        engine: DrivingStateInference 实例
+        batch_sizes: 需要预热的批大小
+        iterations: 每个批大小的执行次数
+
+    Returns:
+        {'batch_sizes': {批大小: {'first_ms', 'last_ms', 'latencies_ms'}}, 'total_ms'}
+    """
+    enable_autotuning(predictor.device)
+    # 模型可能仍在后台加载
+    predictor.wait_until_loaded()
+
+    started = time.perf_counter()
+    report = {}
+    for batch_size in sorted(set(batch_sizes)):
+        images = synthetic_jpegs(batch_size, seed=batch_size)
+        latencies = []
+        for _ in range(max(1, iterations)):
+            start = time.perf_counter()
+            results_list = predictor.predict_batch(images, compact=True)
+            engine.infer_driving_state_batch(results_list)
+            latencies.append((time.perf_counter() - start) * 1000.0)
+
+        report[batch_size] = {
+            'first_ms': latencies[0],
+            'last_ms': latencies[-1],
+            'latencies_ms': latencies
+        }
+        print(f"    预热 batch={batch_size}: 首次 {latencies[0]:.1f} ms, "
+              f"最后 {latencies[-1]:.1f} ms")
+
+    return {'batch_sizes': report, 'total_ms': (time.perf_counter() - started) * 1000.0}
+
+
+class WarmupRunner:
+    """
+    在后台线程中执行预热, 并提供就绪状态
+
+    预热失败时间隔 retry_delay 秒重试; 重试用尽后仍标记为就绪, 但 degraded=True
+    (服务可以处理请求, 只是首批请求会承担冷启动开销), 避免 /ready 永远返回未就绪。
+    """
+
+    def __init__(self, predictor, engine, batch_sizes: Iterable[int] = (1,),
+                 iterations: int = 3, retries: int = 2, retry_delay: float = 5.0):
+        """
+        Args:
+            predictor: IntegratedEmotionPredictor 实例
+            engine: DrivingStateInference 实例
+            batch_sizes: 需要预热的批大小
+            iterations: 每个批大小的执行次数
+            retries: 失败后的重试次数
+            retry_delay: 两次尝试之间的等待时间(秒)
+        """
+        self.predictor = predictor
+        self.engine = engine
+        self.batch_sizes = list(batch_sizes)
+        self.iterations = iterations
+        self.retries = retries
+        self.retry_delay = retry_delay
+
+        self.ready = False
+        self.degraded = False
+        self.attempts = 0
+        self.report = None
+        self.error = None
+        self._thread = None
+
+    def start(self) -> 'WarmupRunner':
+        """启动后台预热(重复调用无效)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name='warmup', daemon=True)
+            self._thread.start()
+        return self
+
+    def run(self):
+        print("开始预热...")
+        for attempt in range(1, self.retries + 2):
+            self.attempts = attempt
+            try:
+                self.report = warm_up(self.predictor, self.engine, self.batch_sizes,
+                                      self.iterations)
+            except Exception as e:
+                self.error = f'{type(e).__name__}: {e}'
+                print(f"  ! 预热失败(第 {attempt}/{self.retries + 1} 次): {self.error}")
+                if attempt <= self.retries:
+                    time.sleep(self.retry_delay)
+                continue
+            self.error = None
+            self.ready = True
+            print(f"预热完成, 耗时 {self.report['total_ms']:.1f} ms")
+            return
+
+        self.degraded = True
+        self.ready = True
+        print("  ! 预热未完成, 服务以降级状态就绪(首批请求较慢)")
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.ready
+
+    def status(self) -> Dict[str, Any]:
+        status = {'ready': self.ready, 'degraded': self.degraded,
+                  'attempts': self.attempts, 'batch_sizes': self.batch_sizes}
+        if self.report is not None:
+            status['warmup'] = {
+                'total_ms': self.report['total_ms'],
+                'batch_sizes': {str(size): info
+                                for size, info in self.report['batch_sizes'].items()}
+            }
+        if self.error is not None:
+            status['error'] = self.error
+        return status
\ No newline at end of file